@@ -1,20 +1,133 @@
 # app/crud.py
 
+import json
 import random
+from array import array
+import re
+import time
+from sqlalchemy import and_, case, insert, literal, or_, select, text, update
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.sql import func
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from app.db import SessionLocal
-from app.models import Category, Subcategory, Question, Option
+from app.db import (
+    attached_session,
+    get_shard_session,
+    init_shard,
+    shard_ids,
+    shard_of,
+)
+from app.models import (
+    Category,
+    Subcategory,
+    Question,
+    Option,
+    ItemState,
+    Attempt,
+    QuestionStats,
+    QuestionBand,
+    BankMeta,
+    ExamForm,
+    QuestionRevision,
+    ItemParams,
+)
+from app.domain.answers import answer_keys, dump_alternates
+from app.domain.errors import UnsavedAttemptsError
+from app.domain.fingerprint import content_hash as compute_content_hash
+from app.domain.topk import space_saving_merge
 
 
 # =====================================================
 # DB HELPER
 # =====================================================
 
-def _get_db() -> Session:
-    return SessionLocal()
+def _get_db(shard: int = 0) -> Session:
+    return get_shard_session(shard)
+
+
+# =====================================================
+# ENRUTADO POR SHARD
+# =====================================================
+
+# category_id → shard. Se fija al crear la categoría y no
+# cambia nunca, así que la caché no se invalida (solo al borrar).
+_category_shards: dict[int, int] = {}
+
+
+def _category_shard(category_id: int) -> int:
+    shard = _category_shards.get(category_id)
+    if shard is not None:
+        return shard
+
+    db = _get_db()
+    try:
+        shard = db.query(Category.shard).filter(Category.id == category_id).scalar()
+    finally:
+        db.close()
+
+    if shard is None:
+        return 0
+
+    _category_shards[category_id] = shard
+    return shard
+
+
+def _by_shard(ids) -> dict[int, list[int]]:
+    """
+    Agrupa ids (de cualquier entidad del banco) por shard.
+    """
+    groups: dict[int, list[int]] = {}
+    for entity_id in ids:
+        groups.setdefault(shard_of(entity_id), []).append(entity_id)
+    return groups
+
+
+# =====================================================
+# VERSIÓN DEL BANCO
+# =====================================================
+
+# Contador monótono que sube con cada escritura sobre el banco
+# (categorías, subcategorías, preguntas, alternativas). Cada
+# shard lleva el suyo; la versión global es la suma (también
+# monótona). Se lee siempre de la DB (una fila por PK y shard):
+# con varios workers, una caché en proceso no vería las
+# escrituras de los demás.
+
+def get_bank_version() -> tuple[int, float]:
+    """
+    (versión, timestamp de la última escritura).
+    """
+    total, last = 0, 0.0
+
+    for shard in shard_ids():
+        db = _get_db(shard)
+        try:
+            row = db.execute(
+                select(BankMeta.version, BankMeta.updated_at).where(BankMeta.id == 1)
+            ).first()
+        finally:
+            db.close()
+
+        if row is not None:
+            total += row[0]
+            last = max(last, row[1])
+
+    return total, last
+
+
+def _commit_bank_write(db: Session):
+    """
+    Commit de una escritura sobre el banco: sube la versión en
+    la MISMA transacción.
+    """
+    db.execute(
+        update(BankMeta)
+        .where(BankMeta.id == 1)
+        .values(version=BankMeta.version + 1, updated_at=time.time())
+    )
+
+    db.commit()
 
 
 # =====================================================
@@ -25,59 +138,108 @@ def get_categories():
     """
     Devuelve todas las categorías con subcategorías,
     preguntas y opciones (eager loading para admin).
+    Los shards se leen adjuntos (ATTACH) en una sola conexión.
     """
-    db = _get_db()
-    try:
-        return (
-            db.query(Category)
-            .options(
-                joinedload(Category.subcategories)
-                .joinedload(Subcategory.questions)
-                .joinedload(Question.options)
+    with attached_session() as (db, schemas):
+        categories = []
+
+        for shard, schema in schemas.items():
+            q = (
+                db.query(Category)
+                .options(
+                    joinedload(Category.subcategories)
+                    .joinedload(Subcategory.questions)
+                    .joinedload(Question.options)
+                )
+                .execution_options(schema_translate_map={None: schema})
             )
-            .order_by(Category.name)
-            .all()
-        )
-    finally:
-        db.close()
 
+            if shard == 0:
+                # en data.db las categorías de otros shards son solo índice
+                q = q.filter(Category.shard == 0)
+
+            categories.extend(q.all())
+
+        return sorted(categories, key=lambda c: c.name)
+
+
+def create_category(name: str, shard: int = 0):
+    """
+    El shard se elige SOLO al crear: el contenido de una
+    categoría no se mueve después entre archivos.
+    """
+    if shard:
+        init_shard(shard)
 
-def create_category(name: str):
     db = _get_db()
     try:
-        db.add(Category(name=name))
-        db.commit()
+        cat = Category(name=name, shard=shard)
+        db.add(cat)
+        _commit_bank_write(db)
+        category_id = cat.id
     except IntegrityError:
         db.rollback()
         raise
     finally:
         db.close()
 
+    if not shard:
+        return
 
-def update_category(category_id: int, new_name: str) -> bool:
-    db = _get_db()
+    # copia de la fila en el shard (FK y cascadas locales)
+    sdb = _get_db(shard)
     try:
-        cat = db.query(Category).filter(Category.id == category_id).first()
-        if not cat:
-            return False
-        cat.name = new_name
-        db.commit()
-        return True
+        sdb.add(Category(id=category_id, name=name, shard=shard))
+        _commit_bank_write(sdb)
+    except Exception:
+        sdb.rollback()
+        delete_category(category_id)
+        raise
     finally:
-        db.close()
+        sdb.close()
+
+    _category_shards[category_id] = shard
+
+
+def update_category(category_id: int, new_name: str) -> bool:
+    shard = _category_shard(category_id)
+
+    for target in dict.fromkeys((0, shard)):
+        db = _get_db(target)
+        try:
+            cat = db.query(Category).filter(Category.id == category_id).first()
+            if not cat:
+                return False
+            cat.name = new_name
+            _commit_bank_write(db)
+        finally:
+            db.close()
+
+    return True
 
 
 def delete_category(category_id: int) -> bool:
-    db = _get_db()
-    try:
-        cat = db.query(Category).filter(Category.id == category_id).first()
-        if not cat:
-            return False
-        db.delete(cat)
-        db.commit()
-        return True
-    finally:
-        db.close()
+    """
+    Un solo DELETE: subcategorías, preguntas y alternativas
+    caen por ON DELETE CASCADE, sin cargarse en memoria.
+    """
+    shard = _category_shard(category_id)
+    deleted = 0
+
+    for target in dict.fromkeys((shard, 0)):
+        db = _get_db(target)
+        try:
+            n = db.query(Category).filter(Category.id == category_id).delete(
+                synchronize_session=False
+            )
+            if n:
+                _commit_bank_write(db)
+            deleted += n
+        finally:
+            db.close()
+
+    _category_shards.pop(category_id, None)
+    return bool(deleted)
 
 
 # =====================================================
@@ -85,7 +247,7 @@ def delete_category(category_id: int) -> bool:
 # =====================================================
 
 def get_subcategories(category_id: int):
-    db = _get_db()
+    db = _get_db(_category_shard(category_id))
     try:
         return (
             db.query(Subcategory)
@@ -98,35 +260,36 @@ def get_subcategories(category_id: int):
 
 
 def create_subcategory(category_id: int, name: str):
-    db = _get_db()
+    db = _get_db(_category_shard(category_id))
     try:
         db.add(Subcategory(category_id=category_id, name=name))
-        db.commit()
+        _commit_bank_write(db)
     finally:
         db.close()
 
 
 def update_subcategory(subcategory_id: int, new_name: str) -> bool:
-    db = _get_db()
+    db = _get_db(shard_of(subcategory_id))
     try:
         sub = db.query(Subcategory).filter(Subcategory.id == subcategory_id).first()
         if not sub:
             return False
         sub.name = new_name
-        db.commit()
+        _commit_bank_write(db)
         return True
     finally:
         db.close()
 
 
 def delete_subcategory(subcategory_id: int) -> bool:
-    db = _get_db()
+    db = _get_db(shard_of(subcategory_id))
     try:
-        sub = db.query(Subcategory).filter(Subcategory.id == subcategory_id).first()
-        if not sub:
+        deleted = db.query(Subcategory).filter(Subcategory.id == subcategory_id).delete(
+            synchronize_session=False
+        )
+        if not deleted:
             return False
-        db.delete(sub)
-        db.commit()
+        _commit_bank_write(db)
         return True
     finally:
         db.close()
@@ -144,12 +307,14 @@ def create_question(
     eval_type: str,
     answer: str | None,
     tolerance: float | None,
+    content_hash: str | None = None,
+    alt_answers: list[str] | None = None,
 ) -> int:
     """
     Crea una pregunta YA INTERPRETADA.
     La validación semántica vive en la capa de servicio o en la DB.
     """
-    db = _get_db()
+    db = _get_db(shard_of(subcategory_id))
     try:
         q = Question(
             subcategory_id=subcategory_id,
@@ -157,17 +322,150 @@ def create_question(
             statement_math=statement_math,
             eval_type=eval_type,
             answer=answer,
+            alt_answers=dump_alternates(alt_answers),
             tolerance=tolerance,
+            content_hash=content_hash,
         )
         db.add(q)
-        db.commit()
+        db.flush()
+        _snapshot_questions(db, [q.id])
+        _commit_bank_write(db)
         return q.id
+    except IntegrityError:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _snapshot_questions(db: Session, question_ids: list[int], sync_keys: bool = True):
+    """
+    Foto inmutable del estado actual (INSERT … SELECT por conjunto,
+    alternativas como JSON) y puntero current_revision_id.
+    sync_keys=False: answer_keys ya vienen calculadas (importación).
+    """
+    db.flush()
+    if sync_keys:
+        _sync_answer_keys(db, question_ids)
+
+    # json_group_array no garantiza orden: opciones por id en
+    # una subconsulta, para que la foto sea reproducible
+    ordered = (
+        select(Option.id, Option.text, Option.is_correct)
+        .where(Option.question_id == Question.id)
+        .order_by(Option.id)
+        .correlate(Question)
+        .subquery()
+    )
+    options_json = (
+        select(
+            func.json_group_array(
+                func.json_object(
+                    "id", ordered.c.id,
+                    "text", ordered.c.text,
+                    "is_correct", ordered.c.is_correct,
+                )
+            )
+        )
+        .scalar_subquery()
+    )
+
+    db.execute(
+        insert(QuestionRevision).from_select(
+            [
+                "question_id", "revision", "statement_text", "statement_math",
+                "eval_type", "answer", "alt_answers", "answer_keys",
+                "tolerance", "correct_option_id", "option_count", "options",
+                "created_at",
+            ],
+            select(
+                Question.id,
+                Question.revision,
+                Question.statement_text,
+                Question.statement_math,
+                Question.eval_type,
+                Question.answer,
+                Question.alt_answers,
+                Question.answer_keys,
+                Question.tolerance,
+                Question.correct_option_id,
+                Question.option_count,
+                options_json,
+                literal(time.time()),
+            ).where(Question.id.in_(question_ids)),
+        )
+    )
+
+    db.execute(
+        update(Question)
+        .where(Question.id.in_(question_ids))
+        .values(
+            current_revision_id=(
+                select(func.max(QuestionRevision.id))
+                .where(QuestionRevision.question_id == Question.id)
+                .scalar_subquery()
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _sync_answer_keys(db: Session, question_ids: list[int]):
+    """
+    Recalcula el conjunto normalizado de respuestas aceptadas
+    (la normalización depende del tipo: se hace en Python).
+    """
+    rows = db.execute(
+        select(Question.id, Question.eval_type, Question.answer, Question.alt_answers)
+        .where(Question.id.in_(question_ids))
+    ).all()
+
+    if rows:
+        db.execute(
+            update(Question),
+            [
+                {"id": qid, "answer_keys": answer_keys(et, answer, alts)}
+                for qid, et, answer, alts in rows
+            ],
+        )
+
+
+def _touch_question(db: Session, question_ids: list[int], sync_keys: bool = True):
+    """
+    Nueva revisión: las existentes no se tocan, así que los
+    exámenes en curso y la caché de calificación (por id de
+    revisión) nunca quedan obsoletos.
+    """
+    db.flush()
+    db.execute(
+        update(Question)
+        .where(Question.id.in_(question_ids))
+        .values(revision=Question.revision + 1)
+        .execution_options(synchronize_session=False)
+    )
+    _snapshot_questions(db, question_ids, sync_keys=sync_keys)
+
+
+def find_question_by_hash(subcategory_id: int, content_hash: str) -> int | None:
+    """
+    Búsqueda O(1) por el índice único (subcategory_id, content_hash).
+    """
+    db = _get_db(shard_of(subcategory_id))
+    try:
+        return (
+            db.query(Question.id)
+            .filter(
+                Question.subcategory_id == subcategory_id,
+                Question.content_hash == content_hash,
+            )
+            .scalar()
+        )
     finally:
         db.close()
 
 
 def get_question(question_id: int):
-    db = _get_db()
+    db = _get_db(shard_of(question_id))
     try:
         return (
             db.query(Question)
@@ -179,6 +477,82 @@ def get_question(question_id: int):
         db.close()
 
 
+def get_question_for_grading(question_id: int, revision_id: int | None = None):
+    """
+    Lo que se califica: la revisión fijada (examen en curso) o la
+    vigente. Una sola fila, sin alternativas: CHOICE se califica
+    con correct_option_id. current_revision_id identifica la foto.
+    """
+    db = _get_db(shard_of(question_id))
+    try:
+        q = db.query(QuestionRevision)
+
+        if revision_id is not None:
+            q = q.filter(
+                QuestionRevision.id == revision_id,
+                QuestionRevision.question_id == question_id,
+            )
+        else:
+            q = q.join(
+                Question, Question.current_revision_id == QuestionRevision.id
+            ).filter(Question.id == question_id)
+
+        rev = q.first()
+        return rev.as_question() if rev else None
+    finally:
+        db.close()
+
+
+def get_question_at_revision(revision_id: int):
+    """
+    Pregunta tal como era en una revisión (para mostrarla en
+    un examen que la fijó al empezar). Si la pregunta se borró
+    después, la foto sigue ahí (subcategory_id None).
+    """
+    db = _get_db(shard_of(revision_id))
+    try:
+        row = (
+            db.query(QuestionRevision, Question.subcategory_id)
+            .outerjoin(Question, Question.id == QuestionRevision.question_id)
+            .filter(QuestionRevision.id == revision_id)
+            .first()
+        )
+        if row is None:
+            return None
+        rev, subcategory_id = row
+        return rev.as_question(subcategory_id)
+    finally:
+        db.close()
+
+
+def get_current_revision_ids(
+    question_ids: list[int],
+    subcategory_ids: list[int] | None = None,
+) -> dict[int, int]:
+    """
+    Revisión vigente por pregunta. Con `subcategory_ids`, solo
+    las que siguen en esas subcategorías y son jugables (lo que
+    exige un formulario pregenerado).
+    """
+    revisions: dict[int, int] = {}
+
+    for shard, ids in _by_shard(question_ids).items():
+        stmt = select(Question.id, Question.current_revision_id).where(Question.id.in_(ids))
+        if subcategory_ids is not None:
+            stmt = stmt.where(
+                Question.subcategory_id.in_(subcategory_ids),
+                _playable_clause(),
+            )
+
+        db = _get_db(shard)
+        try:
+            revisions.update(db.execute(stmt).all())
+        finally:
+            db.close()
+
+    return revisions
+
+
 def update_question(
     *,
     question_id: int,
@@ -186,8 +560,14 @@ def update_question(
     statement_math: str | None,
     answer: str | None,
     tolerance: float | None,
+    content_hash: str | None = None,
+    alt_answers: list[str] | None = None,
+    eval_type: str | None = None,
 ) -> bool:
-    db = _get_db()
+    """
+    `eval_type` None conserva el tipo actual.
+    """
+    db = _get_db(shard_of(question_id))
     try:
         q = db.query(Question).filter(Question.id == question_id).first()
         if not q:
@@ -195,123 +575,602 @@ def update_question(
 
         q.statement_text = statement_text
         q.statement_math = statement_math
+        if eval_type is not None:
+            q.eval_type = eval_type
         q.answer = answer
+        q.alt_answers = dump_alternates(alt_answers)
         q.tolerance = tolerance
+        q.content_hash = content_hash
 
-        db.commit()
+        _touch_question(db, [question_id])
+        _commit_bank_write(db)
         return True
+    except IntegrityError:
+        db.rollback()
+        raise
     finally:
         db.close()
 
 
-def delete_question(question_id: int) -> bool:
-    db = _get_db()
+def save_question_aggregate(
+    *,
+    question_id: int,
+    statement_text: str | None,
+    statement_math: str | None,
+    eval_type: str,
+    answer: str | None,
+    tolerance: float | None,
+    content_hash: str | None,
+    options: list[dict] | None,
+    alt_answers: list[str] | None = None,
+) -> dict | None:
+    """
+    Guarda pregunta + eval_type + alternativas en UNA transacción.
+
+    `options` es la lista COMPLETA deseada ({id?, text, is_correct}):
+    con id → update si cambió, sin id → insert, las que faltan → delete.
+    None deja las alternativas como están (igual `alt_answers`).
+    """
+    db = _get_db(shard_of(question_id))
     try:
         q = db.query(Question).filter(Question.id == question_id).first()
         if not q:
-            return False
-        db.delete(q)
-        db.commit()
-        return True
-    finally:
-        db.close()
+            return None
 
+        q.statement_text = statement_text
+        q.statement_math = statement_math
+        q.eval_type = eval_type
+        q.answer = answer
+        q.tolerance = tolerance
+        q.content_hash = content_hash
 
-# =====================================================
-# OPTIONS
-# =====================================================
+        if alt_answers is not None:
+            q.alt_answers = dump_alternates(alt_answers)
 
-def create_option(
-    *,
-    question_id: int,
-    text: str,
-    is_correct: bool = False,
-) -> int:
-    db = _get_db()
-    try:
-        opt = Option(
-            question_id=question_id,
-            text=text,
-            is_correct=is_correct,
-        )
-        db.add(opt)
-        db.commit()
-        return opt.id
-    finally:
-        db.close()
+        counts = {"inserted": 0, "updated": 0, "deleted": 0}
 
+        if options is not None:
+            current = {
+                o.id: o
+                for o in db.query(Option).filter(Option.question_id == question_id)
+            }
 
-def update_option(
-    *,
-    option_id: int,
-    text: str,
-    is_correct: bool,
-) -> bool:
-    db = _get_db()
-    try:
-        opt = db.query(Option).filter(Option.id == option_id).first()
-        if not opt:
-            return False
+            keep = {o["id"] for o in options if o.get("id") is not None}
+            unknown = keep - current.keys()
+            if unknown:
+                raise ValueError(f"Options not in question {question_id}: {sorted(unknown)}")
 
-        opt.text = text
-        opt.is_correct = is_correct
-        db.commit()
-        return True
-    finally:
-        db.close()
+            stale = current.keys() - keep
+            if stale:
+                db.query(Option).filter(Option.id.in_(stale)).delete(
+                    synchronize_session=False
+                )
+                counts["deleted"] = len(stale)
 
+            changed = [
+                (current[o["id"]], o)
+                for o in options
+                if o.get("id") is not None
+                and (
+                    current[o["id"]].text != o["text"]
+                    or bool(current[o["id"]].is_correct) != o["is_correct"]
+                )
+            ]
 
-def set_correct_option(
-    *,
-    question_id: int,
-    option_id: int,
-) -> bool:
-    db = _get_db()
-    try:
-        options = (
-            db.query(Option)
-            .filter(Option.question_id == question_id)
-            .all()
-        )
-        if not options:
-            return False
+            # primero desmarcar, luego marcar: el índice único de
+            # correcta no admite dos a la vez dentro del flush
+            for marking in (False, True):
+                for opt, o in changed:
+                    if o["is_correct"] == marking:
+                        opt.text = o["text"]
+                        opt.is_correct = o["is_correct"]
+                db.flush()
 
-        for o in options:
-            o.is_correct = (o.id == option_id)
+            counts["updated"] = len(changed)
 
-        db.commit()
-        return True
-    finally:
-        db.close()
+            new = [
+                {"question_id": question_id, "text": o["text"], "is_correct": o["is_correct"]}
+                for o in options
+                if o.get("id") is None
+            ]
+            if new:
+                db.flush()
+                db.execute(insert(Option), new)
+                counts["inserted"] = len(new)
 
+            _sync_choice_pointer(db, [question_id])
 
-def delete_options_by_question(question_id: int):
-    db = _get_db()
-    try:
-        db.query(Option).filter(
-            Option.question_id == question_id
-        ).delete()
-        db.commit()
+        _touch_question(db, [question_id])
+        _commit_bank_write(db)
+        return counts
+    except IntegrityError:
+        db.rollback()
+        raise
     finally:
         db.close()
 
 
-def delete_option(option_id: int) -> bool:
-    db = _get_db()
-    try:
-        opt = db.query(Option).filter(Option.id == option_id).first()
-        if not opt:
-            return False
-        db.delete(opt)
-        db.commit()
-        return True
-    finally:
-        db.close()
+def save_question_batch(rows: list[dict], update_duplicates: bool = False) -> list[tuple]:
+    """
+    Alta de un lote ya preparado (huella, answer_keys y bandas
+    calculadas fuera) en UNA transacción por shard.
 
+    Cada fila: subcategory_id, statement_text, statement_math,
+    eval_type, answer, alt_answers, answer_keys, tolerance,
+    content_hash, buckets. Un duplicado exacto (en la base o
+    dentro del lote) se omite o, con `update_duplicates`,
+    sobrescribe al existente.
 
-# =====================================================
-# PLAY (SELECCIÓN DE PREGUNTAS)
-# =====================================================
+    Devuelve, en el orden de `rows`, ("created" | "updated" |
+    "skipped", question_id) o ("error", mensaje).
+    """
+    results: list[tuple] = [("error", "Subcategory not found")] * len(rows)
+
+    by_shard: dict[int, list[int]] = {}
+    for i, r in enumerate(rows):
+        by_shard.setdefault(shard_of(r["subcategory_id"]), []).append(i)
+
+    for shard, positions in by_shard.items():
+        if shard not in shard_ids():
+            continue
+        batch = [rows[i] for i in positions]
+        for i, outcome in zip(positions, _save_question_batch_shard(shard, batch, update_duplicates)):
+            results[i] = outcome
+
+    return results
+
+
+def _save_question_batch_shard(shard: int, rows: list[dict], update_duplicates: bool) -> list[tuple]:
+    db = _get_db(shard)
+    try:
+        sub_ids = {r["subcategory_id"] for r in rows}
+        live = set(db.scalars(select(Subcategory.id).where(Subcategory.id.in_(sub_ids))))
+
+        # (subcategoría, huella) → pregunta: las de la base en una
+        # consulta; las nuevas del lote se añaden al insertarlas
+        owners: dict[tuple, int | Question] = {
+            (sub_id, h): qid
+            for qid, sub_id, h in db.execute(
+                select(Question.id, Question.subcategory_id, Question.content_hash)
+                .where(
+                    Question.subcategory_id.in_(live),
+                    Question.content_hash.in_([r["content_hash"] for r in rows if r["content_hash"]]),
+                )
+            )
+        }
+
+        outcomes: list[tuple] = []
+        created: dict[Question, tuple] = {}
+        replaced: dict[int, tuple[dict, tuple]] = {}
+
+        for r in rows:
+            if r["subcategory_id"] not in live:
+                outcomes.append(("error", "Subcategory not found"))
+                continue
+
+            values = {
+                "statement_text": r["statement_text"],
+                "statement_math": r["statement_math"],
+                "eval_type": r["eval_type"],
+                "answer": r["answer"],
+                "alt_answers": dump_alternates(r["alt_answers"]),
+                "answer_keys": r["answer_keys"],
+                "tolerance": r["tolerance"],
+            }
+            key = (r["subcategory_id"], r["content_hash"])
+            owner = owners.get(key) if r["content_hash"] else None
+
+            if owner is None:
+                q = Question(subcategory_id=r["subcategory_id"], content_hash=r["content_hash"], **values)
+                db.add(q)
+                created[q] = r["buckets"]
+                if r["content_hash"]:
+                    owners[key] = q
+                outcomes.append(("created", q))
+
+            elif not update_duplicates:
+                outcomes.append(("skipped", owner))
+
+            elif isinstance(owner, Question):
+                # duplicado de otra fila del lote, aún sin revisión
+                for column, value in values.items():
+                    setattr(owner, column, value)
+                created[owner] = r["buckets"]
+                outcomes.append(("updated", owner))
+
+            else:
+                replaced[owner] = (values, r["buckets"])
+                outcomes.append(("updated", owner))
+
+        db.flush()
+
+        if replaced:
+            db.execute(
+                update(Question),
+                [{"id": qid, **values} for qid, (values, _) in replaced.items()],
+            )
+            _touch_question(db, list(replaced), sync_keys=False)
+            db.query(QuestionBand).filter(
+                QuestionBand.question_id.in_(list(replaced))
+            ).delete(synchronize_session=False)
+
+        bands = [
+            {"question_id": q.id, "band": band, "bucket": bucket}
+            for q, buckets in created.items()
+            for band, bucket in enumerate(buckets)
+        ] + [
+            {"question_id": qid, "band": band, "bucket": bucket}
+            for qid, (_, buckets) in replaced.items()
+            for band, bucket in enumerate(buckets)
+        ]
+        if bands:
+            db.execute(insert(QuestionBand), bands)
+
+        if created:
+            _snapshot_questions(db, [q.id for q in created], sync_keys=False)
+
+        _commit_bank_write(db)
+
+        return [
+            (status, value.id if isinstance(value, Question) else value)
+            for status, value in outcomes
+        ]
+    except IntegrityError as e:
+        # carrera con otra escritura: el lote no se guarda
+        db.rollback()
+        return [("error", str(e.orig))] * len(rows)
+    finally:
+        db.close()
+
+
+def delete_question(question_id: int) -> bool:
+    db = _get_db(shard_of(question_id))
+    try:
+        q = db.query(Question).filter(Question.id == question_id).first()
+        if not q:
+            return False
+        db.delete(q)
+        _commit_bank_write(db)
+        return True
+    finally:
+        db.close()
+
+
+# =====================================================
+# QUESTION (OPERACIONES MASIVAS)
+# =====================================================
+
+def bulk_move_questions(question_ids: list[int], subcategory_id: int) -> dict | None:
+    """
+    Mueve preguntas a otra subcategoría con UN UPDATE.
+    Las que ya tienen un duplicado exacto en el destino
+    (índice único por huella) o viven en otro shard se omiten;
+    las de otro shard se devuelven en `other_shard`.
+    None si la subcategoría destino no existe.
+    """
+    shard = shard_of(subcategory_id)
+    local = [qid for qid in question_ids if shard_of(qid) == shard]
+    other_shard = sorted({qid for qid in question_ids if shard_of(qid) != shard})
+
+    db = _get_db(shard)
+    try:
+        if db.get(Subcategory, subcategory_id) is None:
+            return None
+
+        result = db.execute(
+            update(Question)
+            .prefix_with("OR IGNORE")
+            .where(Question.id.in_(local))
+            .values(subcategory_id=subcategory_id)
+        )
+
+        _commit_bank_write(db)
+        return {
+            "requested": len(set(question_ids)),
+            "moved": result.rowcount,
+            "other_shard": other_shard,
+        }
+    finally:
+        db.close()
+
+
+def _bulk_filter(
+    question_ids: list[int] | None,
+    subcategory_id: int | None,
+    eval_type: str | None,
+) -> list:
+    conditions = []
+
+    if question_ids is not None:
+        conditions.append(Question.id.in_(question_ids))
+    if subcategory_id is not None:
+        conditions.append(Question.subcategory_id == subcategory_id)
+    if eval_type is not None:
+        conditions.append(Question.eval_type == eval_type)
+
+    return conditions
+
+
+def bulk_delete_questions(
+    *,
+    question_ids: list[int] | None = None,
+    subcategory_id: int | None = None,
+    eval_type: str | None = None,
+) -> dict:
+    """
+    Borra por lista de ids y/o filtro en UNA transacción por
+    shard. Alternativas y datos derivados (bandas, estadísticas,
+    estado de repaso) caen por ON DELETE CASCADE.
+    """
+    if not _bulk_filter(question_ids, subcategory_id, eval_type):
+        raise ValueError("Bulk delete requires ids or a filter")
+
+    if subcategory_id is not None:
+        shards = {shard_of(subcategory_id): question_ids}
+    elif question_ids is not None:
+        shards = _by_shard(question_ids)
+    else:
+        shards = dict.fromkeys(shard_ids())
+
+    counts = {"deleted": 0, "options_deleted": 0}
+
+    for shard, ids in shards.items():
+        conditions = _bulk_filter(ids, subcategory_id, eval_type)
+
+        db = _get_db(shard)
+        try:
+            targets = select(Question.id).where(*conditions).scalar_subquery()
+
+            counts["options_deleted"] += db.execute(
+                select(func.count(Option.id)).where(Option.question_id.in_(targets))
+            ).scalar()
+
+            counts["deleted"] += db.execute(
+                Question.__table__.delete().where(*conditions)
+            ).rowcount
+
+            _commit_bank_write(db)
+        finally:
+            db.close()
+
+    return counts
+
+
+def bulk_retype_questions(question_ids: list[int], eval_type: str) -> dict:
+    """
+    Cambia eval_type en UNA transacción por shard. Solo entre
+    tipos de respuesta directa: CHOICE (origen o destino)
+    necesita alternativas y no se puede convertir en bloque.
+    La tolerancia se conserva solo si el destino es NUMERIC.
+
+    La huella y las respuestas aceptadas dependen del tipo y se
+    recalculan. Una pregunta que pasaría a ser duplicado exacto
+    de otra de su subcategoría no se cambia y va a `errors`.
+    """
+    if eval_type == "CHOICE":
+        raise ValueError("Cannot bulk-retype to CHOICE")
+
+    values = {"eval_type": eval_type}
+    if eval_type != "NUMERIC":
+        values["tolerance"] = None
+
+    retyped = 0
+    errors: list[str] = []
+
+    for shard, ids in _by_shard(question_ids).items():
+        db = _get_db(shard)
+        try:
+            rows = db.execute(
+                select(
+                    Question.id,
+                    Question.subcategory_id,
+                    Question.statement_text,
+                    Question.statement_math,
+                    Question.answer,
+                )
+                .where(
+                    Question.id.in_(ids),
+                    Question.eval_type != "CHOICE",
+                )
+                .order_by(Question.id)
+            ).all()
+
+            hashes = {
+                qid: (sub_id, compute_content_hash(st_text, st_math, eval_type, answer))
+                for qid, sub_id, st_text, st_math, answer in rows
+            }
+
+            # dueños actuales de esas huellas fuera del lote
+            taken = {
+                (sub_id, h): qid
+                for qid, sub_id, h in db.execute(
+                    select(Question.id, Question.subcategory_id, Question.content_hash)
+                    .where(
+                        Question.content_hash.in_([h for _, h in hashes.values()]),
+                        Question.id.not_in(list(hashes)),
+                    )
+                )
+            }
+
+            updates = []
+            for qid, key in hashes.items():
+                owner = taken.setdefault(key, qid)
+                if owner != qid:
+                    errors.append(f"Question {qid}: duplicate of question {owner}")
+                    continue
+                updates.append({"id": qid, "content_hash": key[1], **values})
+
+            if updates:
+                targets = [u["id"] for u in updates]
+                db.execute(update(Question), updates)
+                _sync_answer_keys(db, targets)
+                _touch_question(db, targets)
+
+            _commit_bank_write(db)
+            retyped += len(updates)
+        finally:
+            db.close()
+
+    return {
+        "requested": len(set(question_ids)),
+        "retyped": retyped,
+        "errors": errors,
+    }
+
+
+# =====================================================
+# OPTIONS
+# =====================================================
+
+def _sync_choice_pointer(db: Session, question_ids: list[int]):
+    """
+    Recalcula correct_option_id y option_count desde options
+    (un UPDATE correlacionado, en la misma transacción).
+    """
+    db.flush()
+    db.execute(
+        update(Question)
+        .where(Question.id.in_(question_ids))
+        .values(
+            option_count=(
+                select(func.count(Option.id))
+                .where(Option.question_id == Question.id)
+                .scalar_subquery()
+            ),
+            correct_option_id=(
+                select(Option.id)
+                .where(Option.question_id == Question.id, Option.is_correct.is_(True))
+                .scalar_subquery()
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _clear_correct_option(db: Session, question_id: int):
+    """
+    Desmarca la correcta actual antes de marcar otra
+    (índice único parcial: una correcta por pregunta).
+    """
+    db.query(Option).filter(
+        Option.question_id == question_id,
+        Option.is_correct.is_(True),
+    ).update({Option.is_correct: False}, synchronize_session="fetch")
+    db.flush()
+
+
+def create_option(
+    *,
+    question_id: int,
+    text: str,
+    is_correct: bool = False,
+) -> int:
+    db = _get_db(shard_of(question_id))
+    try:
+        if is_correct:
+            _clear_correct_option(db, question_id)
+
+        opt = Option(
+            question_id=question_id,
+            text=text,
+            is_correct=is_correct,
+        )
+        db.add(opt)
+        _sync_choice_pointer(db, [question_id])
+        _touch_question(db, [question_id])
+        _commit_bank_write(db)
+        return opt.id
+    finally:
+        db.close()
+
+
+def update_option(
+    *,
+    option_id: int,
+    text: str,
+    is_correct: bool,
+) -> bool:
+    db = _get_db(shard_of(option_id))
+    try:
+        opt = db.query(Option).filter(Option.id == option_id).first()
+        if not opt:
+            return False
+
+        if is_correct and not opt.is_correct:
+            _clear_correct_option(db, opt.question_id)
+
+        opt.text = text
+        opt.is_correct = is_correct
+        _sync_choice_pointer(db, [opt.question_id])
+        _touch_question(db, [opt.question_id])
+        _commit_bank_write(db)
+        return True
+    finally:
+        db.close()
+
+
+def set_correct_option(
+    *,
+    question_id: int,
+    option_id: int,
+) -> bool:
+    db = _get_db(shard_of(question_id))
+    try:
+        exists = (
+            db.query(Option.id)
+            .filter(Option.question_id == question_id)
+            .first()
+        )
+        if not exists:
+            return False
+
+        _clear_correct_option(db, question_id)
+
+        db.query(Option).filter(
+            Option.id == option_id,
+            Option.question_id == question_id,
+        ).update({Option.is_correct: True}, synchronize_session=False)
+
+        _sync_choice_pointer(db, [question_id])
+        _touch_question(db, [question_id])
+        _commit_bank_write(db)
+        return True
+    finally:
+        db.close()
+
+
+def delete_options_by_question(question_id: int):
+    db = _get_db(shard_of(question_id))
+    try:
+        db.query(Option).filter(
+            Option.question_id == question_id
+        ).delete()
+        _sync_choice_pointer(db, [question_id])
+        _touch_question(db, [question_id])
+        _commit_bank_write(db)
+    finally:
+        db.close()
+
+
+def delete_option(option_id: int) -> bool:
+    db = _get_db(shard_of(option_id))
+    try:
+        opt = db.query(Option).filter(Option.id == option_id).first()
+        if not opt:
+            return False
+        question_id = opt.question_id
+        db.delete(opt)
+        _sync_choice_pointer(db, [question_id])
+        _touch_question(db, [question_id])
+        _commit_bank_write(db)
+        return True
+    finally:
+        db.close()
+
+
+# =====================================================
+# PLAY (SELECCIÓN DE PREGUNTAS)
+# =====================================================
 
 def get_playable_questions(subcategory_id: int, limit: int | None = None):
     """
@@ -321,25 +1180,17 @@ def get_playable_questions(subcategory_id: int, limit: int | None = None):
 
     El orden es aleatorio REAL.
     """
-    db = _get_db()
+    db = _get_db(shard_of(subcategory_id))
     try:
-        questions = (
+        playable: list[Question] = (
             db.query(Question)
-            .options(joinedload(Question.options))
-            .filter(Question.subcategory_id == subcategory_id)
+            .filter(
+                Question.subcategory_id == subcategory_id,
+                _playable_clause(),
+            )
             .all()
         )
 
-        playable: list[Question] = []
-
-        for q in questions:
-            if q.eval_type == "CHOICE":
-                options = q.options or []
-                correct = [o for o in options if o.is_correct]
-                if len(options) < 2 or len(correct) != 1:
-                    continue
-            playable.append(q)
-
         # Aleatoriedad REAL
         random.shuffle(playable)
 
@@ -348,4 +1199,725 @@ def get_playable_questions(subcategory_id: int, limit: int | None = None):
 
         return playable
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _playable_clause():
+    """
+    Regla de jugabilidad en SQL:
+    CHOICE → ≥2 opciones y exactamente 1 correcta.
+    Lee solo la fila de la pregunta (puntero desnormalizado;
+    el índice único garantiza que no hay más de una correcta).
+    """
+    return or_(
+        Question.eval_type != "CHOICE",
+        and_(
+            Question.option_count >= 2,
+            Question.correct_option_id.is_not(None),
+        ),
+    )
+
+
+def sample_playable_questions(quotas: dict[int, int | None]) -> list[tuple[int, int]]:
+    """
+    Muestreo estratificado en UNA consulta por shard:
+    rango aleatorio particionado por subcategoría y corte por
+    cuota (None = todas). Devuelve [(question_id, subcategory_id)].
+    """
+    sampled: list[tuple[int, int]] = []
+
+    for shard, sub_ids in _by_shard(quotas).items():
+        sampled.extend(
+            _sample_shard(shard, {sid: quotas[sid] for sid in sub_ids})
+        )
+
+    return sampled
+
+
+def _sample_shard(shard: int, quotas: dict[int, int | None]) -> list[tuple[int, int]]:
+    rank = func.row_number().over(
+        partition_by=Question.subcategory_id,
+        order_by=func.random(),
+    )
+
+    ranked = (
+        select(
+            Question.id.label("id"),
+            Question.subcategory_id.label("subcategory_id"),
+            rank.label("rn"),
+        )
+        .where(
+            Question.subcategory_id.in_(list(quotas)),
+            _playable_clause(),
+        )
+        .subquery()
+    )
+
+    quota = case(
+        {sid: (n if n is not None else 2**31 - 1) for sid, n in quotas.items()},
+        value=ranked.c.subcategory_id,
+    )
+
+    db = _get_db(shard)
+    try:
+        return [
+            (r.id, r.subcategory_id)
+            for r in db.execute(
+                select(ranked.c.id, ranked.c.subcategory_id)
+                .where(ranked.c.rn <= quota)
+            )
+        ]
+    finally:
+        db.close()
+
+
+def get_playable_question_ids(subcategory_ids: list[int]) -> dict[int, list[int]]:
+    """
+    Ids jugables por subcategoría (una consulta, sin ORM),
+    ordenados por id para que el muestreo con semilla sea
+    reproducible.
+    """
+    pool: dict[int, list[int]] = {}
+
+    for shard, sub_ids in _by_shard(subcategory_ids).items():
+        db = _get_db(shard)
+        try:
+            rows = db.execute(
+                select(Question.id, Question.subcategory_id)
+                .where(
+                    Question.subcategory_id.in_(sub_ids),
+                    _playable_clause(),
+                )
+                .order_by(Question.id)
+            )
+
+            for qid, sid in rows:
+                pool.setdefault(sid, []).append(qid)
+        finally:
+            db.close()
+
+    return pool
+
+
+def get_current_revisions(subcategory_id: int) -> list[QuestionRevision]:
+    """
+    Revisión vigente de cada pregunta jugable de la subcategoría
+    (lo que se exporta para examen sin conexión).
+    """
+    db = _get_db(shard_of(subcategory_id))
+    try:
+        return (
+            db.query(QuestionRevision)
+            .join(Question, Question.current_revision_id == QuestionRevision.id)
+            .filter(
+                Question.subcategory_id == subcategory_id,
+                _playable_clause(),
+            )
+            .order_by(Question.id)
+            .all()
+        )
+    finally:
+        db.close()
+
+
+def get_hot_subcategory_ids(limit: int = 20) -> list[int]:
+    """
+    Subcategorías con más intentos registrados (question_stats),
+    de todos los shards.
+    """
+    totals: list[tuple[int, int]] = []
+
+    for shard in shard_ids():
+        db = _get_db(shard)
+        try:
+            totals.extend(
+                db.execute(
+                    select(Question.subcategory_id, func.sum(QuestionStats.attempts))
+                    .join(Question, Question.id == QuestionStats.question_id)
+                    .group_by(Question.subcategory_id)
+                    .order_by(func.sum(QuestionStats.attempts).desc())
+                    .limit(limit)
+                ).all()
+            )
+        finally:
+            db.close()
+
+    totals.sort(key=lambda t: -t[1])
+    return [sid for sid, _ in totals[:limit]]
+
+
+def preload_subcategory(subcategory_id: int) -> int:
+    """
+    Lee de una vez lo que toca jugar una subcategoría (preguntas,
+    alternativas y revisiones vigentes) para que sus páginas
+    estén en caché antes del primer estudiante.
+    """
+    db = _get_db(shard_of(subcategory_id))
+    try:
+        ids = db.scalars(
+            select(Question.id).where(Question.subcategory_id == subcategory_id)
+        ).all()
+
+        if ids:
+            db.query(Question).options(joinedload(Question.options)).filter(
+                Question.id.in_(ids)
+            ).all()
+            db.query(QuestionRevision).join(
+                Question, Question.current_revision_id == QuestionRevision.id
+            ).filter(Question.subcategory_id == subcategory_id).all()
+
+        return len(ids)
+    finally:
+        db.close()
+
+
+# =====================================================
+# EXAM FORMS (FORMULARIOS PREGENERADOS)
+# =====================================================
+
+def _pack_ids(ids: list[int]) -> bytes:
+    packed = array("q", ids)
+    if packed.itemsize != 8:
+        raise RuntimeError("int64 array expected")
+    return packed.tobytes()
+
+
+def _unpack_ids(data: bytes) -> list[int]:
+    return array("q", data).tolist()
+
+
+def save_exam_forms(spec_key: str, forms: list[tuple[int, list[int]]]) -> list[int]:
+    """
+    Guarda [(seed, question_ids)] como formularios activos de la
+    especificación y desactiva los anteriores (una transacción).
+    """
+    db = _get_db()
+    try:
+        db.query(ExamForm).filter(
+            ExamForm.spec_key == spec_key,
+            ExamForm.active.is_(True),
+        ).update({"active": False})
+
+        now = time.time()
+        rows = [
+            ExamForm(
+                spec_key=spec_key,
+                seed=seed,
+                question_ids=_pack_ids(ids),
+                active=True,
+                created_at=now,
+            )
+            for seed, ids in forms
+        ]
+        db.add_all(rows)
+        db.commit()
+        return [r.id for r in rows]
+    finally:
+        db.close()
+
+
+def get_active_exam_forms(spec_key: str | None = None) -> list[tuple[int, list[int]]]:
+    """
+    Formularios activos de una especificación (None: de todas).
+    """
+    db = _get_db()
+    try:
+        q = db.query(ExamForm.id, ExamForm.question_ids).filter(ExamForm.active.is_(True))
+        if spec_key is not None:
+            q = q.filter(ExamForm.spec_key == spec_key)
+
+        rows = q.order_by(ExamForm.id).all()
+        return [(fid, _unpack_ids(data)) for fid, data in rows]
+    finally:
+        db.close()
+
+
+def deactivate_exam_forms(form_ids: list[int]) -> int:
+    if not form_ids:
+        return 0
+
+    db = _get_db()
+    try:
+        count = db.query(ExamForm).filter(
+            ExamForm.id.in_(form_ids),
+            ExamForm.active.is_(True),
+        ).update({"active": False}, synchronize_session=False)
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def get_exam_form(form_id: int) -> dict | None:
+    db = _get_db()
+    try:
+        f = db.query(ExamForm).filter(ExamForm.id == form_id).first()
+        if not f:
+            return None
+        return {
+            "id": f.id,
+            "spec_key": f.spec_key,
+            "seed": f.seed,
+            "active": f.active,
+            "created_at": f.created_at,
+            "question_ids": _unpack_ids(f.question_ids),
+        }
+    finally:
+        db.close()
+
+
+# =====================================================
+# ITEM STATE (REPASO ESPACIADO)
+# =====================================================
+
+def get_item_states(student_id: str, subcategory_id: int) -> list[ItemState]:
+    """
+    Estados de repaso de un estudiante para una subcategoría
+    (una sola consulta, sin cargar las preguntas).
+    """
+    db = _get_db(shard_of(subcategory_id))
+    try:
+        return (
+            db.query(ItemState)
+            .join(Question, Question.id == ItemState.question_id)
+            .filter(
+                ItemState.student_id == student_id,
+                Question.subcategory_id == subcategory_id,
+            )
+            .all()
+        )
+    finally:
+        db.close()
+
+
+def save_item_state(
+    *,
+    student_id: str,
+    question_id: int,
+    ease: float,
+    interval: float,
+    repetitions: int,
+    lapses: int,
+    due_at: float,
+):
+    """
+    Upsert del estado de repaso (una sola sentencia).
+    """
+    values = {
+        "ease": ease,
+        "interval": interval,
+        "repetitions": repetitions,
+        "lapses": lapses,
+        "due_at": due_at,
+    }
+
+    stmt = sqlite_insert(ItemState).values(
+        student_id=student_id,
+        question_id=question_id,
+        **values,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ItemState.student_id, ItemState.question_id],
+        set_=values,
+    )
+
+    db = _get_db(shard_of(question_id))
+    try:
+        db.execute(stmt)
+        db.commit()
+    finally:
+        db.close()
+
+
+# =====================================================
+# ATTEMPTS (HISTORIAL)
+# =====================================================
+
+def save_attempts(rows: list[dict], stats: dict | None = None, top_k: int = 10) -> int:
+    """
+    Inserta un lote de intentos en UNA transacción
+    (executemany, un solo commit).
+
+    `stats` son los deltas por pregunta acumulados en memoria
+    ({question_id: delta}); se suman a question_stats en la
+    misma transacción.
+
+    Con shards hay un lote por shard. Si alguno falla, los demás
+    quedan guardados y UnsavedAttemptsError lleva lo pendiente.
+    """
+    if not rows and not stats:
+        return 0
+
+    stats = stats or {}
+
+    groups: dict[int, tuple[list, dict]] = {}
+    for r in rows:
+        groups.setdefault(shard_of(r["question_id"]), ([], {}))[0].append(r)
+    for qid, delta in stats.items():
+        groups.setdefault(shard_of(qid), ([], {}))[1][qid] = delta
+
+    saved = 0
+    unsaved_rows: list[dict] = []
+    unsaved_stats: dict = {}
+
+    for shard, (shard_rows, shard_stats) in groups.items():
+        try:
+            saved += _save_attempts_shard(shard, shard_rows, shard_stats, top_k)
+        except Exception:
+            unsaved_rows.extend(shard_rows)
+            unsaved_stats.update(shard_stats)
+
+    if unsaved_rows or unsaved_stats:
+        raise UnsavedAttemptsError(unsaved_rows, unsaved_stats)
+
+    return saved
+
+
+def _save_attempts_shard(shard: int, rows: list[dict], stats: dict, top_k: int) -> int:
+    db = _get_db(shard)
+    try:
+        # Preguntas borradas mientras el lote esperaba en memoria:
+        # sus filas violarían la FK y bloquearían todo el lote
+        qids = {r["question_id"] for r in rows} | set(stats)
+        live = set(db.scalars(select(Question.id).where(Question.id.in_(qids))))
+
+        rows = [r for r in rows if r["question_id"] in live]
+        stats = {qid: d for qid, d in stats.items() if qid in live}
+
+        if rows:
+            db.execute(insert(Attempt), rows)
+
+        if stats:
+            _merge_question_stats(db, stats, top_k)
+
+        db.commit()
+        return len(rows)
+    finally:
+        db.close()
+
+
+def _merge_question_stats(db: Session, stats: dict, top_k: int):
+    current = {
+        s.question_id: s
+        for s in (
+            db.query(QuestionStats)
+            .filter(QuestionStats.question_id.in_(list(stats)))
+            .all()
+        )
+    }
+
+    now = time.time()
+
+    for qid, delta in stats.items():
+        row = current.get(qid)
+
+        if row is None:
+            row = QuestionStats(
+                question_id=qid,
+                attempts=0,
+                correct=0,
+                time_sum_ms=0,
+                timed=0,
+                wrong_answers="{}",
+            )
+            db.add(row)
+
+        row.attempts += delta.attempts
+        row.correct += delta.correct
+        row.time_sum_ms += delta.time_sum_ms
+        row.timed += delta.timed
+        row.wrong_answers = json.dumps(
+            space_saving_merge(
+                json.loads(row.wrong_answers or "{}"),
+                delta.wrong_answers,
+                top_k,
+            ),
+            ensure_ascii=False,
+        )
+        row.updated_at = now
+
+
+def get_question_stats(
+    subcategory_id: int | None = None,
+    limit: int = 50,
+    offset: int = 0,
+):
+    """
+    Estadísticas por pregunta, de menor a mayor tasa de acierto
+    (las preguntas “rotas” primero). Lee solo question_stats.
+    Sin subcategoría recorre todos los shards (adjuntos) y mezcla.
+    """
+    rate = QuestionStats.correct * 1.0 / QuestionStats.attempts
+
+    def page(db: Session, schema: str | None, first: int, count: int):
+        q = (
+            db.query(QuestionStats, Question)
+            .join(Question, Question.id == QuestionStats.question_id)
+            .filter(QuestionStats.attempts > 0)
+        )
+
+        if subcategory_id is not None:
+            q = q.filter(Question.subcategory_id == subcategory_id)
+        if schema is not None:
+            q = q.execution_options(schema_translate_map={None: schema})
+
+        return (
+            q.order_by(rate, QuestionStats.attempts.desc())
+            .offset(first)
+            .limit(count)
+            .all()
+        )
+
+    if subcategory_id is not None:
+        db = _get_db(shard_of(subcategory_id))
+        try:
+            return page(db, None, offset, limit)
+        finally:
+            db.close()
+
+    with attached_session() as (db, schemas):
+        rows = [
+            row
+            for schema in schemas.values()
+            for row in page(db, schema, 0, offset + limit)
+        ]
+
+    rows.sort(key=lambda r: (r[0].correct / r[0].attempts, -r[0].attempts))
+    return rows[offset:offset + limit]
+
+
+def iter_wrong_attempts(
+    subcategory_id: int | None = None,
+    question_id: int | None = None,
+    chunk_size: int = 5000,
+):
+    """
+    Respuestas incorrectas del historial, por trozos de
+    `chunk_size` filas (paginación por id, una sesión corta por
+    trozo). Cada trozo: [(question_id, eval_type, user_answer)].
+    """
+    if question_id is not None:
+        shards = [shard_of(question_id)]
+    elif subcategory_id is not None:
+        shards = [shard_of(subcategory_id)]
+    else:
+        shards = shard_ids()
+
+    for shard in shards:
+        last_id = 0
+
+        while True:
+            stmt = (
+                select(Attempt.id, Attempt.question_id, Question.eval_type, Attempt.user_answer)
+                .join(Question, Question.id == Attempt.question_id)
+                .where(Attempt.correct.is_(False), Attempt.id > last_id)
+                .order_by(Attempt.id)
+                .limit(chunk_size)
+            )
+
+            if question_id is not None:
+                stmt = stmt.where(Attempt.question_id == question_id)
+            if subcategory_id is not None:
+                stmt = stmt.where(Question.subcategory_id == subcategory_id)
+
+            db = _get_db(shard)
+            try:
+                rows = db.execute(stmt).all()
+            finally:
+                db.close()
+
+            if not rows:
+                break
+
+            last_id = rows[-1][0]
+            yield [(qid, et, answer) for _, qid, et, answer in rows]
+
+
+# =====================================================
+# BÚSQUEDA (FTS5)
+# =====================================================
+
+def _fts_query(raw: str) -> str | None:
+    """
+    Convierte texto libre en una consulta FTS5 segura:
+    cada término entre comillas y como prefijo (AND implícito).
+    """
+    terms = re.findall(r"\w+", raw or "")
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def search_questions(query: str, limit: int = 20, offset: int = 0) -> list[dict]:
+    """
+    Búsqueda indexada y ordenada por relevancia (bm25).
+    Cada shard tiene su índice; se consultan adjuntos y se
+    mezclan por puntuación.
+    """
+    match = _fts_query(query)
+    if match is None:
+        return []
+
+    results: list[dict] = []
+
+    with attached_session() as (db, schemas):
+        for schema in schemas.values():
+            rows = db.execute(
+                text(f"""
+                    SELECT q.id,
+                           q.subcategory_id,
+                           q.eval_type,
+                           q.statement_text,
+                           q.statement_math,
+                           snippet(question_fts, -1, '[', ']', '…', 12) AS snippet,
+                           bm25(question_fts) AS score
+                    FROM {schema}.question_fts
+                    JOIN {schema}.questions q ON q.id = question_fts.rowid
+                    WHERE question_fts MATCH :match
+                    ORDER BY rank
+                    LIMIT :limit
+                """),
+                {"match": match, "limit": offset + limit},
+            )
+            results.extend(dict(r._mapping) for r in rows)
+
+    results.sort(key=lambda r: r["score"])
+    return results[offset:offset + limit]
+
+
+# =====================================================
+# CASI-DUPLICADOS (LSH)
+# =====================================================
+
+def save_question_bands(question_id: int, buckets: list[int]):
+    db = _get_db(shard_of(question_id))
+    try:
+        db.query(QuestionBand).filter(
+            QuestionBand.question_id == question_id
+        ).delete()
+
+        if buckets:
+            db.execute(
+                insert(QuestionBand),
+                [
+                    {"question_id": question_id, "band": band, "bucket": bucket}
+                    for band, bucket in enumerate(buckets)
+                ],
+            )
+
+        db.commit()
+    finally:
+        db.close()
+
+
+def find_band_candidates(
+    subcategory_id: int,
+    buckets: list[int],
+    exclude_id: int | None = None,
+) -> list[tuple[int, str | None, str | None]]:
+    """
+    Preguntas de la subcategoría que comparten al menos una
+    banda LSH. Consulta indexada (band, bucket), sin pares.
+    """
+    if not buckets:
+        return []
+
+    db = _get_db(shard_of(subcategory_id))
+    try:
+        conditions = [
+            (QuestionBand.band == band) & (QuestionBand.bucket == bucket)
+            for band, bucket in enumerate(buckets)
+        ]
+
+        q = (
+            db.query(Question.id, Question.statement_text, Question.statement_math)
+            .join(QuestionBand, QuestionBand.question_id == Question.id)
+            .filter(Question.subcategory_id == subcategory_id)
+            .filter(or_(*conditions))
+            .distinct()
+        )
+
+        if exclude_id is not None:
+            q = q.filter(Question.id != exclude_id)
+
+        return q.all()
+    finally:
+        db.close()
+
+
+# =====================================================
+# IRT (PARÁMETROS 2PL)
+# =====================================================
+
+def get_calibration_responses(subcategory_id: int) -> list[tuple[str, int, bool]]:
+    """
+    (student_id, question_id, correct) de la PRIMERA respuesta de
+    cada estudiante a cada pregunta de la subcategoría: los
+    reintentos de práctica no miden lo mismo.
+    """
+    db = _get_db(shard_of(subcategory_id))
+    try:
+        first = (
+            select(func.min(Attempt.id))
+            .join(Question, Question.id == Attempt.question_id)
+            .where(
+                Question.subcategory_id == subcategory_id,
+                Attempt.student_id.is_not(None),
+                Attempt.correct.is_not(None),
+            )
+            .group_by(Attempt.student_id, Attempt.question_id)
+        )
+
+        return db.execute(
+            select(Attempt.student_id, Attempt.question_id, Attempt.correct)
+            .where(Attempt.id.in_(first))
+        ).all()
+    finally:
+        db.close()
+
+
+def save_item_params(subcategory_id: int, params: list[dict]):
+    """
+    Upsert de parámetros calibrados. No es una escritura de
+    contenido: no sube la versión del banco.
+    """
+    if not params:
+        return
+
+    stmt = sqlite_insert(ItemParams)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ItemParams.question_id],
+        set_={
+            "a": stmt.excluded.a,
+            "b": stmt.excluded.b,
+            "responses": stmt.excluded.responses,
+            "calibrated_at": stmt.excluded.calibrated_at,
+        },
+    )
+
+    db = _get_db(shard_of(subcategory_id))
+    try:
+        db.execute(stmt, params)
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_item_bank(subcategory_id: int) -> list[tuple[int, float | None, float | None]]:
+    """
+    (id, a, b) de las preguntas jugables; a/b = None si la
+    pregunta aún no está calibrada.
+    """
+    db = _get_db(shard_of(subcategory_id))
+    try:
+        return db.execute(
+            select(Question.id, ItemParams.a, ItemParams.b)
+            .outerjoin(ItemParams, ItemParams.question_id == Question.id)
+            .where(
+                Question.subcategory_id == subcategory_id,
+                _playable_clause(),
+            )
+            .order_by(Question.id)
+        ).all()
+    finally:
+        db.close()
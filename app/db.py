@@ -1,5 +1,11 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.schema import CreateTable
 
 # =========================
 # CONFIGURACIÓN
@@ -7,10 +13,29 @@ from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = "sqlite:///./data.db"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+# Categorías grandes pueden vivir en su propio archivo SQLite
+# (shard): una importación masiva en una no bloquea las demás
+SHARD_DIR = "./shards"
+
+
+def _enable_foreign_keys(dbapi_conn, _record):
+    # SQLite no aplica FOREIGN KEY / ON DELETE CASCADE si no se
+    # activa en CADA conexión
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA foreign_keys = ON")
+    cursor.close()
+
+
+def _create_engine(url: str):
+    eng = create_engine(
+        url,
+        connect_args={"check_same_thread": False}
+    )
+    event.listen(eng, "connect", _enable_foreign_keys)
+    return eng
+
+
+engine = _create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -21,13 +46,567 @@ SessionLocal = sessionmaker(
 Base = declarative_base()
 
 
+# =========================
+# SHARDS
+# =========================
+
+# Los ids llevan el shard en los bits altos: id >> 32 = shard.
+# Cada shard siembra sqlite_sequence con su base, así que
+# cualquier id (subcategoría, pregunta, alternativa, revisión)
+# basta para enrutar. El shard 0 es data.db.
+
+SHARD_BITS = 32
+
+# attached_session adjunta todos los shards a data.db en una
+# conexión, y SQLite admite como mucho SQLITE_MAX_ATTACHED (10
+# por defecto) bases adjuntas
+MAX_SHARDS = 10
+
+# tablas cuyos ids deben ser globales entre shards
+_SHARDED_ID_TABLES = ("subcategories", "questions", "options", "question_revisions")
+
+_shard_engines = {0: engine}
+_shard_sessions = {0: SessionLocal}
+_shard_lock = threading.Lock()
+
+
+class UnknownShardError(LookupError):
+    """
+    Id cuyos bits altos no nombran un shard abierto: para la
+    aplicación equivale a "no encontrado".
+    """
+
+
+def shard_of(entity_id: int) -> int:
+    return entity_id >> SHARD_BITS
+
+
+def shard_path(shard: int) -> str:
+    return os.path.join(SHARD_DIR, f"shard_{shard}.db")
+
+
+def shard_ids() -> list[int]:
+    with _shard_lock:
+        return sorted(_shard_engines)
+
+
+def init_shard(shard: int):
+    """
+    Abre (y crea si hace falta) el archivo de un shard con el
+    esquema completo. Idempotente.
+    """
+    if shard < 0:
+        raise ValueError("Invalid shard")
+
+    with _shard_lock:
+        if shard in _shard_engines:
+            return
+        if len(_shard_engines) - 1 >= MAX_SHARDS:
+            raise ValueError(f"At most {MAX_SHARDS} shards")
+
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    eng = _create_engine(f"sqlite:///{shard_path(shard)}")
+    _init_schema(eng, base_id=shard << SHARD_BITS)
+
+    with _shard_lock:
+        if shard not in _shard_engines:
+            _shard_engines[shard] = eng
+            _shard_sessions[shard] = sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                bind=eng,
+            )
+
+
+def get_shard_session(shard: int = 0) -> Session:
+    with _shard_lock:
+        factory = _shard_sessions.get(shard)
+
+    if factory is None:
+        raise UnknownShardError(f"Unknown shard: {shard}")
+
+    return factory(info={"shard": shard})
+
+
+@contextmanager
+def attached_session():
+    """
+    Sesión sobre data.db con todos los shards adjuntos (ATTACH):
+    lecturas entre shards en UNA conexión y una sola instantánea.
+    Produce (sesión, {shard: esquema}).
+    """
+    schemas = {0: "main"}
+
+    with engine.connect() as conn:
+        for shard in shard_ids():
+            if shard == 0:
+                continue
+            schemas[shard] = f"shard_{shard}"
+            conn.exec_driver_sql(
+                f"ATTACH DATABASE ? AS {schemas[shard]}",
+                (os.path.abspath(shard_path(shard)),),
+            )
+
+        db = Session(bind=conn, autoflush=False)
+        try:
+            yield db, schemas
+        finally:
+            db.close()
+            conn.rollback()
+            for shard, schema in schemas.items():
+                if shard != 0:
+                    conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+
+
 # =========================
 # INIT DB
 # =========================
 
 def init_db():
-    from app.models import Category, Subcategory, Question
-    Base.metadata.create_all(bind=engine)
+    from app.models import (
+        Category,
+        Subcategory,
+        Question,
+        Option,
+        ItemState,
+        Attempt,
+        QuestionStats,
+        QuestionBand,
+        BankMeta,
+        ExamForm,
+        QuestionRevision,
+    )
+
+    _init_schema(engine)
+
+    with engine.connect() as conn:
+        shards = [
+            r[0] for r in conn.exec_driver_sql(
+                "SELECT DISTINCT shard FROM categories WHERE shard > 0"
+            )
+        ]
+
+    for shard in shards:
+        init_shard(shard)
+
+
+def _init_schema(eng, base_id: int = 0):
+    _run_migrations(eng)
+
+    Base.metadata.create_all(bind=eng)
+
+    with eng.begin() as conn:
+        _init_search_index(conn)
+
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO bank_meta (id, version, updated_at) "
+            "VALUES (1, 1, ?)",
+            (time.time(),),
+        )
+
+        if base_id:
+            # Los ids de este shard empiezan en su base
+            for table in _SHARDED_ID_TABLES:
+                conn.exec_driver_sql(
+                    "INSERT INTO sqlite_sequence (name, seq) "
+                    "SELECT ?, ? WHERE NOT EXISTS "
+                    "(SELECT 1 FROM sqlite_sequence WHERE name = ?)",
+                    (table, base_id, table),
+                )
+
+
+# =========================
+# MIGRACIONES
+# =========================
+
+# create_all solo crea tablas NUEVAS. Los cambios sobre tablas
+# existentes viven aquí, en orden, y se aplican una sola vez
+# (PRAGMA user_version). Cada paso es idempotente: en una DB
+# nueva las tablas aún no existen y el paso no hace nada.
+
+def _has_table(conn, table: str) -> bool:
+    return conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (table,),
+    ).first() is not None
+
+
+def _has_column(conn, table: str, column: str) -> bool:
+    rows = conn.exec_driver_sql(f"PRAGMA table_info({table})")
+    return any(r[1] == column for r in rows)
+
+
+def _add_column(conn, table: str, column: str):
+    """
+    ALTER TABLE ADD COLUMN a partir de la definición del modelo.
+    """
+    if not _has_table(conn, table) or _has_column(conn, table, column):
+        return
+
+    col = Base.metadata.tables[table].c[column]
+    ddl = f"{column} {col.type.compile(dialect=conn.dialect)}"
+
+    if col.server_default is not None:
+        ddl += f" DEFAULT {col.server_default.arg}"
+
+    conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {ddl}")
+
+
+def _create_indexes(conn, table: str):
+    if not _has_table(conn, table):
+        return
+
+    for index in Base.metadata.tables[table].indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _rebuild_table(conn, table: str):
+    """
+    Reconstrucción de tabla de SQLite (CREATE nueva, copiar,
+    DROP, RENAME) para cambios que ALTER TABLE no admite,
+    como las cláusulas ON DELETE. Requiere foreign_keys = OFF.
+    Los triggers de la tabla se pierden: los de búsqueda se
+    recrean en _init_search_index.
+    """
+    model = Base.metadata.tables[table]
+    tmp = f"{table}__new"
+
+    ddl = str(CreateTable(model).compile(dialect=conn.dialect))
+    conn.exec_driver_sql(ddl.replace(f"CREATE TABLE {table} ", f"CREATE TABLE {tmp} ", 1))
+
+    existing = [r[1] for r in conn.exec_driver_sql(f"PRAGMA table_info({table})")]
+    columns = ", ".join(c for c in existing if c in model.c)
+
+    conn.exec_driver_sql(f"INSERT INTO {tmp} ({columns}) SELECT {columns} FROM {table}")
+    conn.exec_driver_sql(f"DROP TABLE {table}")
+    conn.exec_driver_sql(f"ALTER TABLE {tmp} RENAME TO {table}")
+
+    _create_indexes(conn, table)
+
+
+def _fk_on_delete(conn, table: str) -> set[str]:
+    rows = conn.exec_driver_sql(f"PRAGMA foreign_key_list({table})")
+    return {r[6] for r in rows}
+
+
+def _migrate_content_hash(conn):
+    """
+    Huella de contenido + índice único por subcategoría.
+    Los duplicados que ya existían se quedan sin huella.
+    """
+    if not _has_table(conn, "questions"):
+        return
+
+    _add_column(conn, "questions", "content_hash")
+    _fill_content_hash(conn)
+    _create_indexes(conn, "questions")
+
+
+def _fill_content_hash(conn):
+    from app.domain.fingerprint import content_hash
+
+    rows = conn.exec_driver_sql("""
+        SELECT id, subcategory_id, statement_text, statement_math, eval_type, answer
+        FROM questions
+        WHERE content_hash IS NULL
+        ORDER BY id
+    """).all()
+
+    seen = set()
+    for qid, sub_id, st_text, st_math, eval_type, answer in rows:
+        h = content_hash(st_text, st_math, eval_type, answer)
+        if h is None or (sub_id, h) in seen:
+            continue
+        seen.add((sub_id, h))
+        conn.exec_driver_sql(
+            "UPDATE questions SET content_hash = ? WHERE id = ?",
+            (h, qid),
+        )
+
+
+def _migrate_revisions_append_only(conn):
+    """
+    question_revisions sin FK (antes ON DELETE CASCADE).
+    """
+    table = "question_revisions"
+    if _has_table(conn, table) and _fk_on_delete(conn, table):
+        _rebuild_table(conn, table)
+
+
+def _migrate_content_hash_type(conn):
+    """
+    La huella pasa a incluir eval_type: se recalculan todas
+    (y las que antes chocaban entre tipos recuperan la suya).
+    """
+    if not _has_table(conn, "questions"):
+        return
+
+    conn.exec_driver_sql("UPDATE questions SET content_hash = NULL")
+    _fill_content_hash(conn)
+
+
+def _migrate_attempt_form(conn):
+    _add_column(conn, "attempts", "form_id")
+
+
+def _migrate_fk_cascade(conn):
+    """
+    ON DELETE CASCADE en categoría → subcategoría → pregunta,
+    para que los borrados en bloque los resuelva SQLite.
+    """
+    for table in ("subcategories", "questions"):
+        if _has_table(conn, table) and "CASCADE" not in _fk_on_delete(conn, table):
+            _rebuild_table(conn, table)
+
+
+def _migrate_choice_pointer(conn):
+    """
+    Puntero a la alternativa correcta + nº de alternativas.
+    Antes de crear el índice único parcial, las preguntas con
+    varias correctas conservan solo la de menor id.
+    """
+    if not _has_table(conn, "questions"):
+        return
+
+    _add_column(conn, "questions", "correct_option_id")
+    _add_column(conn, "questions", "option_count")
+
+    conn.exec_driver_sql("""
+        UPDATE options SET is_correct = 0
+        WHERE is_correct = 1
+          AND id > (
+              SELECT min(o.id) FROM options o
+              WHERE o.question_id = options.question_id AND o.is_correct = 1
+          )
+    """)
+
+    conn.exec_driver_sql("""
+        UPDATE questions SET
+            option_count = (
+                SELECT count(*) FROM options o WHERE o.question_id = questions.id
+            ),
+            correct_option_id = (
+                SELECT o.id FROM options o
+                WHERE o.question_id = questions.id AND o.is_correct = 1
+            )
+    """)
+
+    _create_indexes(conn, "options")
+
+
+def _migrate_question_revision(conn):
+    _add_column(conn, "questions", "revision")
+
+
+def _migrate_question_revisions(conn):
+    """
+    Revisiones inmutables: una foto inicial por pregunta.
+    """
+    if not _has_table(conn, "questions"):
+        return
+
+    _add_column(conn, "questions", "current_revision_id")
+    _create_indexes(conn, "options")
+
+    Base.metadata.tables["question_revisions"].create(conn, checkfirst=True)
+
+    conn.exec_driver_sql("""
+        INSERT INTO question_revisions (
+            question_id, revision, statement_text, statement_math, eval_type,
+            answer, tolerance, correct_option_id, option_count, options, created_at
+        )
+        SELECT
+            q.id, q.revision, q.statement_text, q.statement_math, q.eval_type,
+            q.answer, q.tolerance, q.correct_option_id, q.option_count,
+            (
+                SELECT json_group_array(json_object(
+                    'id', o.id, 'text', o.text, 'is_correct', o.is_correct
+                ))
+                FROM (
+                    SELECT id, text, is_correct FROM options
+                    WHERE question_id = q.id ORDER BY id
+                ) o
+            ),
+            ?
+        FROM questions q
+        WHERE q.current_revision_id IS NULL
+    """, (time.time(),))
+
+    conn.exec_driver_sql("""
+        UPDATE questions SET current_revision_id = (
+            SELECT max(r.id) FROM question_revisions r
+            WHERE r.question_id = questions.id
+        )
+        WHERE current_revision_id IS NULL
+    """)
+
+
+def _migrate_category_shard(conn):
+    _add_column(conn, "categories", "shard")
+
+
+def _migrate_accepted_answers(conn):
+    """
+    Conjunto de respuestas aceptadas; se rellena para las
+    preguntas (y revisiones) existentes con su única respuesta.
+    """
+    from app.domain.answers import answer_keys
+
+    for table in ("questions", "question_revisions"):
+        if not _has_table(conn, table):
+            continue
+
+        _add_column(conn, table, "alt_answers")
+        _add_column(conn, table, "answer_keys")
+
+        rows = conn.exec_driver_sql(
+            f"SELECT id, eval_type, answer FROM {table} "
+            "WHERE eval_type IN ('TEXT', 'EQUATION') AND answer IS NOT NULL"
+        ).all()
+
+        if rows:
+            conn.exec_driver_sql(
+                f"UPDATE {table} SET answer_keys = ? WHERE id = ?",
+                [(answer_keys(et, answer, None), qid) for qid, et, answer in rows],
+            )
+
+
+def _migrate_item_state_index(conn):
+    """
+    Índice por question_id: sin él, cada borrado de pregunta
+    (o categoría) recorre item_states entero en la cascada.
+    """
+    _create_indexes(conn, "item_states")
+
+
+_MIGRATIONS = [
+    _migrate_content_hash,
+    _migrate_attempt_form,
+    _migrate_fk_cascade,
+    _migrate_choice_pointer,
+    _migrate_question_revision,
+    _migrate_question_revisions,
+    _migrate_category_shard,
+    _migrate_accepted_answers,
+    _migrate_content_hash_type,
+    _migrate_revisions_append_only,
+    _migrate_item_state_index,
+]
+
+
+def _run_migrations(eng):
+    with eng.connect() as conn:
+        # Fuera de transacción: dentro de una, el PRAGMA se ignora.
+        # Con las FK activas, el DROP de una reconstrucción borraría
+        # en cascada las filas hijas.
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        conn.commit()
+
+        try:
+            with conn.begin():
+                version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+                for number, migration in enumerate(_MIGRATIONS, start=1):
+                    if number <= version:
+                        continue
+                    migration(conn)
+                    conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+
+                broken = conn.exec_driver_sql("PRAGMA foreign_key_check").first()
+                if broken is not None:
+                    raise RuntimeError(f"Foreign key violation after migration: {tuple(broken)}")
+        finally:
+            conn.exec_driver_sql("PRAGMA foreign_keys = ON")
+            conn.commit()
+
+
+# =========================
+# BÚSQUEDA (FTS5)
+# =========================
+
+# Índice de texto completo sobre el banco. Se mantiene
+# sincronizado con triggers: ninguna ruta de escritura
+# (ORM, bulk, cascadas) puede olvidarse de actualizarlo.
+
+_OPTIONS_TEXT = (
+    "(SELECT group_concat(o.text, ' ') FROM options o "
+    "WHERE o.question_id = {qid})"
+)
+
+_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS question_fts USING fts5(
+        statement_text,
+        statement_math,
+        answer,
+        options,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_fts_insert
+    AFTER INSERT ON questions BEGIN
+        INSERT INTO question_fts (rowid, statement_text, statement_math, answer, options)
+        VALUES (new.id, new.statement_text, new.statement_math, new.answer, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_fts_update
+    AFTER UPDATE OF statement_text, statement_math, answer ON questions BEGIN
+        UPDATE question_fts
+        SET statement_text = new.statement_text,
+            statement_math = new.statement_math,
+            answer = new.answer
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_fts_delete
+    AFTER DELETE ON questions BEGIN
+        DELETE FROM question_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS options_fts_insert
+    AFTER INSERT ON options BEGIN
+        UPDATE question_fts SET options = {_OPTIONS_TEXT.format(qid="new.question_id")}
+        WHERE rowid = new.question_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS options_fts_update
+    AFTER UPDATE OF text, question_id ON options BEGIN
+        UPDATE question_fts SET options = {_OPTIONS_TEXT.format(qid="old.question_id")}
+        WHERE rowid = old.question_id;
+        UPDATE question_fts SET options = {_OPTIONS_TEXT.format(qid="new.question_id")}
+        WHERE rowid = new.question_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS options_fts_delete
+    AFTER DELETE ON options BEGIN
+        UPDATE question_fts SET options = {_OPTIONS_TEXT.format(qid="old.question_id")}
+        WHERE rowid = old.question_id;
+    END
+    """,
+]
+
+
+def _init_search_index(conn):
+    for ddl in _SEARCH_DDL:
+        conn.exec_driver_sql(ddl)
+
+    # Bancos anteriores al índice: poblarlo una sola vez
+    indexed = conn.execute(text("SELECT count(*) FROM question_fts")).scalar()
+    if indexed:
+        return
+
+    conn.execute(text(f"""
+        INSERT INTO question_fts (rowid, statement_text, statement_math, answer, options)
+        SELECT q.id, q.statement_text, q.statement_math, q.answer,
+               {_OPTIONS_TEXT.format(qid="q.id")}
+        FROM questions q
+    """))
 
 
 # =========================
@@ -0,0 +1,86 @@
+# app/domain/answers.py
+
+"""
+Respuestas aceptadas múltiples (sinónimos) para TEXT y EQUATION.
+
+- alt_answers: JSON con las alternativas tal como se escribieron
+  (para editarlas)
+- answer_keys: JSON con el conjunto normalizado de TODAS las
+  respuestas aceptadas (principal + alternativas), calculado al
+  guardar; calificar es una búsqueda en un frozenset
+"""
+
+import json
+import re
+from functools import lru_cache
+
+from app.domain.normalization import normalize_equation, normalize_text
+
+# Tipos que admiten respuestas alternativas
+MULTI_ANSWER_TYPES = ("TEXT", "EQUATION")
+
+# Separador de alternativas en la columna alt_answers del CSV
+# (la columna answer se toma literal: "|x|=3" es una respuesta);
+# "\\|" escribe una barra literal dentro de una alternativa
+CSV_SEPARATOR = "|"
+
+_CSV_SPLIT = re.compile(r"(?<!\\)" + re.escape(CSV_SEPARATOR))
+
+_NORMALIZERS = {
+    "TEXT": normalize_text,
+    "EQUATION": normalize_equation,
+}
+
+
+def clean_alternates(values) -> list[str]:
+    """
+    Sin vacíos ni repetidas, en el orden original.
+    """
+    seen = []
+    for v in values or ():
+        v = (v or "").strip()
+        if v and v not in seen:
+            seen.append(v)
+    return seen
+
+
+def split_csv_alternates(raw: str | None) -> list[str]:
+    """
+    Columna alt_answers del CSV → lista de alternativas.
+    """
+    if not raw:
+        return []
+    escaped = "\\" + CSV_SEPARATOR
+    return clean_alternates(
+        part.replace(escaped, CSV_SEPARATOR) for part in _CSV_SPLIT.split(raw)
+    )
+
+
+def dump_alternates(values) -> str | None:
+    values = clean_alternates(values)
+    return json.dumps(values, ensure_ascii=False) if values else None
+
+
+def load_alternates(raw: str | None) -> list[str]:
+    return json.loads(raw) if raw else []
+
+
+def answer_keys(eval_type: str, answer: str | None, alt_answers: str | None) -> str | None:
+    """
+    JSON ordenado con las formas normalizadas aceptadas, o None
+    si el tipo no usa conjunto de respuestas.
+    """
+    normalize = _NORMALIZERS.get(eval_type)
+    if normalize is None or answer is None:
+        return None
+
+    keys = {normalize(a) for a in [answer, *load_alternates(alt_answers)]}
+    return json.dumps(sorted(keys), ensure_ascii=False)
+
+
+@lru_cache(maxsize=4096)
+def accepted_set(keys_json: str) -> frozenset[str]:
+    """
+    El JSON de una revisión es inmutable: se parsea una vez.
+    """
+    return frozenset(json.loads(keys_json))
@@ -0,0 +1,50 @@
+# app/domain/bundle_keys.py
+
+"""
+Claves de respuesta para paquetes de examen sin conexión.
+
+Cada respuesta aceptada se publica como
+sha256(sal + "\\x1f" + clave normalizada), con una sal por
+paquete. El cliente normaliza la respuesta del estudiante con
+las mismas reglas (GRADING_RULES), calcula el hash y lo busca
+en el conjunto.
+
+Los hashes ocultan las respuestas a una inspección casual,
+pero no son secretos (el espacio de respuestas es pequeño):
+la nota oficial es la recalificación en el servidor al subir
+los resultados.
+"""
+
+import hashlib
+import math
+
+# NUMERIC sin tolerancia: ancho de bucket "exacto"
+EXACT_WIDTH = 1e-9
+
+GRADING_RULES = {
+    "hash": "hex(sha256(salt + '\\x1f' + key)) en UTF-8",
+    "TEXT": "mayúsculas; quitar espacios, tabs, saltos de línea y ()[]",
+    "EQUATION": "regla TEXT y luego '*', '·', '×' → 'X'",
+    "NUMERIC": "str(floor(valor / width)) como entero; width por pregunta",
+    "CHOICE": "id de la alternativa elegida",
+    "SYNTAX": "tabs → 4 espacios; rstrip por línea; sin líneas vacías; unir con '\\n'",
+}
+
+
+def hash_key(salt: str, key: str) -> str:
+    return hashlib.sha256(f"{salt}\x1f{key}".encode("utf-8")).hexdigest()
+
+
+def numeric_width(tolerance: float | None) -> float:
+    return tolerance if tolerance else EXACT_WIDTH
+
+
+def numeric_buckets(value: float, width: float) -> list[str]:
+    """
+    Buckets floor(x / width) que cubren [value - width, value + width].
+    Un acierto real siempre cae en uno de ellos; un valor hasta
+    2·width fuera también puede caer (lo corrige el servidor).
+    """
+    lo = math.floor((value - width) / width)
+    hi = math.floor((value + width) / width)
+    return [str(i) for i in range(lo, hi + 1)]
@@ -0,0 +1,24 @@
+# app/domain/errors.py
+
+
+class DuplicateQuestionError(ValueError):
+    """
+    Ya existe una pregunta con el mismo contenido normalizado
+    (enunciado + respuesta) en la subcategoría.
+    """
+
+    def __init__(self, question_id: int):
+        super().__init__(f"Duplicate of question {question_id}")
+        self.question_id = question_id
+
+
+class UnsavedAttemptsError(RuntimeError):
+    """
+    Parte de un lote de intentos no se pudo guardar (p. ej. un
+    shard no disponible). El resto del lote ya está persistido.
+    """
+
+    def __init__(self, rows: list[dict], stats: dict):
+        super().__init__(f"{len(rows)} attempts not saved")
+        self.rows = rows
+        self.stats = stats
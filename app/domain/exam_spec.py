@@ -0,0 +1,129 @@
+# app/domain/exam_spec.py
+
+import json
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ExamPart:
+    subcategory_id: int
+    count: int | None = None      # None → todas las jugables
+    weight: float | None = None   # reparto proporcional de `total`
+
+
+def parse_exam_spec(raw: str) -> list[ExamPart]:
+    """
+    Especificación de un examen mixto.
+
+    Formatos aceptados:
+    - "12:10, 15:5"       → cantidades por subcategoría
+    - "12:*"              → todas las de la subcategoría
+    - "12:w2, 15:w1"      → pesos (se reparte el total del examen)
+    - JSON: [{"subcategory_id": 12, "count": 10},
+             {"subcategory_id": 15, "weight": 1}]
+    """
+    raw = (raw or "").strip()
+    if not raw:
+        raise ValueError("Empty exam spec")
+
+    if raw.startswith("["):
+        try:
+            items = json.loads(raw)
+        except ValueError as e:
+            raise ValueError(f"Invalid exam spec JSON: {e}")
+        parts = [
+            ExamPart(
+                subcategory_id=int(it["subcategory_id"]),
+                count=None if it.get("count") is None else int(it["count"]),
+                weight=None if it.get("weight") is None else float(it["weight"]),
+            )
+            for it in items
+        ]
+    else:
+        parts = []
+        for chunk in raw.split(","):
+            chunk = chunk.strip()
+            if not chunk:
+                continue
+
+            sid, _, amount = chunk.partition(":")
+            amount = amount.strip().lower()
+
+            try:
+                sid = int(sid)
+                if amount in ("", "*"):
+                    parts.append(ExamPart(sid))
+                elif amount.startswith("w"):
+                    parts.append(ExamPart(sid, weight=float(amount[1:])))
+                else:
+                    parts.append(ExamPart(sid, count=int(amount)))
+            except ValueError:
+                raise ValueError(f"Invalid exam spec item: {chunk}")
+
+    seen = set()
+    for p in parts:
+        if p.subcategory_id in seen:
+            raise ValueError(f"Subcategory {p.subcategory_id} repeated in exam spec")
+        seen.add(p.subcategory_id)
+
+        if p.count is not None and p.count < 1:
+            raise ValueError("Exam spec counts must be positive")
+        if p.weight is not None and p.weight <= 0:
+            raise ValueError("Exam spec weights must be positive")
+
+    if not parts:
+        raise ValueError("Empty exam spec")
+
+    return parts
+
+
+def allocate(parts: list[ExamPart], total: int | None = None) -> dict[int, int | None]:
+    """
+    Cantidad por subcategoría. Los pesos reparten `total` con el
+    método del mayor resto (la suma es exactamente `total`).
+    """
+    quotas: dict[int, int | None] = {
+        p.subcategory_id: p.count
+        for p in parts
+        if p.weight is None
+    }
+
+    weighted = [p for p in parts if p.weight is not None]
+    if not weighted:
+        return quotas
+
+    if not total:
+        raise ValueError("Weighted exam spec requires a total number of questions")
+
+    weight_sum = sum(p.weight for p in weighted)
+    exact = [(p, total * p.weight / weight_sum) for p in weighted]
+
+    counts = {p.subcategory_id: int(x) for p, x in exact}
+    left = total - sum(counts.values())
+
+    for p, x in sorted(exact, key=lambda px: -(px[1] - int(px[1])))[:left]:
+        counts[p.subcategory_id] += 1
+
+    for sid, n in counts.items():
+        if n > 0:
+            quotas[sid] = n
+
+    return quotas
+
+
+def spec_key(quotas: dict[int, int | None]) -> str:
+    """
+    Forma canónica de unas cuotas ("3:10,7:*"), para indexar
+    formularios pregenerados.
+    """
+    return ",".join(
+        f"{sid}:{'*' if n is None else n}"
+        for sid, n in sorted(quotas.items())
+    )
+
+
+def spec_subcategories(key: str) -> list[int]:
+    """
+    Subcategorías de una clave de `spec_key`.
+    """
+    return [int(item.partition(":")[0]) for item in key.split(",") if item]
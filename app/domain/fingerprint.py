@@ -0,0 +1,31 @@
+# app/domain/fingerprint.py
+
+import hashlib
+
+from app.domain.normalization import normalize_text
+
+
+def content_hash(
+    statement_text: str | None,
+    statement_math: str | None,
+    eval_type: str,
+    answer: str | None,
+) -> str | None:
+    """
+    Huella del contenido normalizado (tipo + enunciado + respuesta):
+    una TEXT y una NUMERIC con el mismo texto no son duplicados.
+
+    CHOICE no tiene huella: su identidad depende de las
+    alternativas, que se agregan después de crear la pregunta.
+    """
+    if eval_type == "CHOICE":
+        return None
+
+    key = "\x1f".join((
+        eval_type,
+        normalize_text(statement_text or ""),
+        normalize_text(statement_math or ""),
+        normalize_text(answer or ""),
+    ))
+
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
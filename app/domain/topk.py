@@ -0,0 +1,45 @@
+# app/domain/topk.py
+
+"""
+Top-K aproximado con memoria acotada (algoritmo Space-Saving).
+
+Se mantienen como máximo `k` contadores. Cuando llega una clave
+nueva y la tabla está llena, se reemplaza la de menor conteo y la
+nueva hereda ese conteo (sobreestimación acotada por el mínimo).
+"""
+
+
+def space_saving_add(
+    counters: dict[str, int],
+    key: str,
+    k: int,
+    count: int = 1,
+) -> None:
+    if key in counters:
+        counters[key] += count
+        return
+
+    if len(counters) < k:
+        counters[key] = count
+        return
+
+    victim = min(counters, key=counters.__getitem__)
+    floor = counters.pop(victim)
+    counters[key] = floor + count
+
+
+def space_saving_merge(
+    counters: dict[str, int],
+    other: dict[str, int],
+    k: int,
+) -> dict[str, int]:
+    """
+    Mezcla `other` dentro de `counters` (in-place) y lo devuelve.
+    """
+    for key, count in sorted(other.items(), key=lambda kv: -kv[1]):
+        space_saving_add(counters, key, k, count)
+    return counters
+
+
+def top_items(counters: dict[str, int], n: int) -> list[tuple[str, int]]:
+    return sorted(counters.items(), key=lambda kv: -kv[1])[:n]
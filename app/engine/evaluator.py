@@ -33,15 +33,15 @@ def evaluate_answer(question: Question, user_answer: str) -> Result:
 
     elif et == "CHOICE":
         # 🔒 VALIDACIÓN DE DOMINIO (OBLIGATORIA)
-        options = question.options or []
-
-        if len(options) < 2:
+        # Sobre el puntero desnormalizado: no se leen las alternativas
+        if (question.option_count or 0) < 2:
             return Result.invalid("CHOICE sin alternativas")
 
-        correct = [o for o in options if o.is_correct]
-
-        if len(correct) != 1:
+        if question.correct_option_id is None:
             return Result.invalid("CHOICE debe tener exactamente una correcta")
+
+        from app.engine.evaluators.choice import evaluate
+        return evaluate(question, user_answer)
     elif et == "SYNTAX":
         from app.engine.evaluators.syntax import evaluate
         return evaluate(question, user_answer)
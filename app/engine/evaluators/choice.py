@@ -10,19 +10,15 @@ def evaluate(question: Question, user_answer: str) -> Result:
     except Exception:
         return Result(correct=False, expected=None)
 
-    correct_option = None
-    for opt in question.options:
-        if opt.is_correct:
-            correct_option = opt
-            break
+    correct_option_id = question.correct_option_id
 
-    if correct_option is None:
+    if correct_option_id is None:
         # pregunta mal construida
         return Result(correct=False, expected=None)
 
-    correct = (selected_id == correct_option.id)
+    correct = (selected_id == correct_option_id)
 
     return Result(
         correct=correct,
-        expected=str(correct_option.id)
-    )
\ No newline at end of file
+        expected=str(correct_option_id)
+    )
@@ -2,6 +2,7 @@
 
 from app.models import Question
 from app.engine.evaluator import Result
+from app.domain.answers import accepted_set
 
 
 def _normalize_equation(s: str) -> str:
@@ -23,8 +24,11 @@ def _normalize_equation(s: str) -> str:
 
 def evaluate(question: Question, user_answer: str) -> Result:
     expected = question.answer or ""
-    correct = (
-        _normalize_equation(expected)
-        == _normalize_equation(user_answer)
-    )
+
+    # conjunto precalculado (principal + alternativas): O(1)
+    if question.answer_keys:
+        correct = _normalize_equation(user_answer) in accepted_set(question.answer_keys)
+    else:
+        correct = _normalize_equation(expected) == _normalize_equation(user_answer)
+
     return Result(correct=correct, expected=expected)
\ No newline at end of file
@@ -2,6 +2,7 @@
 
 from app.models import Question
 from app.engine.evaluator import Result
+from app.domain.answers import accepted_set
 
 
 def _normalize(s: str) -> str:
@@ -15,5 +16,11 @@ def _normalize(s: str) -> str:
 
 def evaluate(question: Question, user_answer: str) -> Result:
     expected = question.answer or ""
-    correct = _normalize(expected) == _normalize(user_answer)
+
+    # conjunto precalculado (principal + alternativas): O(1)
+    if question.answer_keys:
+        correct = _normalize(user_answer) in accepted_set(question.answer_keys)
+    else:
+        correct = _normalize(expected) == _normalize(user_answer)
+
     return Result(correct=correct, expected=expected)
\ No newline at end of file
@@ -1,21 +1,49 @@
 #main.py
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import Body, FastAPI, Request, Form
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 import time
 from fastapi import UploadFile, File
 import csv
 import io
 import re
 import json
+import uuid
+import random
+import hashlib
+from pathlib import Path
+from urllib.parse import urlencode
+from email.utils import formatdate, parsedate_to_datetime
 from fastapi import UploadFile, File
 from fastapi.responses import RedirectResponse
 
-from app.db import init_db
-from app.services.admin_service import create_question_from_admin
-from app.services.question_service import update_question_full
-from app.services.exam_session import evaluate_question
+from app.db import UnknownShardError, init_db
+from app.services.admin_service import (
+    create_question_from_admin,
+    save_prepared_batch,
+    find_near_duplicates,
+)
+from app.services import import_pipeline
+from app.services.import_pipeline import prepare_blocks, prepare_csv_rows
+from app.services.question_service import save_question_full, update_question_full
+from app.services.exam_session import evaluate_question, grade_cache
+from app.services.scheduler import scheduler
+from app.web.compression import CompressionMiddleware
+from app.web.rate_limit import DedupMiddleware, RateLimitMiddleware
+from app.web.profiler import ProfiledRoute, ProfilerMiddleware, profiler
+from app.web.static import PrecompressedStaticFiles, STATIC_DIR, static_url
+from app.web.vendor import mathjax_root, needs_mathjax, vendor_url
+from app.services.attempt_log import attempt_log
+from app.services.warmup import warm_up
+from app.domain.topk import top_items
+from app.domain.eval_types import EVAL_TYPES
+from app.domain.errors import DuplicateQuestionError
+from app.domain.exam_spec import allocate, parse_exam_spec, spec_key
+from app.services.exam_forms import form_cache, generate_exam_forms, retire_stale_forms
+from app.services.wrong_answers import wrong_answer_clusters
+from app.services.offline_bundle import build_bundle, grade_bundle_results
+from app.services.adaptive import STOP_SE, calibrate_subcategory, start_adaptive
 
 from app.crud import (
     create_category,
@@ -32,6 +60,16 @@ from app.crud import (
     update_option,
     set_correct_option,
     get_playable_questions,   # 👈 IMPORTANTE
+    get_question_stats,
+    search_questions,
+    get_bank_version,
+    sample_playable_questions,
+    get_exam_form,
+    get_current_revision_ids,
+    get_question_at_revision,
+    bulk_move_questions,
+    bulk_delete_questions,
+    bulk_retype_questions,
 )
 
 # =====================================================
@@ -39,7 +77,20 @@ from app.crud import (
 # =====================================================
 
 app = FastAPI(title="Sciences Trainer")
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.router.route_class = ProfiledRoute
+# el último en añadirse es el más externo: el límite de tasa
+# rechaza antes de comprimir o leer el cuerpo
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(DedupMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+app.add_middleware(RateLimitMiddleware)
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
+
+
+@app.exception_handler(UnknownShardError)
+async def unknown_shard_handler(request: Request, exc: UnknownShardError):
+    # los bits altos del id no nombran ningún shard: no existe
+    return JSONResponse({"detail": "Not Found"}, status_code=404)
 
 import os
 
@@ -48,6 +99,56 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 templates = Jinja2Templates(
     directory=os.path.join(BASE_DIR, "templates")
 )
+templates.env.globals["static_url"] = static_url
+templates.env.globals["vendor_url"] = vendor_url
+templates.env.globals["mathjax_root"] = mathjax_root
+templates.env.globals["needs_mathjax"] = needs_mathjax
+
+# =====================================================
+# CACHÉ HTTP (ETag / Last-Modified por versión del banco)
+# =====================================================
+
+# Las plantillas forman parte del ETag: un deploy que cambia
+# el HTML invalida las copias cacheadas aunque el banco no cambie.
+_TEMPLATES_TAG = hashlib.sha1(b"".join(
+    path.read_bytes()
+    for path in sorted(Path(BASE_DIR, "templates").iterdir())
+)).hexdigest()[:8]
+
+
+def _bank_cache_headers(request: Request) -> tuple[Response | None, dict]:
+    """
+    Devuelve (304 si el cliente ya tiene la versión actual, headers).
+    Una lectura por PK de la versión de cada shard.
+    """
+    version, updated_at = get_bank_version()
+
+    etag = f'W/"bank-{version}-{_TEMPLATES_TAG}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(updated_at, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers), headers
+        return None, headers
+
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            since = None
+        if since is not None and int(updated_at) <= since:
+            return Response(status_code=304, headers=headers), headers
+
+    return None, headers
 
 # =====================================================
 # SESIÓN (single-user, simple)
@@ -55,6 +156,24 @@ templates = Jinja2Templates(
 
 SESSION: dict = {}
 
+# Identificador persistente del estudiante (repaso espaciado)
+STUDENT_COOKIE = "student_id"
+STUDENT_COOKIE_MAX_AGE = 365 * 24 * 3600
+
+
+def _student_id(request: Request) -> str:
+    return request.cookies.get(STUDENT_COOKIE) or uuid.uuid4().hex
+
+
+def _set_student_cookie(response: Response, student_id: str):
+    response.set_cookie(
+        STUDENT_COOKIE,
+        student_id,
+        max_age=STUDENT_COOKIE_MAX_AGE,
+        httponly=True,
+        samesite="lax",
+    )
+
 # =====================================================
 # STARTUP
 # =====================================================
@@ -62,6 +181,23 @@ SESSION: dict = {}
 @app.on_event("startup")
 def startup():
     init_db()
+    attempt_log.start()
+    warm_up.start(templates.env)
+
+
+@app.on_event("shutdown")
+def shutdown():
+    # vaciado garantizado del historial pendiente
+    attempt_log.stop()
+    import_pipeline.shutdown()
+
+@app.get("/ready")
+def ready():
+    """
+    Listo solo tras el calentamiento (para el balanceador).
+    """
+    status = warm_up.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
 
 # =====================================================
 # INDEX
@@ -69,6 +205,10 @@ def startup():
 
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
+    not_modified, cache_headers = _bank_cache_headers(request)
+    if not_modified:
+        return not_modified
+
     categories_db = get_categories()
 
     categories = [
@@ -83,19 +223,32 @@ def index(request: Request):
         for c in categories_db
     ]
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "index.html",
         {
             "request": request,
             "categories": categories
         },
+        headers=cache_headers,
     )
+
+    # la cookie llega antes que el primer /play: cada alumno tiene
+    # su propio bucket, no el compartido de su IP
+    if STUDENT_COOKIE not in request.cookies:
+        response.headers["Cache-Control"] = "private, no-cache"
+        _set_student_cookie(response, uuid.uuid4().hex)
+
+    return response
 # =====================================================
 # ADMIN
 # =====================================================
 
 @app.get("/admin", response_class=HTMLResponse)
-def admin_home(request: Request):
+def admin_home(request: Request, error: str | None = None):
+    not_modified, cache_headers = _bank_cache_headers(request)
+    if not_modified:
+        return not_modified
+
     categories_db = get_categories()
 
     categories = [
@@ -132,18 +285,26 @@ def admin_home(request: Request):
 
     return templates.TemplateResponse(
         "admin.html",
-        {"request": request, "categories_admin": categories},
+        {"request": request, "categories_admin": categories, "error": error},
+        headers=cache_headers,
     )
 # ---------- CATEGORY ----------
 
 @app.post("/admin/category")
-def admin_create_category(name: str = Form(...)):
-    create_category(name)
+def admin_create_category(name: str = Form(...), shard: int = Form(0)):
+    try:
+        create_category(name, shard=max(shard, 0))
+    except ValueError as e:
+        return RedirectResponse(
+            "/admin?" + urlencode({"error": str(e)}),
+            status_code=303,
+        )
     return RedirectResponse("/admin", status_code=303)
 
 @app.post("/admin/category/delete")
 def admin_delete_category(category_id: int = Form(...)):
     delete_category(category_id)
+    retire_stale_forms()
     return RedirectResponse("/admin", status_code=303)
 
 @app.post("/admin/category/update")
@@ -167,6 +328,7 @@ def admin_create_subcategory(
 @app.post("/admin/subcategory/delete")
 def admin_delete_subcategory(subcategory_id: int = Form(...)):
     delete_subcategory(subcategory_id)
+    retire_stale_forms()
     return RedirectResponse("/admin", status_code=303)
 
 @app.post("/admin/subcategory/update")
@@ -186,6 +348,7 @@ def admin_create_question(
     eval_type: str = Form(...),
     answer: str | None = Form(None),
     tolerance: float | None = Form(None),
+    alt_answers: str | None = Form(None),
 ):
     create_question_from_admin(
         subcategory_id=subcategory_id,
@@ -193,9 +356,16 @@ def admin_create_question(
         eval_type=eval_type,
         answer=answer,
         tolerance=tolerance,
+        alt_answers=_parse_alternates(alt_answers),
     )
     return RedirectResponse("/admin", status_code=303)
 
+def _parse_alternates(raw: str | None) -> list[str]:
+    """
+    Respuestas aceptadas extra: una por línea (textarea del admin).
+    """
+    return (raw or "").splitlines()
+
 # ---------- QUESTION (JSON / PRODUCTIVO) ----------
 
 @app.post("/admin/question/json")
@@ -205,6 +375,7 @@ def admin_create_question_json(
     eval_type: str = Form(...),
     answer: str | None = Form(None),
     tolerance: float | None = Form(None),
+    alt_answers: str | None = Form(None),
 ):
     """
     Endpoint PRODUCTIVO:
@@ -219,10 +390,24 @@ def admin_create_question_json(
             eval_type=eval_type,
             answer=answer,
             tolerance=tolerance,
+            alt_answers=_parse_alternates(alt_answers),
         )
         return {
             "ok": True,
             "id": qid,
+            "near_duplicates": [
+                {"question_id": other, "similarity": sim}
+                for other, sim in find_near_duplicates(
+                    subcategory_id, statement, exclude_id=qid
+                )
+            ],
+        }
+
+    except DuplicateQuestionError as e:
+        return {
+            "ok": False,
+            "error": str(e),
+            "duplicate_of": e.question_id,
         }
 
     except Exception as e:
@@ -246,22 +431,162 @@ def admin_edit_question(
     if not q:
         return RedirectResponse("/admin", status_code=303)
 
-    update_question_full(
-        question=q,
-        statement_text=statement_text,
-        statement_math=statement_math,
-        eval_type=eval_type,
-        answer=answer,
-        tolerance=tolerance,
-    )
+    try:
+        update_question_full(
+            question=q,
+            statement_text=statement_text,
+            statement_math=statement_math,
+            eval_type=eval_type,
+            answer=answer,
+            tolerance=tolerance,
+        )
+    except (DuplicateQuestionError, ValueError) as e:
+        return RedirectResponse(
+            "/admin?" + urlencode({"error": str(e)}),
+            status_code=303,
+        )
 
     return RedirectResponse("/admin", status_code=303)
 
+@app.post("/admin/question/save")
+def admin_save_question(
+    question_id: int = Form(...),
+    statement_text: str | None = Form(None),
+    statement_math: str | None = Form(None),
+    eval_type: str = Form(...),
+    answer: str | None = Form(None),
+    tolerance: float | None = Form(None),
+    options: str | None = Form(None),
+    alt_answers: str | None = Form(None),
+):
+    """
+    Guardado del agregado en UN viaje:
+    pregunta + eval_type + lista completa de alternativas.
+
+    options (JSON): [{"id": 3, "text": "...", "is_correct": true},
+                     {"text": "nueva", "is_correct": false}]
+    Sin `options` las alternativas no se tocan.
+    alt_answers (JSON): ["agua", "water"]; [] las borra.
+    Sin `alt_answers` no se tocan.
+    """
+    q = get_question(question_id)
+    if not q:
+        return {"ok": False, "error": "Pregunta inexistente"}
+
+    try:
+        parsed = json.loads(options) if options else None
+        if parsed is not None and not isinstance(parsed, list):
+            raise ValueError("options must be a JSON list")
+
+        alternates = json.loads(alt_answers) if alt_answers else None
+        if alternates is not None and not isinstance(alternates, list):
+            raise ValueError("alt_answers must be a JSON list")
+
+        counts = save_question_full(
+            question_id=question_id,
+            subcategory_id=q.subcategory_id,
+            statement_text=statement_text,
+            statement_math=statement_math,
+            eval_type=eval_type,
+            answer=answer,
+            tolerance=tolerance,
+            options=parsed,
+            alt_answers=alternates,
+        )
+
+    except DuplicateQuestionError as e:
+        return {
+            "ok": False,
+            "error": str(e),
+            "duplicate_of": e.question_id,
+        }
+
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+
+    return {"ok": True, "id": question_id, **counts}
+
 @app.post("/admin/question/delete")
 def admin_delete_question(question_id: int = Form(...)):
     delete_question(question_id)
+    retire_stale_forms()
     return RedirectResponse("/admin", status_code=303)
 
+# ---------- QUESTIONS (MASIVO) ----------
+
+def _parse_ids(raw: str | None) -> list[int] | None:
+    """
+    "3, 5 8" → [3, 5, 8]. None/vacío → None (sin filtro).
+    """
+    if not raw or not raw.strip():
+        return None
+    return [int(t) for t in re.split(r"[\s,;]+", raw.strip()) if t]
+
+
+@app.post("/admin/questions/bulk/move")
+def admin_bulk_move(
+    question_ids: str = Form(...),
+    subcategory_id: int = Form(...),
+):
+    try:
+        ids = _parse_ids(question_ids)
+    except ValueError:
+        return {"ok": False, "error": "Invalid question ids"}
+
+    if not ids:
+        return {"ok": False, "error": "No question ids"}
+
+    result = bulk_move_questions(ids, subcategory_id)
+    if result is None:
+        return {"ok": False, "error": "Subcategoría inexistente"}
+
+    return {"ok": True, **result}
+
+
+@app.post("/admin/questions/bulk/delete")
+def admin_bulk_delete(
+    question_ids: str | None = Form(None),
+    subcategory_id: int | None = Form(None),
+    eval_type: str | None = Form(None),
+):
+    """
+    Borra por lista de ids y/o filtro (subcategoría, tipo).
+    Los criterios se combinan con AND.
+    """
+    if eval_type is not None and eval_type not in EVAL_TYPES:
+        return {"ok": False, "error": "Invalid eval_type"}
+
+    try:
+        result = bulk_delete_questions(
+            question_ids=_parse_ids(question_ids),
+            subcategory_id=subcategory_id,
+            eval_type=eval_type or None,
+        )
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+
+    retire_stale_forms()
+    return {"ok": True, **result}
+
+
+@app.post("/admin/questions/bulk/retype")
+def admin_bulk_retype(
+    question_ids: str = Form(...),
+    eval_type: str = Form(...),
+):
+    if eval_type not in EVAL_TYPES:
+        return {"ok": False, "error": "Invalid eval_type"}
+
+    try:
+        ids = _parse_ids(question_ids)
+        if not ids:
+            return {"ok": False, "error": "No question ids"}
+        result = bulk_retype_questions(ids, eval_type)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+
+    return {"ok": True, **result}
+
 # ---------- OPTIONS ----------
 
 @app.post("/admin/option")
@@ -306,8 +631,182 @@ def admin_delete_option(option_id: int = Form(...)):
     delete_option(option_id)
     return RedirectResponse("/admin", status_code=303)
 
+# ---------- SEARCH ----------
+
+@app.get("/admin/search")
+def admin_search(q: str = "", page: int = 1, per_page: int = 20):
+    """
+    Búsqueda de texto completo en el banco (FTS5), paginada.
+    """
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), 100)
+
+    rows = search_questions(q, limit=per_page + 1, offset=(page - 1) * per_page)
+
+    return {
+        "query": q,
+        "page": page,
+        "per_page": per_page,
+        "has_more": len(rows) > per_page,
+        "results": rows[:per_page],
+    }
+
+# ---------- EXAM FORMS ----------
+
+@app.post("/admin/exam-forms")
+def admin_generate_exam_forms(
+    spec: str = Form(...),
+    count: int = Form(10),
+    total: int | None = Form(None),
+    seed: int | None = Form(None),
+):
+    """
+    Pregenera `count` formularios barajados (con semilla) para una
+    especificación de examen; los estudiantes que empiecen ese
+    examen reciben uno de ellos.
+    """
+    try:
+        quotas = allocate(parse_exam_spec(spec), total)
+        form_ids = generate_exam_forms(quotas, count, seed)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+
+    return {
+        "ok": True,
+        "spec_key": spec_key(quotas),
+        "form_ids": form_ids,
+    }
+
+
+@app.get("/admin/exam-forms/{form_id}")
+def admin_get_exam_form(form_id: int):
+    form = get_exam_form(form_id)
+    if form is None:
+        return {"ok": False, "error": "Formulario inexistente"}
+    return {"ok": True, **form}
+
+# ---------- STATS ----------
+
+@app.get("/admin/stats")
+def admin_question_stats(
+    subcategory_id: int | None = None,
+    limit: int = 50,
+    offset: int = 0,
+    fresh: bool = False,
+):
+    """
+    Dificultad por pregunta a partir de contadores incrementales
+    (sin agregados sobre el historial).
+
+    Sirve lo ya volcado (a lo sumo un intervalo de volcado de
+    retraso); `fresh=1` vuelca antes lo que aún está en memoria.
+    """
+    if fresh:
+        attempt_log.flush()
+
+    items = []
+
+    for st, q in get_question_stats(subcategory_id, limit, offset):
+        wrong = json.loads(st.wrong_answers or "{}")
+
+        items.append({
+            "question_id": q.id,
+            "subcategory_id": q.subcategory_id,
+            "eval_type": q.eval_type,
+            "statement": (q.statement_text or q.statement_math or "")[:80],
+            "attempts": st.attempts,
+            "correct": st.correct,
+            "correct_rate": round(st.correct / st.attempts, 4),
+            "avg_time_ms": round(st.time_sum_ms / st.timed) if st.timed else None,
+            "top_wrong": [
+                {"answer": a, "count": n}
+                for a, n in top_items(wrong, 5)
+            ],
+        })
+
+    return {"items": items}
+
+@app.get("/admin/reports/wrong-answers")
+def admin_wrong_answers_report(
+    subcategory_id: int | None = None,
+    question_id: int | None = None,
+    k: int = 5,
+    fresh: bool = False,
+):
+    """
+    Por qué se falla cada pregunta: respuestas incorrectas
+    agrupadas por su forma normalizada (top-K por pregunta).
+    `fresh=1` vuelca antes el historial aún en memoria.
+    """
+    if fresh:
+        attempt_log.flush()
+
+    return {
+        "items": wrong_answer_clusters(subcategory_id, question_id, max(1, min(k, 50))),
+    }
+
+@app.post("/admin/irt/calibrate")
+def admin_irt_calibrate(subcategory_id: int = Form(...)):
+    """
+    Calibración 2PL offline de una subcategoría a partir del
+    historial (para el modo adaptativo).
+    """
+    attempt_log.flush()
+    return {"ok": True, **calibrate_subcategory(subcategory_id)}
+
+# ---------- PROFILER ----------
+
+@app.post("/admin/profiler/start")
+def admin_profiler_start(
+    requests: int = Form(10),
+    path: str | None = Form(None),
+    interval_ms: float = Form(5.0),
+):
+    """
+    Perfila por muestreo las próximas `requests` peticiones
+    (solo las que empiezan por `path`, si se indica).
+    """
+    try:
+        profiler.arm(requests, (path or "").strip() or None, interval_ms)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, **profiler.status()}
+
+@app.post("/admin/profiler/stop")
+def admin_profiler_stop():
+    profiler.disarm()
+    return {"ok": True, **profiler.status()}
+
+@app.get("/admin/profiler")
+def admin_profiler_status():
+    return profiler.status()
+
+@app.get("/admin/profiler/collapsed")
+def admin_profiler_collapsed():
+    """
+    Pilas agregadas en formato collapsed (flamegraph.pl, speedscope).
+    """
+    return Response(
+        profiler.collapsed(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'},
+    )
+
+@app.get("/admin/grade-cache")
+def admin_grade_cache():
+    return grade_cache.stats()
+
 @app.post("/admin/import")
-async def admin_import_questions(file: UploadFile = File(...)):
+async def admin_import_questions(
+    file: UploadFile = File(...),
+    on_duplicate: str = Form("skip"),
+    near_duplicates: bool = Form(False),
+):
+    """
+    on_duplicate: "skip" (por defecto) o "update" para
+    sobrescribir la pregunta existente con la fila importada.
+    near_duplicates: además marca casi-duplicados (LSH).
+    """
 
     content = await file.read()
 
@@ -339,81 +838,69 @@ async def admin_import_questions(file: UploadFile = File(...)):
         }
 
     created = 0
-    errors: list[str] = []
-
-    for line, row in enumerate(reader, start=2):
-
-        try:
-
-            subcategory_id = int(row["subcategory_id"])
-
-            statement = (row.get("statement") or "").strip()
-            eval_type = (row.get("eval_type") or "").strip()
-
-            answer = row.get("answer")
-
-            if answer:
-                # permite código multilínea usando \n
-                answer = answer.replace("\\n", "\n").strip()
-            else:
-                answer = None
-
-            tolerance_raw = row.get("tolerance")
-            tolerance = float(tolerance_raw) if tolerance_raw else None
-
-            # ---------------------------
-            # Validaciones
-            # ---------------------------
-
-            if not statement:
-                raise ValueError("statement vacío")
-
-            if eval_type not in EVAL_TYPES:
-                raise ValueError(f"eval_type inválido: {eval_type}")
-
-            # CSV no soporta CHOICE
-            if eval_type == "CHOICE":
-                raise ValueError("CHOICE no soportado en CSV")
-
-            # ---------------------------
-            # Reglas por tipo
-            # ---------------------------
-
-            if eval_type == "NUMERIC":
-                if answer is None:
-                    raise ValueError("NUMERIC requiere answer")
-
-            else:
-                if answer is None:
-                    raise ValueError(f"{eval_type} requiere answer")
-                tolerance = None
-
-            # ---------------------------
-            # Crear pregunta
-            # ---------------------------
+    skipped = 0
+    updated = 0
+    near: list[dict] = []
+    errors: list[tuple[int, str]] = []
+
+    # validación + huellas en paralelo; la inserción, en orden
+    rows = list(reader)
+    prepared = await run_in_threadpool(prepare_csv_rows, rows)
+
+    valid = []
+    for line, (p, error) in enumerate(prepared, start=2):
+        if error is not None:
+            errors.append((line, error))
+        else:
+            valid.append((line, p))
+
+    # una transacción por lote; las claves ya vienen calculadas
+    outcomes = await run_in_threadpool(
+        save_prepared_batch,
+        [p for _, p in valid],
+        update_duplicates=on_duplicate == "update",
+    )
 
-            create_question_from_admin(
-                subcategory_id=subcategory_id,
-                raw_statement=statement,
-                eval_type=eval_type,
-                answer=answer,
-                tolerance=tolerance,
-            )
+    for (line, p), (status, value) in zip(valid, outcomes):
 
+        if status == "error":
+            errors.append((line, value))
+        elif status == "skipped":
+            skipped += 1
+        elif status == "updated":
+            updated += 1
+        else:
             created += 1
 
-        except Exception as e:
-            errors.append(f"line {line}: {str(e)}")
+            if near_duplicates:
+                for other, sim in find_near_duplicates(
+                    p.subcategory_id,
+                    p.statement_text,
+                    exclude_id=value,
+                    buckets=p.buckets or None,
+                ):
+                    near.append({
+                        "line": line,
+                        "question_id": value,
+                        "similar_to": other,
+                        "similarity": sim,
+                    })
+
+    errors = [f"line {line}: {error}" for line, error in sorted(errors)]
 
     return {
         "created": created,
+        "skipped": skipped,
+        "updated": updated,
+        "near_duplicates": near,
         "errors": errors
     }
 
 @app.post("/admin/import/file")
 async def admin_import_file(
     subcategory_id: int = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    on_duplicate: str = Form("skip"),
 ):
 
     content = await file.read()
@@ -425,70 +912,14 @@ async def admin_import_file(
 
     blocks = re.split(r"\n\s*\n", text.strip())
 
-    for block in blocks:
-
-        lines = block.splitlines()
-
-        statement = None
-        tolerance = None
-        answer_lines = []
-
-        reading_answer = False
-
-        for line in lines:
-
-            if line.startswith("Q:"):
-                statement = line[2:].strip()
-                reading_answer = False
-
-            elif line.startswith("A:"):
-                reading_answer = True
-
-                content = line[2:].lstrip()
-                if content:
-                    answer_lines.append(content)
-
-            elif line.startswith("T:"):
-
-                reading_answer = False
+    # parseo + huellas en paralelo; la inserción, en orden
+    prepared = await run_in_threadpool(prepare_blocks, subcategory_id, blocks)
 
-                try:
-                    tolerance = float(line[2:].strip())
-                except ValueError:
-                    tolerance = None
-
-            else:
-                if reading_answer:
-                    answer_lines.append(line)
-
-        answer = "\n".join(answer_lines).rstrip()
-
-        if not statement or not answer:
-            continue
-
-        # ---------------------------
-        # Determinar tipo
-        # ---------------------------
-
-        eval_type = "TEXT"
-
-        if tolerance is not None:
-            eval_type = "NUMERIC"
-
-        if "\n" in answer:
-            eval_type = "SYNTAX"
-
-        # ---------------------------
-        # Crear pregunta
-        # ---------------------------
-
-        create_question_from_admin(
-            subcategory_id=subcategory_id,
-            raw_statement=statement,
-            eval_type=eval_type,
-            answer=answer,
-            tolerance=tolerance,
-        )
+    await run_in_threadpool(
+        save_prepared_batch,
+        [p for p, _error in prepared if p is not None],
+        update_duplicates=on_duplicate == "update",
+    )
 
     return RedirectResponse("/admin", status_code=303)
 
@@ -499,60 +930,211 @@ async def admin_import_file(
 @app.post("/play/question", response_class=HTMLResponse)
 def play_start(
     request: Request,
-    subcategory_id: int = Form(...),
+    subcategory_id: int | None = Form(None),
     limit: int | None = Form(None),
     time_limit: int = Form(...),
     all_questions: bool = Form(False),
     exam: bool = Form(False),
+    spec: str | None = Form(None),
+    adaptive: bool = Form(False),
 ):
-    if not all_questions and limit is None:
+    """
+    Sesión de una subcategoría o examen mixto (`spec`, ver
+    domain/exam_spec.py). El repaso espaciado solo aplica al
+    entrenamiento de una subcategoría. `adaptive`: examen de
+    una subcategoría con selección IRT (ver domain/irt.py).
+    """
+    spec = (spec or "").strip() or None
+
+    if spec is None and subcategory_id is None:
         return RedirectResponse("/", status_code=303)
 
-    questions = get_playable_questions(
-        subcategory_id=subcategory_id,
-        limit=None if all_questions else limit,
+    if spec is None and not all_questions and limit is None:
+        return RedirectResponse("/", status_code=303)
+
+    student_id = _student_id(request)
+
+    # Adaptativo: la siguiente pregunta depende de las respuestas
+    adaptive_test = None
+    if adaptive and spec is None:
+        adaptive_test = start_adaptive(subcategory_id)
+        exam = True
+
+    practice = spec is None and not exam
+
+    if spec is not None:
+        try:
+            quotas = allocate(parse_exam_spec(spec), limit)
+        except ValueError:
+            return RedirectResponse("/", status_code=303)
+    elif exam:
+        quotas = {subcategory_id: None if all_questions else limit}
+    else:
+        quotas = None
+
+    # Examen con formularios pregenerados: búsqueda en memoria,
+    # sin escaneo del banco ni barajado en el pico de inicio
+    assigned = (
+        form_cache.assign(spec_key(quotas))
+        if exam and adaptive_test is None else None
     )
+    form_id = None
+    revisions = None
+
+    if assigned is not None:
+        form_id, question_ids, revisions = assigned
+
+    elif adaptive_test is not None:
+        question_ids = [int(qid) for qid in adaptive_test.ids]
+
+    elif spec is not None:
+        question_ids = [qid for qid, _ in sample_playable_questions(quotas)]
+        random.shuffle(question_ids)
+
+    elif exam:
+        question_ids = [
+            q.id for q in get_playable_questions(
+                subcategory_id=subcategory_id,
+                limit=None if all_questions else limit,
+            )
+        ]
 
-    if not questions:
+    else:
+        # Entrenamiento: todo el banco es candidato, el scheduler
+        # decide el orden según el estado de repaso del estudiante
+        question_ids = [
+            q.id for q in get_playable_questions(subcategory_id=subcategory_id)
+        ]
+
+    if not question_ids:
         return RedirectResponse("/", status_code=303)
 
+    # El examen fija las revisiones con las que empezó: editar
+    # una pregunta no cambia lo que se muestra ni cómo se califica
+    if revisions is None and not practice:
+        revisions = get_current_revision_ids(question_ids)
+
+    if (practice or adaptive_test is not None) and not all_questions:
+        total = min(limit, len(question_ids))
+    else:
+        total = len(question_ids)
+
     SESSION.clear()
     SESSION.update({
-        "queue": [q.id for q in questions],
+        "student_id": student_id,
+        "subcategory_id": subcategory_id,
+        # None → la siguiente pregunta la decide el scheduler
+        # (o el test adaptativo)
+        "queue": None if practice or adaptive_test else question_ids,
+        "total": total,
         "current": 0,
         "correct": 0,
         "start_time": time.time(),
         "time_limit": time_limit * 60,
         "mode": "exam" if exam else "training",
         "answers": [],
+        "shown_at": time.time(),
+        "form_id": form_id,
+        "revisions": revisions,
+        "adaptive": adaptive_test,
     })
 
-    first_question = get_question(SESSION["queue"][0])
+    if practice:
+        scheduler.start(student_id, subcategory_id, question_ids)
 
-    return templates.TemplateResponse(
+    first_question = _next_session_question()
+
+    if first_question is None:
+        return RedirectResponse("/", status_code=303)
+
+    response = templates.TemplateResponse(
         "play.html",
         {
             "request": request,
             "question": first_question,
-            "subcategory_id": subcategory_id,
+            "subcategory_id": _session_subcategory(first_question),
             "training": True,
             "remaining_time": SESSION["time_limit"],
             "progress": {
                 "current": 1,
-                "total": len(SESSION["queue"]),
+                "total": SESSION["total"],
             },
         },
     )
+    _set_student_cookie(response, student_id)
+    return response
 
 # =====================================================
 # PLAY — RESPUESTA
 # =====================================================
 
+def _session_question(question_id: int):
+    """
+    Pregunta a mostrar: la revisión fijada por el examen
+    o, en entrenamiento, la vigente.
+    """
+    pinned = (SESSION.get("revisions") or {}).get(question_id)
+    if pinned is not None:
+        return get_question_at_revision(pinned)
+    return get_question(question_id)
+
+
+def _next_session_question(exclude: int | None = None):
+    """
+    Siguiente pregunta de la sesión: cola fija del examen,
+    scheduler (práctica) o test adaptativo. Las que ya no
+    existen (borradas y sin revisión fijada) se saltan y salen
+    de la sesión. None: no queda ninguna.
+    """
+    adaptive_test = SESSION.get("adaptive")
+    queue = SESSION["queue"]
+
+    practice = None
+    if queue is None and adaptive_test is None:
+        practice = scheduler.get(SESSION["student_id"], SESSION["subcategory_id"])
+
+    while SESSION["current"] < SESSION["total"]:
+        if adaptive_test is not None:
+            question_id = adaptive_test.next_item()
+        elif practice is not None:
+            question_id = practice.next_question(exclude=exclude)
+        elif queue is not None:
+            question_id = queue[SESSION["current"]]
+        else:
+            question_id = None
+
+        if question_id is None:
+            return None
+
+        question = _session_question(question_id)
+        if question is not None:
+            return question
+
+        if adaptive_test is not None:
+            adaptive_test.discard(question_id)
+        elif practice is not None:
+            practice.discard(question_id)
+        else:
+            del queue[SESSION["current"]]
+            SESSION["total"] -= 1
+
+    return None
+
+
+def _session_subcategory(question) -> int | None:
+    """
+    La de la sesión; en un examen mixto, la de la pregunta.
+    """
+    if SESSION["subcategory_id"] is not None:
+        return SESSION["subcategory_id"]
+    return question.subcategory_id
+
+
 @app.post("/play/answer", response_class=HTMLResponse)
 def play_answer(
     request: Request,
     question_id: int = Form(...),
-    subcategory_id: int = Form(...),
+    subcategory_id: int | None = Form(None),
     user_answer: str = Form(...),
 ):
     elapsed = time.time() - SESSION["start_time"]
@@ -561,34 +1143,71 @@ def play_answer(
     if remaining <= 0:
         return play_timeout(request)
 
+    now = time.time()
+    elapsed_ms = int((now - SESSION["shown_at"]) * 1000)
+
+    # Se califica siempre (también en examen) para registrar el
+    # historial; en examen simplemente no se muestra el resultado.
+    graded = evaluate_question(
+        question_id,
+        user_answer,
+        elapsed_ms,
+        revision_id=(SESSION["revisions"] or {}).get(question_id),
+    )
+
     SESSION["answers"].append({
         "question_id": question_id,
         "user_answer": user_answer,
+        "correct": graded.correct,
     })
 
-    result = None
-    if SESSION["mode"] == "training":
-        result = evaluate_question(question_id, user_answer)
-        if result.correct:
-            SESSION["correct"] += 1
+    attempt_log.record(
+        student_id=SESSION["student_id"],
+        question_id=question_id,
+        mode=SESSION["mode"],
+        user_answer=user_answer,
+        correct=graded.correct,
+        elapsed_ms=elapsed_ms,
+        form_id=SESSION["form_id"],
+    )
+
+    if graded.correct:
+        SESSION["correct"] += 1
+
+    adaptive_test = SESSION.get("adaptive")
+    if adaptive_test is not None:
+        adaptive_test.record(question_id, graded.correct)
+
+    practice = None
+    if SESSION["queue"] is None and adaptive_test is None:
+        practice = scheduler.get(SESSION["student_id"], SESSION["subcategory_id"])
+        if practice is not None:
+            practice.record(question_id, graded.correct)
+
+    result = graded if SESSION["mode"] == "training" else None
 
     SESSION["current"] += 1
 
-    if SESSION["current"] >= len(SESSION["queue"]):
+    # precisión suficiente: no hace falta agotar el límite
+    if adaptive_test is not None and adaptive_test.se <= STOP_SE:
+        return play_timeout(request)
+
+    next_question = _next_session_question(exclude=question_id)
+
+    if next_question is None:
         return play_timeout(request)
 
-    next_q_id = SESSION["queue"][SESSION["current"]]
-    next_question = get_question(next_q_id)
+    SESSION["shown_at"] = now
 
     context = {
         "request": request,
         "question": next_question,
-        "subcategory_id": subcategory_id,
+        "subcategory_id": _session_subcategory(next_question),
         "training": True,
         "remaining_time": remaining,
         "progress": {
             "current": SESSION["current"] + 1,
-            "total": len(SESSION["queue"]),
+            "total": SESSION["total"],
         },
     }
 
@@ -605,11 +1224,16 @@ def play_answer(
 def play_timeout(request: Request):
     attempts = SESSION.get("current", 0)
 
-    correct = 0
-    for a in SESSION.get("answers", []):
-        r = evaluate_question(a["question_id"], a["user_answer"])
-        if r.correct:
-            correct += 1
+    # Las respuestas ya se calificaron en /play/answer
+    correct = sum(1 for a in SESSION.get("answers", []) if a["correct"])
+
+    adaptive_test = SESSION.get("adaptive")
+    ability = None
+    if adaptive_test is not None:
+        ability = {
+            "theta": round(adaptive_test.theta, 2),
+            "se": round(adaptive_test.se, 2),
+        }
 
     return templates.TemplateResponse(
         "play.html",
@@ -619,7 +1243,41 @@ def play_timeout(request: Request):
                 "attempts": attempts,
                 "correct": correct,
                 "timeout": True,
+                "ability": ability,
             },
             "training": False,
         },
-    )
\ No newline at end of file
+    )
+
+# =====================================================
+# EXAMEN SIN CONEXIÓN
+# =====================================================
+
+@app.get("/export/bundle/{subcategory_id}")
+def export_bundle(subcategory_id: int):
+    """
+    Paquete JSON autocontenido para rendir sin conexión:
+    respuestas como hashes con sal (ver services/offline_bundle.py).
+    """
+    bundle = build_bundle(subcategory_id)
+
+    return JSONResponse(
+        bundle,
+        headers={
+            "Content-Disposition":
+                f'attachment; filename="bundle-{subcategory_id}.json"',
+        },
+    )
+
+
+@app.post("/play/bundle/results")
+def upload_bundle_results(request: Request, answers: list[dict] = Body(..., embed=True)):
+    """
+    Resultados de un paquete, en un solo envío al terminar:
+    {"answers": [{"question_id", "revision_id", "user_answer",
+                  "elapsed_ms"?, "correct"?}]}
+    """
+    try:
+        return {"ok": True, **grade_bundle_results(_student_id(request), answers)}
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
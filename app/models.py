@@ -1,5 +1,7 @@
 # app/models.py
 
+import json
+
 from sqlalchemy import (
     Column,
     Integer,
@@ -7,8 +9,11 @@ from sqlalchemy import (
     Text,
     Float,
     Boolean,
+    LargeBinary,
     ForeignKey,
+    Index,
     CheckConstraint,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 
@@ -25,10 +30,17 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, nullable=False)
 
+    # archivo SQLite donde vive su contenido (0 = data.db).
+    # Se fija al crearla; el shard guarda una copia de la fila.
+    shard = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # el borrado lo resuelve la DB (ON DELETE CASCADE):
+    # el ORM no carga las hijas para borrarlas una a una
     subcategories = relationship(
         "Subcategory",
         back_populates="category",
         cascade="all, delete",
+        passive_deletes=True,
     )
 
 
@@ -38,13 +50,15 @@ class Category(Base):
 
 class Subcategory(Base):
     __tablename__ = "subcategories"
+    # ids globales entre shards (sqlite_sequence sembrado)
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
 
     category_id = Column(
         Integer,
-        ForeignKey("categories.id"),
+        ForeignKey("categories.id", ondelete="CASCADE"),
         nullable=False,
     )
 
@@ -57,6 +71,7 @@ class Subcategory(Base):
         "Question",
         back_populates="subcategory",
         cascade="all, delete",
+        passive_deletes=True,
     )
 
 
@@ -79,12 +94,32 @@ class Question(Base):
     # Respuesta directa (solo si NO es CHOICE)
     answer = Column(Text, nullable=True)
 
+    # TEXT / EQUATION: alternativas aceptadas (JSON, tal cual) y
+    # conjunto normalizado de todas las aceptadas (ver domain/answers.py)
+    alt_answers = Column(Text, nullable=True)
+    answer_keys = Column(Text, nullable=True)
+
     # Tolerancia numérica (solo NUMERIC)
     tolerance = Column(Float, nullable=True)
 
+    # Huella del contenido normalizado (detección de duplicados)
+    content_hash = Column(String(64), nullable=True)
+
+    # Desnormalizado (solo CHOICE): calificar y comprobar si es
+    # jugable sin leer las alternativas. Lo mantiene crud.
+    correct_option_id = Column(Integer, nullable=True)
+    option_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Sube con cada cambio que afecta a la calificación
+    # (clave de la caché de resultados)
+    revision = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Foto inmutable vigente (question_revisions.id)
+    current_revision_id = Column(Integer, nullable=True)
+
     subcategory_id = Column(
         Integer,
-        ForeignKey("subcategories.id"),
+        ForeignKey("subcategories.id", ondelete="CASCADE"),
         nullable=False,
     )
 
@@ -97,6 +132,7 @@ class Question(Base):
         "Option",
         back_populates="question",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     __table_args__ = (
@@ -132,6 +168,16 @@ class Question(Base):
             """,
             name="question_tolerance_only_numeric",
         ),
+
+        # R5 — sin duplicados exactos dentro de una subcategoría
+        Index(
+            "uq_question_content",
+            "subcategory_id",
+            "content_hash",
+            unique=True,
+        ),
+
+        {"sqlite_autoincrement": True},
     )
 
 
@@ -156,4 +202,278 @@ class Option(Base):
     question = relationship(
         "Question",
         back_populates="options",
-    )
\ No newline at end of file
+    )
+
+    __table_args__ = (
+        # búsquedas y cascadas por pregunta
+        Index("ix_options_question", "question_id"),
+
+        # R6 — como mucho una alternativa correcta por pregunta
+        Index(
+            "uq_option_correct",
+            "question_id",
+            unique=True,
+            sqlite_where=is_correct.is_(True),
+        ),
+
+        {"sqlite_autoincrement": True},
+    )
+
+
+# =========================
+# QUESTION REVISION (FOTOS INMUTABLES)
+# =========================
+
+class QuestionRevision(Base):
+    """
+    Foto append-only de lo que se muestra y se califica de una
+    pregunta. Cada edición crea una fila nueva; nunca se modifica.
+    options: JSON [{id, text, is_correct}] en orden de id.
+
+    Sin FK a questions: borrar una pregunta no borra sus fotos,
+    así un examen que la fijó puede terminarla.
+    """
+    __tablename__ = "question_revisions"
+
+    id = Column(Integer, primary_key=True)
+
+    question_id = Column(Integer, nullable=False)
+
+    # nº de revisión de la pregunta (questions.revision)
+    revision = Column(Integer, nullable=False)
+
+    statement_text = Column(Text, nullable=True)
+    statement_math = Column(Text, nullable=True)
+    eval_type = Column(String(20), nullable=False)
+    answer = Column(Text, nullable=True)
+    alt_answers = Column(Text, nullable=True)
+    answer_keys = Column(Text, nullable=True)
+    tolerance = Column(Float, nullable=True)
+    correct_option_id = Column(Integer, nullable=True)
+    option_count = Column(Integer, nullable=False, default=0)
+    options = Column(Text, nullable=False, default="[]")
+
+    created_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_question_revisions_question", "question_id"),
+
+        {"sqlite_autoincrement": True},
+    )
+
+    def as_question(self, subcategory_id: int | None = None) -> Question:
+        """
+        Pregunta transitoria (fuera de sesión) con el contenido de
+        esta revisión: la consumen plantillas y evaluadores.
+        """
+        return Question(
+            id=self.question_id,
+            subcategory_id=subcategory_id,
+            statement_text=self.statement_text,
+            statement_math=self.statement_math,
+            eval_type=self.eval_type,
+            answer=self.answer,
+            alt_answers=self.alt_answers,
+            answer_keys=self.answer_keys,
+            tolerance=self.tolerance,
+            correct_option_id=self.correct_option_id,
+            option_count=self.option_count,
+            revision=self.revision,
+            current_revision_id=self.id,
+            options=[
+                Option(id=o["id"], text=o["text"], is_correct=bool(o["is_correct"]))
+                for o in json.loads(self.options or "[]")
+            ],
+        )
+
+
+# =========================
+# ITEM STATE (REPASO ESPACIADO)
+# =========================
+
+class ItemState(Base):
+    """
+    Estado de repaso espaciado de una pregunta para un estudiante.
+    """
+    __tablename__ = "item_states"
+
+    id = Column(Integer, primary_key=True)
+
+    student_id = Column(String(64), nullable=False, index=True)
+
+    question_id = Column(
+        Integer,
+        ForeignKey("questions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    ease = Column(Float, nullable=False, default=2.5)
+    interval = Column(Float, nullable=False, default=0.0)   # días
+    repetitions = Column(Integer, nullable=False, default=0)
+    lapses = Column(Integer, nullable=False, default=0)
+    due_at = Column(Float, nullable=False, default=0.0)     # epoch (s)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "student_id",
+            "question_id",
+            name="item_state_student_question",
+        ),
+        # ON DELETE CASCADE busca por question_id
+        Index("ix_item_states_question", "question_id"),
+    )
+
+
+# =========================
+# ATTEMPT (HISTORIAL DE RESPUESTAS)
+# =========================
+
+class Attempt(Base):
+    """
+    Respuesta registrada de un estudiante.
+    Se escribe en lotes (write-behind), nunca en la ruta caliente.
+    """
+    __tablename__ = "attempts"
+
+    id = Column(Integer, primary_key=True)
+
+    student_id = Column(String(64), nullable=True)
+
+    question_id = Column(
+        Integer,
+        ForeignKey("questions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    mode = Column(String(20), nullable=False)
+    user_answer = Column(Text, nullable=True)
+    correct = Column(Boolean, nullable=True)
+    elapsed_ms = Column(Integer, nullable=True)
+    created_at = Column(Float, nullable=False)
+
+    # formulario pregenerado del que salió la pregunta (si aplica)
+    form_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_attempts_question", "question_id"),
+        Index("ix_attempts_student", "student_id"),
+    )
+
+
+# =========================
+# QUESTION STATS (CONTADORES INCREMENTALES)
+# =========================
+
+class QuestionStats(Base):
+    """
+    Contadores acumulados por pregunta.
+    Se actualizan por deltas, nunca con agregados sobre attempts.
+    """
+    __tablename__ = "question_stats"
+
+    question_id = Column(
+        Integer,
+        ForeignKey("questions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+
+    # suma de tiempos y nº de intentos con tiempo medido
+    time_sum_ms = Column(Integer, nullable=False, default=0)
+    timed = Column(Integer, nullable=False, default=0)
+
+    # JSON {respuesta_normalizada: conteo}, top-K acotado
+    wrong_answers = Column(Text, nullable=False, default="{}")
+
+    updated_at = Column(Float, nullable=True)
+
+
+# =========================
+# QUESTION BAND (ÍNDICE LSH DE CASI-DUPLICADOS)
+# =========================
+
+class QuestionBand(Base):
+    """
+    Un bucket MinHash por banda y pregunta.
+    Candidatas a casi-duplicado = mismas (band, bucket).
+    """
+    __tablename__ = "question_bands"
+
+    question_id = Column(
+        Integer,
+        ForeignKey("questions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    band = Column(Integer, primary_key=True)
+    bucket = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_question_bands_bucket", "band", "bucket"),
+    )
+
+
+# =========================
+# BANK META (VERSIÓN DEL BANCO)
+# =========================
+
+class BankMeta(Base):
+    """
+    Fila única (id = 1) con la versión monótona del banco.
+    """
+    __tablename__ = "bank_meta"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(Float, nullable=False)
+
+
+# =========================
+# EXAM FORM (FORMULARIOS PREGENERADOS)
+# =========================
+
+class ExamForm(Base):
+    """
+    Formulario de examen barajado con semilla fija.
+    question_ids: array compacto de int64 (little-endian).
+    """
+    __tablename__ = "exam_forms"
+
+    id = Column(Integer, primary_key=True)
+
+    spec_key = Column(String(255), nullable=False)
+    seed = Column(Integer, nullable=False)
+    question_ids = Column(LargeBinary, nullable=False)
+
+    # al regenerar, los anteriores se desactivan (no se borran:
+    # los intentos siguen siendo reproducibles)
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_exam_forms_spec_active", "spec_key", "active"),
+    )
+
+
+# =========================
+# ITEM PARAMS (IRT 2PL)
+# =========================
+
+class ItemParams(Base):
+    """
+    Parámetros 2PL calibrados offline a partir del historial:
+    P(acierto | θ) = 1 / (1 + exp(-a (θ - b))).
+    """
+    __tablename__ = "item_params"
+
+    question_id = Column(
+        Integer,
+        ForeignKey("questions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    a = Column(Float, nullable=False)           # discriminación
+    b = Column(Float, nullable=False)           # dificultad
+    responses = Column(Integer, nullable=False)  # respuestas usadas
+    calibrated_at = Column(Float, nullable=False)
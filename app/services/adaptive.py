@@ -0,0 +1,132 @@
+# app/services/adaptive.py
+
+import threading
+import time
+
+import numpy as np
+
+from app.crud import (
+    get_bank_version,
+    get_calibration_responses,
+    get_item_bank,
+    save_item_params,
+)
+from app.domain.irt import DEFAULT_A, DEFAULT_B, AdaptiveTest, calibrate_2pl
+
+
+# =====================================================
+# PARÁMETROS
+# =====================================================
+
+# Respuestas mínimas para guardar la calibración de un ítem
+MIN_RESPONSES = 20
+
+# El test termina antes del límite si el error típico de θ
+# baja de este valor
+STOP_SE = 0.3
+
+
+# =====================================================
+# CALIBRACIÓN (acción de admin)
+# =====================================================
+
+def calibrate_subcategory(subcategory_id: int) -> dict:
+    """
+    Calibra (a, b) de las preguntas de una subcategoría con el
+    historial de primeras respuestas. Los ítems con menos de
+    MIN_RESPONSES respuestas conservan lo que tuvieran.
+    """
+    rows = get_calibration_responses(subcategory_id)
+
+    if not rows:
+        return {"responses": 0, "students": 0, "calibrated": 0}
+
+    student_ids = {}
+    question_ids = {}
+
+    students = np.fromiter(
+        (student_ids.setdefault(s, len(student_ids)) for s, _, _ in rows),
+        dtype=np.intp, count=len(rows),
+    )
+    items = np.fromiter(
+        (question_ids.setdefault(q, len(question_ids)) for _, q, _ in rows),
+        dtype=np.intp, count=len(rows),
+    )
+    y = np.fromiter((1.0 if c else 0.0 for _, _, c in rows), dtype=float, count=len(rows))
+
+    a, b = calibrate_2pl(students, items, y, len(question_ids))
+    seen = np.bincount(items, minlength=len(question_ids))
+
+    now = time.time()
+    params = [
+        {
+            "question_id": qid,
+            "a": float(a[i]),
+            "b": float(b[i]),
+            "responses": int(seen[i]),
+            "calibrated_at": now,
+        }
+        for qid, i in question_ids.items()
+        if seen[i] >= MIN_RESPONSES
+    ]
+
+    save_item_params(subcategory_id, params)
+    item_banks.invalidate(subcategory_id)
+
+    return {
+        "responses": len(rows),
+        "students": len(student_ids),
+        "calibrated": len(params),
+    }
+
+
+# =====================================================
+# BANCO DE ÍTEMS EN MEMORIA
+# =====================================================
+
+class ItemBankCache:
+    """
+    Arrays (ids, a, b) por subcategoría. Se recargan si cambia
+    la versión del banco o tras recalibrar.
+    """
+
+    def __init__(self):
+        self._banks: dict[int, tuple[int, np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, subcategory_id: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        version = get_bank_version()[0]
+
+        with self._lock:
+            cached = self._banks.get(subcategory_id)
+
+        if cached is not None and cached[0] == version:
+            return cached[1:]
+
+        rows = get_item_bank(subcategory_id)
+
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        a = np.array([DEFAULT_A if r[1] is None else r[1] for r in rows], dtype=float)
+        b = np.array([DEFAULT_B if r[2] is None else r[2] for r in rows], dtype=float)
+
+        with self._lock:
+            self._banks[subcategory_id] = (version, ids, a, b)
+
+        return ids, a, b
+
+    def invalidate(self, subcategory_id: int | None = None):
+        with self._lock:
+            if subcategory_id is None:
+                self._banks.clear()
+            else:
+                self._banks.pop(subcategory_id, None)
+
+
+item_banks = ItemBankCache()
+
+
+def start_adaptive(subcategory_id: int) -> AdaptiveTest | None:
+    ids, a, b = item_banks.get(subcategory_id)
+    if not len(ids):
+        return None
+    return AdaptiveTest(ids, a, b)
@@ -1,23 +1,41 @@
 # app/services/admin_service.py
 
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+
+from sqlalchemy.exc import IntegrityError
+
+from app.domain.answers import MULTI_ANSWER_TYPES, answer_keys, clean_alternates, dump_alternates
 from app.domain.eval_types import EVAL_TYPES
-from app.crud import create_question
+from app.domain.errors import DuplicateQuestionError
+from app.domain.fingerprint import content_hash
+from app.domain.minhash import band_buckets, jaccard, shingles, signature
+from app.crud import (
+    create_question,
+    find_band_candidates,
+    find_question_by_hash,
+    save_question_bands,
+    save_question_batch,
+    update_question,
+)
 
 
-def create_question_from_admin(
-    *,
-    subcategory_id: int,
+# Índice LSH de casi-duplicados (opcional: cuesta ~1 ms por alta)
+NEAR_DUPLICATE_INDEX = True
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# filas por transacción al insertar una importación
+INSERT_BATCH_SIZE = 200
+
+
+def _prepare(
     raw_statement: str,
     eval_type: str,
-    answer: str | None = None,
-    tolerance: float | None = None,
-) -> int:
+    answer: str | None,
+    tolerance: float | None,
+) -> tuple[str, str | None, str | None, float | None]:
     """
-    Application service para creación de preguntas desde admin.
-
-    Decisión actual:
-    - El admin guarda texto normal
-    - statement_math se reserva para matemáticas
+    Reglas de dominio compartidas por alta y reemplazo.
     """
 
     # -------------------------------------------------
@@ -66,14 +84,230 @@ def create_question_from_admin(
 
         tolerance = None
 
+    return statement_text, statement_math, answer, tolerance
+
+
+@dataclass(frozen=True)
+class PreparedQuestion:
+    """
+    Pregunta validada y con sus claves ya calculadas
+    (huella exacta, bandas LSH y respuestas aceptadas
+    normalizadas), lista para insertar.
+    """
+    subcategory_id: int
+    statement_text: str
+    statement_math: str | None
+    eval_type: str
+    answer: str | None
+    tolerance: float | None
+    content_hash: str | None
+    buckets: tuple[int, ...]
+    alt_answers: tuple[str, ...] = ()
+    answer_keys: str | None = None
+
+
+def prepare_question(
+    *,
+    subcategory_id: int,
+    raw_statement: str,
+    eval_type: str,
+    answer: str | None = None,
+    tolerance: float | None = None,
+    alt_answers: list[str] | None = None,
+) -> PreparedQuestion:
+    """
+    Parte pura (solo CPU) del alta: no toca la base de datos,
+    así que puede ejecutarse en otro proceso.
+    """
+
+    statement_text, statement_math, answer, tolerance = _prepare(
+        raw_statement, eval_type, answer, tolerance
+    )
+    alternates = _alternates(eval_type, alt_answers)
+
+    return PreparedQuestion(
+        subcategory_id=subcategory_id,
+        statement_text=statement_text,
+        statement_math=statement_math,
+        eval_type=eval_type,
+        answer=answer,
+        tolerance=tolerance,
+        content_hash=content_hash(statement_text, statement_math, eval_type, answer),
+        buckets=_buckets(statement_text) if NEAR_DUPLICATE_INDEX else (),
+        alt_answers=alternates,
+        answer_keys=answer_keys(eval_type, answer, dump_alternates(alternates)),
+    )
+
+
+def _alternates(eval_type: str, alt_answers: list[str] | None) -> tuple[str, ...]:
+    """
+    Solo TEXT / EQUATION admiten respuestas alternativas.
+    """
+    if eval_type not in MULTI_ANSWER_TYPES:
+        return ()
+    return tuple(clean_alternates(alt_answers))
+
+
+def create_question_from_admin(
+    *,
+    subcategory_id: int,
+    raw_statement: str,
+    eval_type: str,
+    answer: str | None = None,
+    tolerance: float | None = None,
+    alt_answers: list[str] | None = None,
+) -> int:
+    """
+    Application service para creación de preguntas desde admin.
+
+    Decisión actual:
+    - El admin guarda texto normal
+    - statement_math se reserva para matemáticas
+    - Un duplicado exacto (mismo enunciado + respuesta
+      normalizados en la subcategoría) lanza DuplicateQuestionError
+    """
+
+    return save_prepared_question(prepare_question(
+        subcategory_id=subcategory_id,
+        raw_statement=raw_statement,
+        eval_type=eval_type,
+        answer=answer,
+        tolerance=tolerance,
+        alt_answers=alt_answers,
+    ))
+
+
+def save_prepared_question(p: PreparedQuestion) -> int:
+    """
+    Parte serializada del alta: duplicados e inserción.
+    """
+
     # -------------------------------------------------
-    # 4. Persistir (CRUD)
+    # 4. Duplicados exactos (índice único, O(1))
     # -------------------------------------------------
-    return create_question(
-        subcategory_id=subcategory_id,
+    subcategory_id = p.subcategory_id
+    h = p.content_hash
+
+    if h is not None:
+        existing = find_question_by_hash(subcategory_id, h)
+        if existing is not None:
+            raise DuplicateQuestionError(existing)
+
+    # -------------------------------------------------
+    # 5. Persistir (CRUD)
+    # -------------------------------------------------
+    try:
+        qid = create_question(
+            subcategory_id=subcategory_id,
+            statement_text=p.statement_text,
+            statement_math=p.statement_math,
+            eval_type=p.eval_type,
+            answer=p.answer,
+            tolerance=p.tolerance,
+            content_hash=h,
+            alt_answers=list(p.alt_answers),
+        )
+    except IntegrityError:
+        # carrera con otra alta idéntica
+        existing = find_question_by_hash(subcategory_id, h) if h else None
+        if existing is None:
+            raise
+        raise DuplicateQuestionError(existing)
+
+    if NEAR_DUPLICATE_INDEX:
+        save_question_bands(qid, p.buckets)
+
+    return qid
+
+
+def save_prepared_batch(
+    prepared: list[PreparedQuestion],
+    update_duplicates: bool = False,
+) -> list[tuple]:
+    """
+    Inserción de una importación: una transacción por lote de
+    INSERT_BATCH_SIZE filas, sin recalcular nada de lo que ya
+    viene preparado. Resultados por fila, en orden (ver
+    crud.save_question_batch).
+    """
+    outcomes = []
+
+    for start in range(0, len(prepared), INSERT_BATCH_SIZE):
+        batch = prepared[start:start + INSERT_BATCH_SIZE]
+        outcomes += save_question_batch([asdict(p) for p in batch], update_duplicates)
+
+    return outcomes
+
+
+def replace_question_from_admin(
+    *,
+    question_id: int,
+    raw_statement: str,
+    eval_type: str,
+    answer: str | None = None,
+    tolerance: float | None = None,
+    alt_answers: list[str] | None = None,
+) -> bool:
+    """
+    Sobrescribe una pregunta existente (p. ej. un duplicado
+    detectado al reimportar) con los datos entrantes.
+    """
+
+    statement_text, statement_math, answer, tolerance = _prepare(
+        raw_statement, eval_type, answer, tolerance
+    )
+
+    return update_question(
+        question_id=question_id,
         statement_text=statement_text,
         statement_math=statement_math,
         eval_type=eval_type,
         answer=answer,
         tolerance=tolerance,
-    )
\ No newline at end of file
+        content_hash=content_hash(statement_text, statement_math, eval_type, answer),
+        alt_answers=list(_alternates(eval_type, alt_answers)),
+    )
+
+
+# =====================================================
+# CASI-DUPLICADOS
+# =====================================================
+
+@lru_cache(maxsize=1024)
+def _buckets(statement: str) -> tuple[int, ...]:
+    return tuple(band_buckets(signature(shingles(statement))))
+
+
+def find_near_duplicates(
+    subcategory_id: int,
+    statement: str,
+    exclude_id: int | None = None,
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+    buckets: tuple[int, ...] | None = None,
+) -> list[tuple[int, float]]:
+    """
+    Casi-duplicados por LSH: solo se comparan (Jaccard exacto)
+    las candidatas que comparten alguna banda. `buckets` evita
+    recalcular la firma si ya viene preparada.
+    """
+    statement = statement.strip()
+
+    if buckets is None:
+        buckets = _buckets(statement)
+
+    candidates = find_band_candidates(
+        subcategory_id,
+        list(buckets),
+        exclude_id=exclude_id,
+    )
+
+    mine = shingles(statement)
+    found = []
+
+    for qid, st_text, st_math in candidates:
+        other = " ".join(p for p in (st_text, st_math) if p)
+        sim = jaccard(mine, shingles(other))
+        if sim >= threshold:
+            found.append((qid, round(sim, 3)))
+
+    return sorted(found, key=lambda x: -x[1])
@@ -0,0 +1,177 @@
+# app/services/attempt_log.py
+
+import logging
+import threading
+import time
+
+from app.crud import save_attempts
+from app.domain.errors import UnsavedAttemptsError
+from app.services.question_stats import question_stats
+
+logger = logging.getLogger(__name__)
+
+
+# =====================================================
+# PARÁMETROS
+# =====================================================
+
+# Se vacía el buffer cada N ms o al llegar a M filas
+FLUSH_INTERVAL_MS = 500
+FLUSH_MAX_ROWS = 200
+
+# Tope del buffer si la DB sigue fallando: se descartan los
+# intentos más antiguos (mejor perder historial que memoria)
+MAX_BUFFER_ROWS = 50_000
+
+
+# =====================================================
+# WRITE-BEHIND
+# =====================================================
+
+class AttemptLog:
+    """
+    Buffer en memoria de intentos con persistencia en lotes.
+
+    - record(): O(1), no toca la DB (ruta caliente)
+    - un hilo de fondo vacía el buffer en UNA transacción
+      cada `flush_interval_ms` o cuando hay `max_rows` filas
+    - stop() garantiza el vaciado final (shutdown)
+    - si la escritura falla, las filas vuelven al buffer, que
+      nunca pasa de `max_buffer` filas
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: int = FLUSH_INTERVAL_MS,
+        max_rows: int = FLUSH_MAX_ROWS,
+        max_buffer: int = MAX_BUFFER_ROWS,
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self.max_buffer = max_buffer
+
+        self._buffer: list[dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ---------------------------------
+    # Ruta caliente
+    # ---------------------------------
+
+    def record(
+        self,
+        *,
+        student_id: str | None,
+        question_id: int,
+        mode: str,
+        user_answer: str | None,
+        correct: bool | None,
+        elapsed_ms: int | None = None,
+        form_id: int | None = None,
+    ):
+        row = {
+            "student_id": student_id,
+            "question_id": question_id,
+            "mode": mode,
+            "user_answer": user_answer,
+            "correct": correct,
+            "elapsed_ms": elapsed_ms,
+            "form_id": form_id,
+            "created_at": time.time(),
+        }
+
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.max_rows
+
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    # ---------------------------------
+    # Persistencia
+    # ---------------------------------
+
+    def flush(self) -> int:
+        """
+        Vacía el buffer en un solo lote, junto con los deltas de
+        estadísticas por pregunta (misma transacción).
+        Si la escritura falla, todo vuelve a memoria.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+
+            stats = question_stats.drain()
+
+            if not rows and not stats:
+                return 0
+
+            try:
+                return save_attempts(rows, stats, top_k=question_stats.top_k)
+            except UnsavedAttemptsError as e:
+                # solo vuelve a memoria lo que no se guardó
+                logger.exception("attempt log flush incomplete (%d rows)", len(e.rows))
+                self._requeue(e.rows)
+                question_stats.restore(e.stats)
+                return len(rows) - len(e.rows)
+            except Exception:
+                logger.exception("attempt log flush failed (%d rows)", len(rows))
+                self._requeue(rows)
+                question_stats.restore(stats)
+                return 0
+
+    def _requeue(self, rows: list[dict]):
+        """
+        Devuelve filas no guardadas al frente del buffer; si se
+        pasa del tope, descarta las más antiguas.
+        """
+        with self._lock:
+            self._buffer[:0] = rows
+            dropped = len(self._buffer) - self.max_buffer
+            if dropped > 0:
+                del self._buffer[:dropped]
+
+        if dropped > 0:
+            logger.warning("attempt log buffer full: dropped %d oldest rows", dropped)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    # ---------------------------------
+    # Ciclo de vida
+    # ---------------------------------
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="attempt-log",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self.flush()
+
+
+attempt_log = AttemptLog()
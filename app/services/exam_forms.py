@@ -0,0 +1,165 @@
+# app/services/exam_forms.py
+
+import itertools
+import random
+import threading
+
+from app.crud import (
+    deactivate_exam_forms,
+    get_active_exam_forms,
+    get_current_revision_ids,
+    get_playable_question_ids,
+    save_exam_forms,
+)
+from app.domain.exam_spec import spec_key, spec_subcategories
+
+
+# =====================================================
+# GENERACIÓN (acción de admin)
+# =====================================================
+
+def build_form(
+    pool: dict[int, list[int]],
+    quotas: dict[int, int | None],
+    seed: int,
+) -> list[int]:
+    """
+    Formulario determinista: mismo pool + misma semilla →
+    mismas preguntas en el mismo orden.
+    """
+    rng = random.Random(seed)
+    ids: list[int] = []
+
+    for sid in sorted(quotas):
+        candidates = pool.get(sid, [])
+        n = quotas[sid]
+        n = len(candidates) if n is None else min(n, len(candidates))
+        ids.extend(rng.sample(candidates, n))
+
+    rng.shuffle(ids)
+    return ids
+
+
+def generate_exam_forms(
+    quotas: dict[int, int | None],
+    count: int,
+    seed: int | None = None,
+) -> list[int]:
+    """
+    Pregenera `count` formularios para unas cuotas con UN solo
+    escaneo del banco. Devuelve los ids de formulario.
+    """
+    if count < 1:
+        raise ValueError("At least one form is required")
+
+    pool = get_playable_question_ids(list(quotas))
+
+    if not any(pool.values()):
+        raise ValueError("No playable questions for this spec")
+
+    base = seed if seed is not None else random.randrange(2**31)
+
+    forms = [
+        (base + i, build_form(pool, quotas, base + i))
+        for i in range(count)
+    ]
+
+    form_ids = save_exam_forms(spec_key(quotas), forms)
+    form_cache.invalidate(spec_key(quotas))
+
+    return form_ids
+
+
+# =====================================================
+# ASIGNACIÓN (inicio de examen)
+# =====================================================
+
+class ExamFormCache:
+    """
+    Formularios activos por especificación, en memoria.
+    Asignar un formulario es O(1) tras la primera carga;
+    el reparto es round-robin para equilibrar formularios.
+
+    Al asignar se comprueba que sus preguntas siguen existiendo,
+    en las subcategorías de la especificación y jugables (la
+    misma consulta que fija las revisiones): un borrado, un
+    movimiento masivo o una opción eliminada invalidan el
+    formulario aunque la caché de otro worker no lo haya visto.
+    """
+
+    def __init__(self):
+        self._forms: dict[str, list[tuple[int, list[int]]]] = {}
+        self._turns: dict[str, itertools.count] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, key: str) -> list[tuple[int, list[int]]]:
+        with self._lock:
+            forms = self._forms.get(key)
+
+        if forms is None:
+            forms = get_active_exam_forms(key)
+            with self._lock:
+                self._forms[key] = forms
+
+        return forms
+
+    def assign(self, key: str) -> tuple[int, list[int], dict[int, int]] | None:
+        """
+        (id de formulario, preguntas, revisiones vigentes). Un
+        formulario con preguntas no válidas se retira y se prueba
+        el siguiente; None si no queda ninguno válido.
+        """
+        subcategory_ids = spec_subcategories(key)
+
+        while True:
+            forms = self._load(key)
+            if not forms:
+                return None
+
+            with self._lock:
+                turn = next(self._turns.setdefault(key, itertools.count()))
+
+            form_id, ids = forms[turn % len(forms)]
+
+            revisions = get_current_revision_ids(ids, subcategory_ids)
+            if len(revisions) == len(set(ids)):
+                return form_id, list(ids), revisions
+
+            self.retire(key, [form_id])
+
+    def retire(self, key: str, form_ids: list[int]):
+        deactivate_exam_forms(form_ids)
+
+        with self._lock:
+            forms = self._forms.get(key)
+            if forms is not None:
+                self._forms[key] = [f for f in forms if f[0] not in form_ids]
+
+    def invalidate(self, key: str | None = None):
+        with self._lock:
+            if key is None:
+                self._forms.clear()
+            else:
+                self._forms.pop(key, None)
+
+
+form_cache = ExamFormCache()
+
+
+def retire_stale_forms() -> int:
+    """
+    Tras un borrado: desactiva los formularios activos que
+    incluyen preguntas que ya no existen. Devuelve cuántos.
+    """
+    forms = get_active_exam_forms()
+    if not forms:
+        return 0
+
+    existing = get_current_revision_ids(sorted({qid for _, ids in forms for qid in ids}))
+    stale = [fid for fid, ids in forms if any(qid not in existing for qid in ids)]
+
+    if stale:
+        deactivate_exam_forms(stale)
+        form_cache.invalidate()
+
+    return len(stale)
@@ -1,24 +1,90 @@
 # app/services/exam_session.py
 
+import threading
+from collections import OrderedDict
+
 from app.engine.evaluator import evaluate_answer, Result
-from app.crud import get_question
+from app.crud import get_question_for_grading
+from app.services.question_stats import question_stats
 from app.domain.normalization import (
     normalize_text,
     normalize_equation,
 )
 
 
+# =====================================================
+# CACHÉ DE RESULTADOS
+# =====================================================
+
+# Respuestas normalizadas idénticas se repiten miles de veces
+# por pregunta en una cohorte: calificar cada una solo una vez
+GRADE_CACHE_SIZE = 50_000
+
+
+class GradeCache:
+    """
+    LRU acotado: (id de revisión, respuesta normalizada) → Result.
+    Las revisiones son inmutables: una entrada nunca queda
+    obsoleta, las de revisiones viejas simplemente envejecen.
+    """
+
+    def __init__(self, maxsize: int = GRADE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[tuple, Result] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Result | None:
+        with self._lock:
+            result = self._data.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: tuple, result: Result):
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+grade_cache = GradeCache()
+
+
 def normalize_user_answer(question, user_answer: str) -> str:
     """
     R9 — Normalización OBLIGATORIA de la respuesta del usuario
     según el tipo de evaluación.
     """
 
+    return normalize_answer(question.eval_type, user_answer)
+
+
+def normalize_answer(et: str, user_answer: str | None) -> str:
+    """
+    Igual que normalize_user_answer, a partir solo del tipo
+    (p. ej. para reprocesar el historial).
+    """
+
     if user_answer is None:
         return ""
 
-    et = question.eval_type
-
     if et in ("TEXT", "CHOICE"):
         return normalize_text(user_answer)
 
@@ -29,13 +95,22 @@ def normalize_user_answer(question, user_answer: str) -> str:
     return user_answer
 
 
-def evaluate_question(question_id: int, user_answer: str) -> Result:
+def evaluate_question(
+    question_id: int,
+    user_answer: str,
+    elapsed_ms: int | None = None,
+    revision_id: int | None = None,
+) -> Result:
     """
     Punto ÚNICO de entrada a la evaluación.
-    Aquí se impone R9.
+    Aquí se impone R9 y se actualizan los contadores
+    incrementales de la pregunta.
+
+    revision_id: revisión fijada al empezar un examen; sin ella
+    se califica contra la revisión vigente.
     """
 
-    question = get_question(question_id)
+    question = get_question_for_grading(question_id, revision_id)
 
     if question is None:
         return Result.invalid("Pregunta inexistente")
@@ -43,4 +118,21 @@ def evaluate_question(question_id: int, user_answer: str) -> Result:
     # 🔒 R9 APLICADO AQUÍ
     normalized_answer = normalize_user_answer(question, user_answer)
 
-    return evaluate_answer(question, normalized_answer) 
\ No newline at end of file
+    key = (question.current_revision_id, normalized_answer)
+    result = grade_cache.get(key)
+
+    if result is None:
+        result = evaluate_answer(question, normalized_answer)
+        if result.error is None:
+            grade_cache.put(key, result)
+
+    if result.error is None:
+        question_stats.record(
+            question.id,
+            result.correct,
+            normalized_answer,
+            elapsed_ms,
+        )
+
+    return result
+ 
\ No newline at end of file
@@ -0,0 +1,249 @@
+# app/services/import_pipeline.py
+
+"""
+Validación de importaciones en paralelo.
+
+Cada fila (CSV) o bloque (archivo Q:/A:/T:) se valida y se
+prepara — huella exacta, firma MinHash y bandas LSH — en un
+pool de procesos, por trozos de CHUNK_SIZE elementos. Solo
+la inserción posterior es secuencial.
+
+Los workers no tocan la base de datos: reciben datos planos
+y devuelven PreparedQuestion o el mensaje de error.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app.domain.answers import MULTI_ANSWER_TYPES, split_csv_alternates
+from app.domain.eval_types import EVAL_TYPES
+from app.services.admin_service import PreparedQuestion, prepare_question
+
+
+CHUNK_SIZE = 200
+
+# por debajo de esto no compensa arrancar/enviar al pool
+PARALLEL_MIN_ITEMS = 2 * CHUNK_SIZE
+
+IMPORT_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+# Nunca fork: el servidor ya tiene hilos (attempt_log, warm-up,
+# threadpool) y un fork copia sus locks tomados (logging,
+# SQLite) a los workers
+_START_METHOD = (
+    "forkserver"
+    if "forkserver" in multiprocessing.get_all_start_methods()
+    else "spawn"
+)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+# =====================================================
+# TRABAJO POR ELEMENTO (se ejecuta en los workers)
+# =====================================================
+
+Prepared = tuple[PreparedQuestion | None, str | None]
+
+
+def _prepare_csv_row(row: dict) -> Prepared:
+    """
+    Mismas reglas y mismos mensajes que el importador CSV
+    secuencial.
+    """
+    try:
+        subcategory_id = int(row["subcategory_id"])
+
+        statement = (row.get("statement") or "").strip()
+        eval_type = (row.get("eval_type") or "").strip()
+
+        answer = row.get("answer")
+
+        if answer:
+            # permite código multilínea usando \n
+            answer = answer.replace("\\n", "\n").strip()
+        else:
+            answer = None
+
+        tolerance_raw = row.get("tolerance")
+        tolerance = float(tolerance_raw) if tolerance_raw else None
+
+        # ---------------------------
+        # Validaciones
+        # ---------------------------
+
+        if not statement:
+            raise ValueError("statement vacío")
+
+        if eval_type not in EVAL_TYPES:
+            raise ValueError(f"eval_type inválido: {eval_type}")
+
+        # CSV no soporta CHOICE
+        if eval_type == "CHOICE":
+            raise ValueError("CHOICE no soportado en CSV")
+
+        # ---------------------------
+        # Reglas por tipo
+        # ---------------------------
+
+        if eval_type == "NUMERIC":
+            if answer is None:
+                raise ValueError("NUMERIC requiere answer")
+
+        else:
+            if answer is None:
+                raise ValueError(f"{eval_type} requiere answer")
+            tolerance = None
+
+        # TEXT / EQUATION: columna opcional alt_answers, "agua|water"
+        alt_answers = None
+        if eval_type in MULTI_ANSWER_TYPES:
+            alt_answers = split_csv_alternates(row.get("alt_answers")) or None
+
+        return prepare_question(
+            subcategory_id=subcategory_id,
+            raw_statement=statement,
+            eval_type=eval_type,
+            answer=answer,
+            tolerance=tolerance,
+            alt_answers=alt_answers,
+        ), None
+
+    except Exception as e:
+        return None, str(e)
+
+
+def _prepare_block(item: tuple[int, str]) -> Prepared:
+    """
+    Bloque Q:/A:/T:/ALT: → pregunta preparada (una línea ALT:
+    por respuesta alternativa). Un bloque sin enunciado o sin
+    respuesta se ignora (None, None).
+    """
+    subcategory_id, block = item
+
+    statement = None
+    tolerance = None
+    answer_lines = []
+    alt_answers = []
+
+    reading_answer = False
+
+    for line in block.splitlines():
+
+        if line.startswith("Q:"):
+            statement = line[2:].strip()
+            reading_answer = False
+
+        elif line.startswith("A:"):
+            reading_answer = True
+
+            content = line[2:].lstrip()
+            if content:
+                answer_lines.append(content)
+
+        elif line.startswith("ALT:"):
+            reading_answer = False
+            alt_answers.append(line[4:].strip())
+
+        elif line.startswith("T:"):
+
+            reading_answer = False
+
+            try:
+                tolerance = float(line[2:].strip())
+            except ValueError:
+                tolerance = None
+
+        else:
+            if reading_answer:
+                answer_lines.append(line)
+
+    answer = "\n".join(answer_lines).rstrip()
+
+    if not statement or not answer:
+        return None, None
+
+    # ---------------------------
+    # Determinar tipo
+    # ---------------------------
+
+    eval_type = "TEXT"
+
+    if tolerance is not None:
+        eval_type = "NUMERIC"
+
+    if "\n" in answer:
+        eval_type = "SYNTAX"
+
+    try:
+        return prepare_question(
+            subcategory_id=subcategory_id,
+            raw_statement=statement,
+            eval_type=eval_type,
+            answer=answer,
+            tolerance=tolerance,
+            alt_answers=alt_answers,
+        ), None
+    except ValueError as e:
+        return None, str(e)
+
+
+def _run_chunk(fn, items: list) -> list[Prepared]:
+    return [fn(item) for item in items]
+
+
+# =====================================================
+# POOL
+# =====================================================
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=IMPORT_WORKERS,
+                mp_context=multiprocessing.get_context(_START_METHOD),
+            )
+        return _pool
+
+
+def _prepare_all(fn, items: list) -> list[Prepared]:
+    """
+    Resultados en el mismo orden que `items`.
+    """
+    if len(items) < PARALLEL_MIN_ITEMS or IMPORT_WORKERS < 2:
+        return _run_chunk(fn, items)
+
+    chunks = [
+        items[i:i + CHUNK_SIZE]
+        for i in range(0, len(items), CHUNK_SIZE)
+    ]
+
+    pool = _get_pool()
+    futures = [pool.submit(_run_chunk, fn, chunk) for chunk in chunks]
+
+    results: list[Prepared] = []
+    for f in futures:
+        results.extend(f.result())
+    return results
+
+
+def prepare_csv_rows(rows: list[dict]) -> list[Prepared]:
+    return _prepare_all(_prepare_csv_row, rows)
+
+
+def prepare_blocks(subcategory_id: int, blocks: list[str]) -> list[Prepared]:
+    return _prepare_all(_prepare_block, [(subcategory_id, b) for b in blocks])
+
+
+def shutdown():
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
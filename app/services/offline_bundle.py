@@ -0,0 +1,161 @@
+# app/services/offline_bundle.py
+
+import json
+import secrets
+import time
+import uuid
+
+from app.crud import get_current_revisions
+from app.domain.answers import accepted_set
+from app.domain.bundle_keys import GRADING_RULES, hash_key, numeric_buckets, numeric_width
+from app.domain.normalization import normalize_equation, normalize_text
+from app.engine.evaluators.syntax import normalize_code
+from app.services.attempt_log import attempt_log
+from app.services.exam_session import evaluate_question
+
+
+# Respuestas máximas por subida
+MAX_UPLOAD_ANSWERS = 2000
+
+_NORMALIZERS = {
+    "TEXT": normalize_text,
+    "EQUATION": normalize_equation,
+}
+
+
+# =====================================================
+# EXPORTACIÓN
+# =====================================================
+
+def _bundle_item(rev, salt: str) -> dict | None:
+    item = {
+        "question_id": rev.question_id,
+        "revision_id": rev.id,
+        "eval_type": rev.eval_type,
+        "statement_text": rev.statement_text,
+        "statement_math": rev.statement_math,
+    }
+
+    et = rev.eval_type
+
+    if et in _NORMALIZERS:
+        if rev.answer_keys:
+            keys = accepted_set(rev.answer_keys)
+        else:
+            keys = {_NORMALIZERS[et](rev.answer or "")}
+
+    elif et == "NUMERIC":
+        try:
+            value = float(rev.answer)
+        except (TypeError, ValueError):
+            # el servidor tampoco la daría por buena: no se exporta
+            return None
+
+        width = numeric_width(rev.tolerance)
+        item["tolerance"] = rev.tolerance
+        item["width"] = width
+        keys = numeric_buckets(value, width)
+
+    elif et == "CHOICE":
+        # sin is_correct: la correcta solo va como hash
+        item["options"] = [
+            {"id": o["id"], "text": o["text"]}
+            for o in json.loads(rev.options or "[]")
+        ]
+        keys = [str(rev.correct_option_id)]
+
+    elif et == "SYNTAX":
+        keys = [normalize_code(rev.answer or "")]
+
+    else:
+        return None
+
+    item["answer_hashes"] = sorted(hash_key(salt, k) for k in keys)
+    return item
+
+
+def build_bundle(subcategory_id: int) -> dict:
+    """
+    Paquete autocontenido de las preguntas jugables (revisión
+    vigente) de una subcategoría, con las respuestas como
+    hashes con sal (ver domain/bundle_keys.py).
+    """
+    salt = secrets.token_hex(16)
+
+    questions = [
+        item
+        for rev in get_current_revisions(subcategory_id)
+        if (item := _bundle_item(rev, salt)) is not None
+    ]
+
+    return {
+        "bundle_id": uuid.uuid4().hex,
+        "subcategory_id": subcategory_id,
+        "created_at": time.time(),
+        "salt": salt,
+        "grading": GRADING_RULES,
+        "questions": questions,
+    }
+
+
+# =====================================================
+# SUBIDA DE RESULTADOS
+# =====================================================
+
+def grade_bundle_results(student_id: str, answers: list[dict]) -> dict:
+    """
+    Recalifica en el servidor (contra la revisión exportada) las
+    respuestas hechas sin conexión y las registra en el historial.
+    La nota del cliente solo se compara: `mismatches` lista las
+    preguntas en que no coincide.
+    """
+    if len(answers) > MAX_UPLOAD_ANSWERS:
+        raise ValueError(f"At most {MAX_UPLOAD_ANSWERS} answers per upload")
+
+    results = []
+    mismatches = []
+    correct = 0
+
+    for a in answers:
+        try:
+            question_id = int(a["question_id"])
+            revision_id = int(a["revision_id"]) if a.get("revision_id") is not None else None
+            user_answer = str(a.get("user_answer") or "")
+            elapsed_ms = int(a["elapsed_ms"]) if a.get("elapsed_ms") is not None else None
+        except (KeyError, TypeError, ValueError):
+            results.append({"question_id": a.get("question_id"), "error": "Respuesta inválida"})
+            continue
+
+        graded = evaluate_question(
+            question_id,
+            user_answer,
+            elapsed_ms,
+            revision_id=revision_id,
+        )
+
+        if graded.error is not None:
+            results.append({"question_id": question_id, "error": graded.error})
+            continue
+
+        attempt_log.record(
+            student_id=student_id,
+            question_id=question_id,
+            mode="offline",
+            user_answer=user_answer,
+            correct=graded.correct,
+            elapsed_ms=elapsed_ms,
+        )
+
+        correct += graded.correct
+        results.append({"question_id": question_id, "correct": graded.correct})
+
+        claimed = a.get("correct")
+        if claimed is not None and bool(claimed) != graded.correct:
+            mismatches.append(question_id)
+
+    return {
+        "graded": sum(1 for r in results if "correct" in r),
+        "correct": correct,
+        "mismatches": mismatches,
+        "results": results,
+    }
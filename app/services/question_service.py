@@ -1,45 +1,177 @@
 #question_service.py
+from sqlalchemy.exc import IntegrityError
+
 from app.crud import (
-    update_question,
-    delete_options_by_question,
+    find_question_by_hash,
+    save_question_aggregate,
 )
 from app.models import Question
+from app.domain.answers import MULTI_ANSWER_TYPES, clean_alternates
+from app.domain.eval_types import EVAL_TYPES
+from app.domain.errors import DuplicateQuestionError
+from app.domain.fingerprint import content_hash
 
-def update_question_full(
+
+_TRUE = {"1", "true", "on", "yes"}
+_FALSE = {"", "0", "false", "off", "no"}
+
+
+def _parse_flag(value) -> bool:
+    """
+    is_correct tal como llega en JSON: bool, 0/1 o texto
+    ("false" no es verdadero).
+    """
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        v = value.strip().lower()
+        if v in _TRUE:
+            return True
+        if v in _FALSE:
+            return False
+    raise ValueError(f"Invalid is_correct: {value!r}")
+
+
+def _parse_option_id(value) -> int | None:
+    if value in (None, ""):
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Invalid option id: {value!r}")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid option id: {value!r}") from None
+
+
+def _clean_options(options: list[dict]) -> list[dict]:
+    cleaned = []
+
+    for o in options:
+        if not isinstance(o, dict):
+            raise ValueError("Each option must be an object")
+
+        text = o.get("text")
+        if text is not None and not isinstance(text, str):
+            raise ValueError("Option text must be a string")
+
+        text = (text or "").strip()
+        if not text:
+            raise ValueError("Option text cannot be empty")
+
+        cleaned.append({
+            "id": _parse_option_id(o.get("id")),
+            "text": text,
+            "is_correct": _parse_flag(o.get("is_correct")),
+        })
+
+    if sum(o["is_correct"] for o in cleaned) > 1:
+        raise ValueError("CHOICE question allows a single correct option")
+
+    return cleaned
+
+
+def save_question_full(
     *,
-    question: Question,
+    question_id: int,
+    subcategory_id: int,
     statement_text: str | None,
     statement_math: str | None,
     eval_type: str,
     answer: str | None,
     tolerance: float | None,
-):
+    options: list[dict] | None = None,
+    alt_answers: list[str] | None = None,
+) -> dict | None:
     """
-    Actualiza una pregunta como agregado.
+    Guarda el agregado completo (pregunta + alternativas)
+    en una sola transacción. Devuelve los conteos del diff
+    de alternativas, o None si la pregunta no existe.
+    alt_answers: respuestas aceptadas extra (TEXT / EQUATION);
+    None las deja como están.
     """
 
     # ───────────────────────────────
     # Reglas duras
     # ───────────────────────────────
 
+    if eval_type not in EVAL_TYPES:
+        raise ValueError(f"Invalid eval_type: {eval_type}")
+
+    statement_text = (statement_text or "").strip() or None
+    statement_math = (statement_math or "").strip() or None
+
+    if statement_text is None and statement_math is None:
+        raise ValueError("Statement cannot be empty")
+
     if eval_type == "CHOICE":
         answer = None
         tolerance = None
 
-    if eval_type != "CHOICE":
+    else:
+        if not answer:
+            raise ValueError(f"{eval_type} question requires answer")
+        if eval_type != "NUMERIC":
+            tolerance = None
+
         # Si deja de ser CHOICE → borrar alternativas
-        delete_options_by_question(question.id)
+        options = []
+
+    if options:
+        options = _clean_options(options)
+
+    if eval_type not in MULTI_ANSWER_TYPES:
+        alt_answers = []
+    elif alt_answers is not None:
+        alt_answers = clean_alternates(alt_answers)
 
     # ───────────────────────────────
     # Persistencia
     # ───────────────────────────────
 
-    update_question(
+    h = content_hash(statement_text, statement_math, eval_type, answer)
+
+    try:
+        return save_question_aggregate(
+            question_id=question_id,
+            statement_text=statement_text,
+            statement_math=statement_math,
+            eval_type=eval_type,
+            answer=answer,
+            tolerance=tolerance,
+            content_hash=h,
+            options=options,
+            alt_answers=alt_answers,
+        )
+    except IntegrityError:
+        existing = find_question_by_hash(subcategory_id, h) if h else None
+        if existing is None or existing == question_id:
+            raise
+        raise DuplicateQuestionError(existing)
+
+
+def update_question_full(
+    *,
+    question: Question,
+    statement_text: str | None,
+    statement_math: str | None,
+    eval_type: str,
+    answer: str | None,
+    tolerance: float | None,
+):
+    """
+    Actualiza una pregunta como agregado.
+    """
+
+    save_question_full(
         question_id=question.id,
+        subcategory_id=question.subcategory_id,
         statement_text=statement_text,
         statement_math=statement_math,
+        eval_type=eval_type,
         answer=answer,
         tolerance=tolerance,
     )
 
-    question.eval_type = eval_type
\ No newline at end of file
+    question.eval_type = eval_type
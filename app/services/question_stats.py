@@ -0,0 +1,92 @@
+# app/services/question_stats.py
+
+import threading
+from dataclasses import dataclass, field
+
+from app.domain.topk import space_saving_add, space_saving_merge
+
+
+# =====================================================
+# PARÁMETROS
+# =====================================================
+
+# nº de respuestas incorrectas distintas que se conservan
+TOP_K_WRONG = 10
+
+# las respuestas largas (p. ej. código) se truncan como clave
+MAX_ANSWER_KEY = 200
+
+
+@dataclass
+class StatsDelta:
+    attempts: int = 0
+    correct: int = 0
+    time_sum_ms: int = 0
+    timed: int = 0
+    wrong_answers: dict[str, int] = field(default_factory=dict)
+
+
+# =====================================================
+# TRACKER (deltas en memoria)
+# =====================================================
+
+class QuestionStatsTracker:
+    """
+    Acumula deltas por pregunta en O(1) por respuesta.
+    El write-behind del historial los persiste junto con
+    cada lote de intentos (ver attempt_log).
+    """
+
+    def __init__(self, top_k: int = TOP_K_WRONG):
+        self.top_k = top_k
+        self._pending: dict[int, StatsDelta] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        question_id: int,
+        correct: bool,
+        normalized_answer: str,
+        elapsed_ms: int | None = None,
+    ):
+        with self._lock:
+            delta = self._pending.get(question_id)
+            if delta is None:
+                delta = self._pending[question_id] = StatsDelta()
+
+            delta.attempts += 1
+
+            if correct:
+                delta.correct += 1
+            else:
+                key = (normalized_answer or "")[:MAX_ANSWER_KEY]
+                space_saving_add(delta.wrong_answers, key, self.top_k)
+
+            if elapsed_ms is not None:
+                delta.time_sum_ms += elapsed_ms
+                delta.timed += 1
+
+    def drain(self) -> dict[int, StatsDelta]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, deltas: dict[int, StatsDelta]):
+        """
+        Devuelve deltas no persistidos (p. ej. si falló el lote).
+        """
+        with self._lock:
+            for qid, d in deltas.items():
+                cur = self._pending.get(qid)
+                if cur is None:
+                    self._pending[qid] = d
+                    continue
+
+                cur.attempts += d.attempts
+                cur.correct += d.correct
+                cur.time_sum_ms += d.time_sum_ms
+                cur.timed += d.timed
+                space_saving_merge(cur.wrong_answers, d.wrong_answers, self.top_k)
+
+
+question_stats = QuestionStatsTracker()
@@ -0,0 +1,242 @@
+# app/services/scheduler.py
+
+import heapq
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+
+from sqlalchemy.exc import IntegrityError
+
+from app.crud import get_item_states, save_item_state
+
+
+# =====================================================
+# PARÁMETROS (SM-2 simplificado)
+# =====================================================
+
+DAY = 86400.0
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# Una pregunta fallada vuelve a la cola tras este retraso (s)
+RELEARN_DELAY = 60.0
+
+# Colas vivas en memoria (LRU). El estado de cada ítem está
+# persistido: perder una cola solo termina esa práctica
+MAX_QUEUES = 10_000
+
+
+@dataclass(frozen=True)
+class ItemSchedule:
+    ease: float = DEFAULT_EASE
+    interval: float = 0.0       # días
+    repetitions: int = 0
+    lapses: int = 0
+    due_at: float = 0.0         # epoch (s); 0 = nunca vista
+
+
+def review(item: ItemSchedule, correct: bool, now: float) -> ItemSchedule:
+    """
+    Aplica una respuesta al estado de repaso (SM-2 con
+    calidad binaria: acierto = 4, fallo = 1).
+    """
+
+    quality = 4 if correct else 1
+    ease = item.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    ease = max(MIN_EASE, ease)
+
+    if not correct:
+        return replace(
+            item,
+            ease=ease,
+            interval=0.0,
+            repetitions=0,
+            lapses=item.lapses + 1,
+            due_at=now + RELEARN_DELAY,
+        )
+
+    repetitions = item.repetitions + 1
+
+    if repetitions == 1:
+        interval = 1.0
+    elif repetitions == 2:
+        interval = 6.0
+    else:
+        interval = item.interval * ease
+
+    return replace(
+        item,
+        ease=ease,
+        interval=interval,
+        repetitions=repetitions,
+        due_at=now + interval * DAY,
+    )
+
+
+# =====================================================
+# COLA DE PRÁCTICA (heap por vencimiento)
+# =====================================================
+
+class PracticeQueue:
+    """
+    Heap de preguntas ordenado por vencimiento para un
+    estudiante y una subcategoría.
+
+    - next_question: O(log n) amortizado
+    - record: O(log n)
+
+    Las entradas obsoletas se descartan de forma perezosa:
+    solo es válida la entrada registrada en `_entries`.
+    """
+
+    def __init__(self, student_id: str, items: dict[int, ItemSchedule]):
+        self.student_id = student_id
+        self._items = items
+        self._entries: dict[int, tuple] = {}
+        self._heap: list[tuple] = []
+        self._lock = threading.Lock()
+
+        for qid, item in items.items():
+            # desempate aleatorio → las nuevas salen barajadas
+            entry = (item.due_at, random.random(), qid)
+            self._entries[qid] = entry
+            self._heap.append(entry)
+
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _top(self) -> tuple | None:
+        heap = self._heap
+        while heap and self._entries.get(heap[0][2]) is not heap[0]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def discard(self, question_id: int):
+        """
+        Saca de la cola una pregunta que ya no existe (su entrada
+        en el heap queda obsoleta y se descarta al llegar arriba).
+        """
+        with self._lock:
+            self._entries.pop(question_id, None)
+            self._items.pop(question_id, None)
+
+    def next_question(self, exclude: int | None = None) -> int | None:
+        """
+        Pregunta con vencimiento más próximo.
+        `exclude` evita repetir la pregunta recién respondida
+        mientras haya otras disponibles.
+        """
+        with self._lock:
+            top = self._top()
+            if top is None:
+                return None
+
+            if top[2] != exclude or len(self._entries) == 1:
+                return top[2]
+
+            heapq.heappop(self._heap)
+            second = self._top()
+            heapq.heappush(self._heap, top)
+
+            return second[2] if second else top[2]
+
+    def record(self, question_id: int, correct: bool) -> ItemSchedule | None:
+        """
+        Aplica la respuesta y persiste el estado. None si la
+        pregunta no está en la cola o ya no existe (borrada con
+        la práctica abierta: sale de la cola).
+        """
+        with self._lock:
+            item = self._items.get(question_id)
+            if item is None:
+                return None
+
+            item = review(item, correct, time.time())
+            self._items[question_id] = item
+
+            entry = (item.due_at, random.random(), question_id)
+            self._entries[question_id] = entry
+            heapq.heappush(self._heap, entry)
+
+        try:
+            save_item_state(
+                student_id=self.student_id,
+                question_id=question_id,
+                ease=item.ease,
+                interval=item.interval,
+                repetitions=item.repetitions,
+                lapses=item.lapses,
+                due_at=item.due_at,
+            )
+        except IntegrityError:
+            # FK de item_states: la pregunta se borró
+            self.discard(question_id)
+            return None
+
+        return item
+
+
+# =====================================================
+# SCHEDULER (registro de colas en memoria)
+# =====================================================
+
+class PracticeScheduler:
+
+    def __init__(self, maxsize: int = MAX_QUEUES):
+        self.maxsize = maxsize
+        self._queues: OrderedDict[tuple[str, int], PracticeQueue] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        student_id: str,
+        subcategory_id: int,
+        question_ids: list[int],
+    ) -> PracticeQueue:
+        """
+        Construye la cola a partir de las preguntas jugables
+        y del estado persistido del estudiante (O(n) una vez).
+        """
+
+        persisted = {
+            s.question_id: ItemSchedule(
+                ease=s.ease,
+                interval=s.interval,
+                repetitions=s.repetitions,
+                lapses=s.lapses,
+                due_at=s.due_at,
+            )
+            for s in get_item_states(student_id, subcategory_id)
+        }
+
+        items = {
+            qid: persisted.get(qid, ItemSchedule())
+            for qid in question_ids
+        }
+
+        queue = PracticeQueue(student_id, items)
+
+        with self._lock:
+            key = (student_id, subcategory_id)
+            self._queues[key] = queue
+            self._queues.move_to_end(key)
+            if len(self._queues) > self.maxsize:
+                self._queues.popitem(last=False)
+
+        return queue
+
+    def get(self, student_id: str, subcategory_id: int) -> PracticeQueue | None:
+        key = (student_id, subcategory_id)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is not None:
+                self._queues.move_to_end(key)
+            return queue
+
+
+scheduler = PracticeScheduler()
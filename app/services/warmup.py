@@ -0,0 +1,104 @@
+# app/services/warmup.py
+
+import importlib
+import logging
+import threading
+import time
+
+from app.crud import get_categories, get_hot_subcategory_ids, preload_subcategory
+from app.domain.eval_types import EVAL_TYPES
+
+logger = logging.getLogger(__name__)
+
+
+# =====================================================
+# PARÁMETROS
+# =====================================================
+
+# Subcategorías más jugadas cuyas preguntas se precargan
+HOT_SUBCATEGORIES = 20
+
+
+# =====================================================
+# CALENTAMIENTO
+# =====================================================
+
+class WarmUp:
+    """
+    Calentamiento tras el arranque, en un hilo de fondo:
+
+    - importa todos los evaluadores (evaluate_answer los
+      importa de forma perezosa)
+    - compila las plantillas Jinja
+    - lee el árbol de categorías y las preguntas de las
+      subcategorías más jugadas (páginas SQLite en caché)
+
+    /ready responde 503 hasta que termina.
+    """
+
+    def __init__(self, hot_subcategories: int = HOT_SUBCATEGORIES):
+        self.hot_subcategories = hot_subcategories
+
+        self._done = threading.Event()
+        self._steps: dict[str, float] = {}
+        self._error: str | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def start(self, template_env):
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self.run,
+            args=(template_env,),
+            name="warm-up",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def run(self, template_env):
+        try:
+            self._step("evaluators", self._import_evaluators)
+            self._step("templates", lambda: self._compile_templates(template_env))
+            self._step("categories", get_categories)
+            self._step("questions", self._preload_hot)
+        except Exception as e:
+            # un fallo del calentamiento no debe dejar el
+            # servicio fuera: solo se pierde la precarga
+            logger.exception("warm-up failed")
+            self._error = str(e)
+        finally:
+            self._done.set()
+
+    def _step(self, name: str, fn):
+        t0 = time.perf_counter()
+        fn()
+        self._steps[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    @staticmethod
+    def _import_evaluators():
+        for et in EVAL_TYPES:
+            importlib.import_module(f"app.engine.evaluators.{et.lower()}")
+
+    @staticmethod
+    def _compile_templates(env):
+        for name in env.list_templates(extensions=["html"]):
+            env.get_template(name)
+
+    def _preload_hot(self):
+        for sid in get_hot_subcategory_ids(self.hot_subcategories):
+            preload_subcategory(sid)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "steps_ms": dict(self._steps),
+            "error": self._error,
+        }
+
+
+warm_up = WarmUp()
@@ -0,0 +1,81 @@
+# app/services/wrong_answers.py
+
+from app.crud import iter_wrong_attempts
+from app.domain.topk import space_saving_add, top_items
+from app.services.exam_session import normalize_answer
+from app.services.question_stats import MAX_ANSWER_KEY
+
+
+# =====================================================
+# PARÁMETROS
+# =====================================================
+
+# Contadores por pregunta = CAPACITY_FACTOR * K: con más
+# contadores que K, el top-K de Space-Saving es casi exacto
+CAPACITY_FACTOR = 4
+
+# Ejemplo literal (sin normalizar) que se guarda por grupo
+MAX_EXAMPLE = 80
+
+
+# =====================================================
+# INFORME
+# =====================================================
+
+def wrong_answer_clusters(
+    subcategory_id: int | None = None,
+    question_id: int | None = None,
+    k: int = 5,
+    chunk_size: int = 5000,
+) -> list[dict]:
+    """
+    Agrupa las respuestas incorrectas del historial por su forma
+    normalizada (la misma que usa la calificación) y devuelve
+    los K grupos más frecuentes por pregunta.
+
+    Una pasada sobre el historial, por trozos; memoria acotada
+    a CAPACITY_FACTOR * K contadores por pregunta (Space-Saving:
+    los conteos pueden sobreestimar, nunca subestimar).
+    """
+    capacity = max(k, 1) * CAPACITY_FACTOR
+
+    counters: dict[int, dict[str, int]] = {}
+    examples: dict[int, dict[str, str]] = {}
+    totals: dict[int, int] = {}
+
+    for chunk in iter_wrong_attempts(subcategory_id, question_id, chunk_size):
+        for qid, eval_type, answer in chunk:
+            key = normalize_answer(eval_type, answer)[:MAX_ANSWER_KEY]
+
+            totals[qid] = totals.get(qid, 0) + 1
+
+            counts = counters.setdefault(qid, {})
+            space_saving_add(counts, key, capacity)
+
+            # un ejemplo literal por grupo vivo (se limpia al desalojar)
+            seen = examples.setdefault(qid, {})
+            if key not in seen:
+                if len(seen) >= capacity:
+                    for stale in [s for s in seen if s not in counts]:
+                        del seen[stale]
+                seen[key] = (answer or "")[:MAX_EXAMPLE]
+
+    report = []
+
+    for qid in sorted(totals, key=lambda q: -totals[q]):
+        wrong = totals[qid]
+        report.append({
+            "question_id": qid,
+            "wrong": wrong,
+            "clusters": [
+                {
+                    "answer": key,
+                    "example": examples[qid].get(key),
+                    "count": count,
+                    "share": round(count / wrong, 4),
+                }
+                for key, count in top_items(counters[qid], k)
+            ],
+        })
+
+    return report
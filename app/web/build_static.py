@@ -0,0 +1,92 @@
+# app/web/build_static.py
+
+"""
+Build de estáticos:
+
+    python -m app.web.build_static
+
+Para cada archivo de app/static (excepto dist/):
+- copia con hash de contenido en dist/ (cache inmutable)
+- variantes .br / .gz si el tipo es comprimible y compensa
+- manifest.json: ruta lógica → ruta con hash
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+from app.web.compression import brotli, compress
+from app.web.static import DIST_DIR, MANIFEST, STATIC_DIR
+
+COMPRESSIBLE_SUFFIXES = {
+    ".css", ".js", ".mjs", ".json", ".map", ".svg", ".html", ".txt", ".ttf", ".otf",
+}
+
+# la variante se descarta si no ahorra al menos esto
+MIN_SAVING = 0.05
+
+
+def _hashed_name(rel: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    root, ext = os.path.splitext(rel)
+    return f"{root}.{digest}{ext}"
+
+
+def _write_variants(path: str, data: bytes) -> list[str]:
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_SUFFIXES:
+        return []
+
+    written = []
+    encodings = [("gzip", ".gz")]
+    if brotli is not None:
+        encodings.append(("br", ".br"))
+
+    for encoding, suffix in encodings:
+        packed = compress(data, encoding, level=9 if encoding == "gzip" else 11)
+        if len(packed) <= len(data) * (1 - MIN_SAVING):
+            with open(path + suffix, "wb") as f:
+                f.write(packed)
+            written.append(suffix)
+
+    return written
+
+
+def build(static_dir: str = STATIC_DIR) -> dict[str, str]:
+    dist = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+
+    manifest: dict[str, str] = {}
+
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [d for d in dirs if d != DIST_DIR]
+
+        for name in sorted(files):
+            src = os.path.join(root, name)
+            rel = os.path.relpath(src, static_dir).replace(os.sep, "/")
+
+            with open(src, "rb") as f:
+                data = f.read()
+
+            hashed = f"{DIST_DIR}/{_hashed_name(rel, data)}"
+            dst = os.path.join(static_dir, hashed)
+
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            with open(dst, "wb") as f:
+                f.write(data)
+
+            variants = _write_variants(dst, data)
+            manifest[rel] = hashed
+
+            print(f"{rel} -> {hashed} {' '.join(variants)}".rstrip())
+
+    os.makedirs(dist, exist_ok=True)
+    with open(os.path.join(dist, os.path.basename(MANIFEST)), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return manifest
+
+
+if __name__ == "__main__":
+    build()
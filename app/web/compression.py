@@ -0,0 +1,155 @@
+# app/web/compression.py
+
+"""
+Compresión de respuestas (brotli si está instalado, si no gzip).
+
+Middleware ASGI puro: solo se bufferizan respuestas de tipo
+texto sin Content-Encoding; por debajo del umbral se envían tal
+cual. Los estáticos no pasan por aquí (ver web/static.py, que
+sirve variantes precomprimidas).
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """
+    Codificaciones aceptadas (q > 0) de un header Accept-Encoding.
+    """
+    accepted = set()
+
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+
+        if q > 0:
+            accepted.add(name)
+
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    accepted = accepted_encodings(accept_encoding)
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int = 6) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        level: int = 6,
+        exclude_prefixes: tuple[str, ...] = ("/static",),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.exclude_prefixes = exclude_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+
+        encoding = choose_encoding(accept)
+
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _Responder(send, encoding, self.minimum_size, self.level)
+        await self.app(scope, receive, responder)
+
+
+class _Responder:
+
+    def __init__(self, send, encoding: str, minimum_size: int, level: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.level = level
+
+        self.start = None
+        self.passthrough = False
+        self.chunks: list[bytes] = []
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = {k.lower(): v for k, v in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+
+            self.passthrough = (
+                b"content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        self.chunks.append(message.get("body", b""))
+
+        if message.get("more_body", False):
+            return
+
+        body = b"".join(self.chunks)
+        headers = [
+            (k, v) for k, v in self.start.get("headers", [])
+            if k.lower() != b"content-length"
+        ]
+
+        if len(body) >= self.minimum_size:
+            body = compress(body, self.encoding, self.level)
+            headers.append((b"content-encoding", self.encoding.encode()))
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        headers.append((b"content-length", str(len(body)).encode()))
+
+        await self.send({**self.start, "headers": headers})
+        await self.send({"type": "http.response.body", "body": body})
@@ -0,0 +1,388 @@
+# app/web/profiler.py
+
+"""
+Perfilador por muestreo bajo demanda (sin redesplegar).
+
+Un admin lo arma para las próximas N peticiones (opcionalmente
+solo las de un prefijo de ruta). Mientras alguna de ellas está
+en curso, un hilo toma cada `interval` las pilas
+(sys._current_frames) de los hilos que están trabajando para
+una petición perfilada, y solo de esos:
+
+- el hilo del event loop, durante cada paso de la corrutina
+  de la petición (no mientras espera y el loop atiende otras)
+- el hilo del threadpool que ejecuta su endpoint síncrono
+  (ProfiledRoute: lo marca una ContextVar que el threadpool
+  hereda)
+
+El resultado se descarga en formato "collapsed stacks" (una
+línea `raíz;…;hoja N`), el que consumen flamegraph.pl y
+speedscope.
+
+Sin sys._current_frames (intérpretes que no son CPython) se
+usa cProfile en esos mismos tramos; el export da pilas de dos
+niveles `llamador;función µs` (pstats no guarda pilas enteras).
+
+Coste: nulo desarmado; armado, una lectura de pilas por
+intervalo y solo mientras hay peticiones perfiladas.
+"""
+
+import cProfile
+import functools
+import inspect
+import os
+import pstats
+import sys
+import threading
+import time
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(APP_DIR)
+
+DEFAULT_INTERVAL_MS = 5.0
+MAX_DEPTH = 128
+
+# pilas distintas que se conservan; el resto se cuenta aparte
+MAX_STACKS = 20_000
+OVERFLOW_STACK = "[otras]"
+
+# hoja de un hilo ocioso (esperando trabajo o E/S del loop)
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("threading.py", "_wait_for_tstate_lock"),
+}
+
+# las propias rutas del perfilador no se perfilan
+CONTROL_PREFIX = "/admin/profiler"
+
+SAMPLING = "sampling"
+CPROFILE = "cprofile"
+
+# True dentro de una petición perfilada (también en el hilo del
+# threadpool que ejecuta su endpoint)
+_profiled: ContextVar[bool] = ContextVar("profiled", default=False)
+
+
+def _label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(APP_DIR):
+        filename = os.path.relpath(filename, ROOT_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{code.co_name}"
+
+
+def _pstats_label(func: tuple) -> str:
+    filename, _line, name = func
+    if filename.startswith(APP_DIR):
+        filename = os.path.relpath(filename, ROOT_DIR)
+    elif filename != "~":
+        filename = os.path.basename(filename)
+    return f"{filename}:{name}"
+
+
+class SamplingProfiler:
+
+    def __init__(self, mode: str | None = None):
+        self.mode = mode or (SAMPLING if hasattr(sys, "_current_frames") else CPROFILE)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.active = 0
+
+        # hilos trabajando ahora para una petición perfilada:
+        # ident → anidamiento (y su cProfile, en ese modo)
+        self._threads: dict[int, int] = {}
+        self._profiles: dict[int, cProfile.Profile] = {}
+
+        self._reset(0, None, DEFAULT_INTERVAL_MS)
+
+    def _reset(self, requests: int, path: str | None, interval_ms: float):
+        # `active` no se toca: las peticiones en curso de una
+        # ronda anterior llamarán a end() igualmente
+        self.armed = requests > 0
+        self.remaining = requests
+        self.path = path
+        self.interval = interval_ms / 1000
+        self.profiled = 0
+        self.samples = 0
+        self.stacks: dict[str, int] = {}
+        self._pstats: pstats.Stats | None = None
+
+    # ---------------------------------
+    # Control (admin)
+    # ---------------------------------
+
+    def arm(self, requests: int, path: str | None = None, interval_ms: float = DEFAULT_INTERVAL_MS):
+        if requests < 1:
+            raise ValueError("At least one request")
+
+        with self._lock:
+            self._reset(requests, path or None, max(interval_ms, 1.0))
+
+    def disarm(self):
+        with self._lock:
+            self.armed = False
+            self.remaining = 0
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "armed": self.armed,
+                "remaining": self.remaining,
+                "path": self.path,
+                "interval_ms": self.interval * 1000,
+                "in_flight": self.active,
+                "profiled_requests": self.profiled,
+                "samples": self.samples,
+                "distinct_stacks": len(self.stacks),
+            }
+
+    def collapsed(self) -> str:
+        with self._lock:
+            if self.mode == CPROFILE:
+                stacks = self._pstats_stacks()
+            else:
+                stacks = dict(self.stacks)
+        items = sorted(stacks.items(), key=lambda kv: -kv[1])
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def _pstats_stacks(self) -> dict[str, int]:
+        """
+        Tiempo propio (µs) de cada función por llamador.
+        """
+        stacks: dict[str, int] = {}
+        if self._pstats is None:
+            return stacks
+
+        for func, (_cc, _nc, _tt, _ct, callers) in self._pstats.stats.items():
+            leaf = _pstats_label(func)
+            for caller, (_ccc, _cnc, tt, _cct) in callers.items():
+                us = round(tt * 1e6)
+                if us:
+                    stack = f"{_pstats_label(caller)};{leaf}"
+                    stacks[stack] = stacks.get(stack, 0) + us
+
+        return stacks
+
+    # ---------------------------------
+    # Peticiones
+    # ---------------------------------
+
+    def begin(self, path: str) -> bool:
+        """
+        True si esta petición se perfila (consume una del cupo).
+        """
+        if not self.armed or path.startswith(CONTROL_PREFIX):
+            return False
+
+        with self._lock:
+            if not self.armed or self.remaining <= 0:
+                return False
+            if self.path is not None and not path.startswith(self.path):
+                return False
+
+            self.remaining -= 1
+            self.active += 1
+            self.profiled += 1
+
+            if self.mode == SAMPLING and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="sampling-profiler",
+                    daemon=True,
+                )
+                self._thread.start()
+
+        return True
+
+    def end(self):
+        with self._lock:
+            self.active -= 1
+            if self.remaining <= 0 and self.active == 0:
+                self.armed = False
+
+    def enter(self):
+        """
+        El hilo actual empieza a trabajar para una petición
+        perfilada (anidable).
+        """
+        ident = threading.get_ident()
+        profile = None
+
+        with self._lock:
+            depth = self._threads.get(ident, 0)
+            self._threads[ident] = depth + 1
+            if depth == 0 and self.mode == CPROFILE:
+                profile = self._profiles[ident] = cProfile.Profile()
+
+        if profile is not None:
+            profile.enable()
+
+    def leave(self):
+        ident = threading.get_ident()
+        profile = None
+
+        with self._lock:
+            depth = self._threads.pop(ident, 1) - 1
+            if depth:
+                self._threads[ident] = depth
+            else:
+                profile = self._profiles.pop(ident, None)
+
+        if profile is None:
+            return
+
+        profile.disable()
+        with self._lock:
+            if self._pstats is None:
+                self._pstats = pstats.Stats(profile)
+            else:
+                self._pstats.add(profile)
+
+    # ---------------------------------
+    # Muestreo
+    # ---------------------------------
+
+    def _run(self):
+        me = threading.get_ident()
+
+        # vive mientras haya peticiones perfiladas en curso;
+        # begin() lo vuelve a lanzar si hace falta
+        while True:
+            with self._lock:
+                if self.active <= 0:
+                    self._thread = None
+                    return
+
+            self._sample(me)
+            time.sleep(self.interval)
+
+    def _sample(self, me: int):
+        with self._lock:
+            profiled = set(self._threads)
+
+        names = {t.ident: t.name for t in threading.enumerate()}
+        found = []
+
+        for ident, frame in sys._current_frames().items():
+            if ident == me or ident not in profiled:
+                continue
+
+            leaf = frame.f_code
+            if (os.path.basename(leaf.co_filename), leaf.co_name) in _IDLE_LEAVES:
+                continue
+
+            labels = []
+            in_app = False
+            depth = 0
+
+            while frame is not None and depth < MAX_DEPTH:
+                code = frame.f_code
+                in_app = in_app or code.co_filename.startswith(APP_DIR)
+                labels.append(_label(code))
+                frame = frame.f_back
+                depth += 1
+
+            if not in_app:
+                continue
+
+            labels.append(names.get(ident, "thread"))
+            found.append(";".join(reversed(labels)))
+
+        with self._lock:
+            self.samples += 1
+            for stack in found:
+                if stack not in self.stacks and len(self.stacks) >= MAX_STACKS:
+                    stack = OVERFLOW_STACK
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+
+profiler = SamplingProfiler()
+
+
+class _Steps:
+    """
+    Ejecuta una corrutina marcando el hilo del loop como
+    perfilado solo durante cada paso (entre dos awaits el loop
+    atiende otras peticiones, que no se cuentan).
+    """
+
+    def __init__(self, coro, sampler: SamplingProfiler):
+        self.coro = coro
+        self.sampler = sampler
+
+    def __await__(self):
+        steps = self.coro.__await__()
+        value, error = None, None
+
+        while True:
+            self.sampler.enter()
+            try:
+                if error is None:
+                    yielded = steps.send(value)
+                else:
+                    yielded = steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.sampler.leave()
+
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+
+class ProfilerMiddleware:
+    """
+    Marca el inicio/fin de las peticiones perfiladas (ASGI puro).
+    """
+
+    def __init__(self, app, sampler: SamplingProfiler = profiler):
+        self.app = app
+        self.sampler = sampler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.sampler.begin(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        token = _profiled.set(True)
+        try:
+            await _Steps(self.app(scope, receive, send), self.sampler)
+        finally:
+            _profiled.reset(token)
+            self.sampler.end()
+
+
+def _track_thread(endpoint, sampler: SamplingProfiler):
+    @functools.wraps(endpoint)
+    def tracked(*args, **kwargs):
+        if not _profiled.get():
+            return endpoint(*args, **kwargs)
+
+        sampler.enter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            sampler.leave()
+
+    return tracked
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Ruta cuyo endpoint síncrono (corre en el threadpool) marca
+    su hilo mientras atiende una petición perfilada.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _track_thread(endpoint, profiler)
+        super().__init__(path, endpoint, **kwargs)
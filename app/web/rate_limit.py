@@ -0,0 +1,245 @@
+# app/web/rate_limit.py
+
+"""
+Contrapresión por cliente (middlewares ASGI puros).
+
+- RateLimitMiddleware: token bucket por cliente y por grupo de
+  rutas (juego / admin). Sin tokens se responde 429 sin llegar
+  a la aplicación ni ocupar un hilo del threadpool.
+- DedupMiddleware: un envío idéntico (mismo cliente, mismo
+  cuerpo) dentro de la ventana no se procesa otra vez: recibe
+  la misma respuesta que el primero (doble clic, reenvíos).
+
+Cliente = cookie student_id si existe; si no, la IP. La cookie
+la pone el propio cliente, así que la IP es además un límite
+externo que se aplica siempre (rotar la cookie no lo evita).
+Detrás de un NAT muchos alumnos comparten IP: su presupuesto
+es ANON_FACTOR veces el de un alumno.
+"""
+
+import asyncio
+import hashlib
+import math
+import time
+from collections import OrderedDict
+
+# (tokens por segundo, ráfaga máxima)
+PLAY_BUDGET = (5.0, 20)
+ADMIN_BUDGET = (5.0, 30)
+
+DEFAULT_BUDGETS = {
+    "/play": PLAY_BUDGET,
+    "/admin": ADMIN_BUDGET,
+    "/export": ADMIN_BUDGET,
+}
+
+# multiplicador del presupuesto por IP (frente al de un alumno)
+ANON_FACTOR = 20
+
+# clientes distintos que se recuerdan (LRU) por grupo
+MAX_CLIENTS = 10_000
+
+# ventana de deduplicación de envíos (s)
+DEDUP_WINDOW = 2.0
+
+
+def _student_key(scope) -> str | None:
+    for key, value in scope["headers"]:
+        if key == b"cookie":
+            for part in value.decode("latin-1").split(";"):
+                name, _, v = part.strip().partition("=")
+                if name == "student_id" and v:
+                    return "s:" + v
+    return None
+
+
+def _ip_key(scope) -> str:
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "-")
+
+
+def client_key(scope) -> str:
+    return _student_key(scope) or _ip_key(scope)
+
+
+# =====================================================
+# TOKEN BUCKET
+# =====================================================
+
+class TokenBuckets:
+    """
+    Un bucket por clave: [tokens, último instante]. Se rellena
+    perezosamente al consultar (O(1), sin hilos).
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def take(self, key: str, now: float | None = None) -> float:
+        """
+        0 si hay token (y lo consume); si no, segundos de espera.
+        """
+        now = time.monotonic() if now is None else now
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+
+        return (1.0 - bucket[0]) / self.rate
+
+
+class RateLimitMiddleware:
+
+    def __init__(
+        self,
+        app,
+        budgets: dict[str, tuple[float, int]] = DEFAULT_BUDGETS,
+        anon_factor: int = ANON_FACTOR,
+    ):
+        self.app = app
+        # (prefijo, buckets por alumno, buckets por IP)
+        self.groups = [
+            (
+                prefix,
+                TokenBuckets(rate, burst),
+                TokenBuckets(rate * anon_factor, burst * anon_factor),
+            )
+            for prefix, (rate, burst) in budgets.items()
+        ]
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope["path"]
+
+            for prefix, buckets, ip_buckets in self.groups:
+                if path.startswith(prefix):
+                    wait = ip_buckets.take(_ip_key(scope))
+                    student = _student_key(scope)
+                    if not wait and student is not None:
+                        wait = buckets.take(student)
+                    if wait > 0:
+                        self.rejected += 1
+                        await _too_many(send, wait)
+                        return
+                    break
+
+        await self.app(scope, receive, send)
+
+
+async def _too_many(send, wait: float):
+    body = b"Too Many Requests"
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# =====================================================
+# DEDUPLICACIÓN DE ENVÍOS
+# =====================================================
+
+class DedupMiddleware:
+
+    def __init__(
+        self,
+        app,
+        paths: tuple[str, ...] = ("/play/answer",),
+        window: float = DEDUP_WINDOW,
+    ):
+        self.app = app
+        self.paths = paths
+        self.window = window
+
+        # (cliente, hash del cuerpo) → (instante, future con los mensajes)
+        self._recent: OrderedDict[tuple, tuple[float, asyncio.Future]] = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        key = (client_key(scope), scope["path"], hashlib.sha256(body).digest())
+        now = time.monotonic()
+
+        self._expire(now)
+
+        entry = self._recent.get(key)
+        if entry is not None:
+            messages = await asyncio.shield(entry[1])
+            if messages is not None:
+                for message in messages:
+                    await send(message)
+                return
+
+        future = asyncio.get_running_loop().create_future()
+        self._recent[key] = (now, future)
+
+        messages: list[dict] = []
+        delivered = False
+
+        async def replay():
+            # el cuerpo una vez; después, fin de la petición
+            nonlocal delivered
+            if delivered:
+                return {"type": "http.disconnect"}
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture(message):
+            messages.append(message)
+            await send(message)
+
+        try:
+            await self.app(scope, replay, capture)
+        except BaseException:
+            # sin respuesta que repetir: los duplicados en espera
+            # se procesan normalmente
+            self._recent.pop(key, None)
+            future.set_result(None)
+            raise
+
+        future.set_result(messages)
+
+    def _expire(self, now: float):
+        while self._recent:
+            key, (ts, _) = next(iter(self._recent.items()))
+            if now - ts <= self.window:
+                break
+            self._recent.popitem(last=False)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
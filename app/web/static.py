@@ -0,0 +1,95 @@
+# app/web/static.py
+
+"""
+Estáticos con nombres con hash y variantes precomprimidas.
+
+- `python -m app.web.build_static` escribe en static/dist copias
+  con hash de contenido (+ .br/.gz) y un manifest.json
+- static_url("img/x.jpg") resuelve al nombre con hash si existe
+- PrecompressedStaticFiles elige la variante según Accept-Encoding
+  y marca como inmutable lo de dist/ y vendor/ (versionado)
+"""
+
+import json
+import mimetypes
+import os
+from functools import lru_cache
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from app.web.compression import accepted_encodings
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+DIST_DIR = "dist"
+IMMUTABLE_DIRS = (DIST_DIR + "/", "vendor/")
+MANIFEST = os.path.join(STATIC_DIR, DIST_DIR, "manifest.json")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=3600"
+
+# orden de preferencia
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> dict[str, str]:
+    try:
+        with open(MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def static_url(path: str) -> str:
+    """
+    URL pública de un estático: la copia con hash si el build
+    existe, si no el archivo original.
+    """
+    return "/static/" + load_manifest().get(path, path)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+
+        rel = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        immutable = rel.startswith(IMMUTABLE_DIRS)
+
+        headers = {"Cache-Control": IMMUTABLE if immutable else REVALIDATE}
+        media_type = mimetypes.guess_type(str(full_path))[0]
+
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+
+        variant = None
+        for encoding, suffix in PRECOMPRESSED:
+            candidate = f"{full_path}{suffix}"
+            if os.path.isfile(candidate):
+                headers["Vary"] = "Accept-Encoding"
+                if variant is None and encoding in accepted:
+                    variant = (encoding, candidate)
+
+        if variant is not None:
+            encoding, full_path = variant
+            stat_result = os.stat(full_path)
+            headers["Content-Encoding"] = encoding
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            media_type=media_type,
+            headers=headers,
+        )
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
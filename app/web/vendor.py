@@ -0,0 +1,188 @@
+# app/web/vendor.py
+
+"""
+Dependencias front-end servidas desde app/static/vendor.
+
+    python -m app.web.vendor          # descarga las versiones fijadas
+    python -m app.web.vendor --check  # compara con manifest.json
+    python -m app.web.build_static    # copias con hash + .br/.gz
+
+Los directorios llevan la versión en el nombre, así que su
+contenido nunca cambia y se sirve como inmutable; vendor/
+manifest.json fija el sha256 de cada archivo. Si un archivo no
+está vendorizado, vendor_url() cae al CDN original.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import urllib.request
+from functools import lru_cache
+
+from app.web.static import STATIC_DIR, static_url
+
+VENDOR_DIR = "vendor"
+
+CODEMIRROR = "codemirror-5.58.3"
+MATHJAX = "mathjax-3.2.2"
+
+_CDNJS = "https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.58.3"
+_JSDELIVR = "https://cdn.jsdelivr.net/npm/mathjax@3.2.2"
+
+# nombre lógico → (ruta local bajo vendor/, URL de origen)
+ASSETS: dict[str, tuple[str, str]] = {
+    "codemirror.css": (f"{CODEMIRROR}/codemirror.css", f"{_CDNJS}/codemirror.css"),
+    "codemirror.js": (f"{CODEMIRROR}/codemirror.js", f"{_CDNJS}/codemirror.js"),
+    "codemirror-dracula.css": (f"{CODEMIRROR}/theme/dracula.css", f"{_CDNJS}/theme/dracula.css"),
+    "codemirror-python.js": (f"{CODEMIRROR}/mode/python/python.js", f"{_CDNJS}/mode/python/python.js"),
+    "mathjax.js": (f"{MATHJAX}/es5/tex-mml-chtml.js", f"{_JSDELIVR}/es5/tex-mml-chtml.js"),
+}
+
+# Fuentes CHTML: MathJax las pide en tiempo de ejecución
+# relativas a su raíz, por eso se vendorizan sin hash.
+MATHJAX_FONTS = [
+    f"MathJax_{name}.woff" for name in (
+        "AMS-Regular", "Calligraphic-Bold", "Calligraphic-Regular",
+        "Fraktur-Bold", "Fraktur-Regular", "Main-Bold", "Main-Italic",
+        "Main-Regular", "Math-BoldItalic", "Math-Italic", "Math-Regular",
+        "SansSerif-Bold", "SansSerif-Italic", "SansSerif-Regular",
+        "Script-Regular", "Size1-Regular", "Size2-Regular", "Size3-Regular",
+        "Size4-Regular", "Typewriter-Regular", "Vector-Bold",
+        "Vector-Regular", "Zero",
+    )
+]
+
+_FONTS_PATH = "es5/output/chtml/fonts/woff-v2"
+
+# ruta bajo vendor/ → sha256 de los archivos fijados
+MANIFEST = "manifest.json"
+
+
+def _downloads() -> list[tuple[str, str]]:
+    files = list(ASSETS.values())
+    files += [
+        (f"{MATHJAX}/{_FONTS_PATH}/{font}", f"{_JSDELIVR}/{_FONTS_PATH}/{font}")
+        for font in MATHJAX_FONTS
+    ]
+    return files
+
+
+def _local_path(rel: str) -> str:
+    return os.path.join(STATIC_DIR, VENDOR_DIR, rel)
+
+
+@lru_cache(maxsize=None)
+def vendor_url(name: str) -> str:
+    rel, cdn = ASSETS[name]
+    if os.path.isfile(_local_path(rel)):
+        return static_url(f"{VENDOR_DIR}/{rel}")
+    return cdn
+
+
+@lru_cache(maxsize=1)
+def mathjax_root() -> str | None:
+    """
+    Raíz de MathJax para su loader (fuentes y extensiones).
+    None si no está vendorizado (se usa la del CDN).
+    """
+    if os.path.isfile(_local_path(ASSETS["mathjax.js"][0])):
+        return f"/static/{VENDOR_DIR}/{MATHJAX}/es5"
+    return None
+
+
+# delimitadores que MathJax procesa (ver tex.inlineMath / displayMath)
+TEX_DELIMITERS = ("$", "\\(", "\\[")
+
+
+def _has_tex(text: str | None) -> bool:
+    return bool(text) and any(d in text for d in TEX_DELIMITERS)
+
+
+def needs_mathjax(question) -> bool:
+    """
+    Cargar MathJax solo si la pregunta tiene TeX que renderizar:
+    statement_math o inline en el enunciado o las alternativas.
+    Aun vendorizado son ~1 MB de JS que analizar en cada página.
+    """
+    if not question:
+        # página sin pregunta (resumen)
+        return False
+    if question.statement_math:
+        return True
+    return _has_tex(question.statement_text) or any(
+        _has_tex(o.text) for o in (question.options or [])
+    )
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_manifest() -> dict[str, str]:
+    try:
+        with open(_local_path(MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def check() -> list[str]:
+    """
+    Archivos que faltan o no coinciden con el manifest.
+    """
+    manifest = load_manifest()
+    bad = []
+
+    for rel, _ in _downloads():
+        expected = manifest.get(rel)
+        try:
+            with open(_local_path(rel), "rb") as f:
+                data = f.read()
+        except OSError:
+            bad.append(f"{rel}: falta")
+            continue
+        if expected is None:
+            bad.append(f"{rel}: no está en {MANIFEST}")
+        elif _sha256(data) != expected:
+            bad.append(f"{rel}: sha256 distinto")
+
+    return bad
+
+
+def fetch(force: bool = False):
+    """
+    Descarga lo que falte. Si el archivo ya está en el manifest,
+    el contenido descargado tiene que coincidir con él.
+    """
+    manifest = load_manifest()
+
+    for rel, url in _downloads():
+        dst = _local_path(rel)
+        if os.path.isfile(dst) and not force:
+            continue
+
+        with urllib.request.urlopen(url, timeout=30) as r:
+            data = r.read()
+
+        digest = _sha256(data)
+        if manifest.setdefault(rel, digest) != digest:
+            raise ValueError(f"{url}: sha256 distinto del fijado en {MANIFEST}")
+
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(dst, "wb") as f:
+            f.write(data)
+
+        print(f"{url} -> vendor/{rel} ({len(data)} bytes)")
+
+    with open(_local_path(MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv[1:]:
+        problems = check()
+        print("\n".join(problems) or "vendor/ OK")
+        sys.exit(1 if problems else 0)
+    fetch()
@@ -0,0 +1,64 @@
+# test/conftest.py
+
+"""
+La app usa rutas relativas (./data.db, ./shards): los tests
+corren en un directorio temporal propio, con una base nueva
+por sesión. Cada test crea su categoría, así no dependen del
+orden.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(tempfile.mkdtemp(prefix="quiz-tests-"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import crud  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.admin_service import create_question_from_admin  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def student(client):
+    """
+    Cliente con un estudiante nuevo (cookie propia: su propio
+    bucket de rate limit y su propia cola de práctica).
+    """
+    client.cookies.clear()
+    client.cookies.set("student_id", uuid.uuid4().hex)
+    yield client
+    client.cookies.clear()
+
+
+@pytest.fixture
+def subcategory_id(client) -> int:
+    name = uuid.uuid4().hex
+    crud.create_category(name)
+    category = next(c for c in crud.get_categories() if c.name == name)
+    crud.create_subcategory(category.id, "S")
+    return crud.get_subcategories(category.id)[0].id
+
+
+def add_text_questions(subcategory_id: int, n: int, answer: str = "a") -> list[int]:
+    return [
+        create_question_from_admin(
+            subcategory_id=subcategory_id,
+            raw_statement=f"q{i} {uuid.uuid4().hex}",
+            eval_type="TEXT",
+            answer=answer,
+        )
+        for i in range(n)
+    ]
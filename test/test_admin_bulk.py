@@ -0,0 +1,75 @@
+# test/test_admin_bulk.py
+
+"""
+Operaciones masivas del admin.
+"""
+
+import pytest
+
+from app import crud
+from app.domain.errors import DuplicateQuestionError
+from app.services.admin_service import create_question_from_admin
+
+
+def _create(subcategory_id: int, eval_type: str, statement: str = "X", answer: str = "a") -> int:
+    return create_question_from_admin(
+        subcategory_id=subcategory_id,
+        raw_statement=statement,
+        eval_type=eval_type,
+        answer=answer,
+    )
+
+
+def test_retype_recomputes_content_hash(subcategory_id):
+    qid = _create(subcategory_id, "TEXT")
+
+    result = crud.bulk_retype_questions([qid], "EQUATION")
+    assert (result["retyped"], result["errors"]) == (1, [])
+
+    # la huella sigue al tipo: ahora choca la EQUATION, no la TEXT
+    with pytest.raises(DuplicateQuestionError):
+        _create(subcategory_id, "EQUATION")
+    assert _create(subcategory_id, "TEXT")
+
+
+def test_retype_reports_duplicates_per_row(subcategory_id):
+    existing = _create(subcategory_id, "EQUATION")
+    clash = _create(subcategory_id, "TEXT")
+    twin_a = _create(subcategory_id, "TEXT", statement="Y")
+    twin_b = _create(subcategory_id, "NUMERIC", statement="Y")
+    free = _create(subcategory_id, "TEXT", statement="Z")
+
+    result = crud.bulk_retype_questions([clash, twin_a, twin_b, free], "EQUATION")
+
+    assert result["retyped"] == 2
+    assert result["errors"] == [
+        f"Question {clash}: duplicate of question {existing}",
+        f"Question {twin_b}: duplicate of question {twin_a}",
+    ]
+    assert crud.get_question(clash).eval_type == "TEXT"
+    assert crud.get_question(twin_b).eval_type == "NUMERIC"
+    assert crud.get_question(free).eval_type == "EQUATION"
+
+
+def test_retype_recomputes_answer_keys(subcategory_id):
+    qid = _create(subcategory_id, "TEXT", answer="7")
+
+    crud.bulk_retype_questions([qid], "NUMERIC")
+
+    assert crud.get_question(qid).answer_keys is None
+
+
+def test_revision_snapshot_orders_options(subcategory_id):
+    qid = create_question_from_admin(
+        subcategory_id=subcategory_id,
+        raw_statement="elige",
+        eval_type="CHOICE",
+    )
+    other = _create(subcategory_id, "CHOICE", statement="otra")
+    ids = [crud.create_option(question_id=qid, text=t, is_correct=t == "b") for t in "abc"]
+    crud.create_option(question_id=other, text="x")
+
+    revision = crud.get_current_revision_ids([qid])[qid]
+    question = crud.get_question_at_revision(revision)
+
+    assert [o.id for o in question.options] == ids
@@ -0,0 +1,73 @@
+# test/test_answers.py
+
+"""
+Respuestas aceptadas: claves normalizadas y calificación por
+conjunto.
+"""
+
+import json
+
+import pytest
+
+from app.domain.answers import (
+    accepted_set,
+    answer_keys,
+    dump_alternates,
+    split_csv_alternates,
+)
+from app.engine.evaluators import equation, text
+from app.models import Question
+
+
+def test_text_keys_are_normalized_and_sorted():
+    keys = answer_keys("TEXT", "h2o", dump_alternates(["Agua", " agua ", "(agua)"]))
+
+    assert json.loads(keys) == ["AGUA", "H2O"]
+
+
+def test_equation_keys_normalize_multiplication():
+    keys = answer_keys("EQUATION", "2*x = 4", dump_alternates(["2·x=4", "2 × x = 4"]))
+
+    assert json.loads(keys) == ["2XX=4"]
+
+
+@pytest.mark.parametrize("eval_type", ["NUMERIC", "CHOICE", "SYNTAX"])
+def test_no_keys_for_single_answer_types(eval_type):
+    assert answer_keys(eval_type, "1", dump_alternates(["2"])) is None
+
+
+def test_no_keys_without_answer():
+    assert answer_keys("TEXT", None, None) is None
+
+
+def test_accepted_set_is_cached():
+    keys = answer_keys("TEXT", "a", dump_alternates(["b"]))
+
+    assert accepted_set(keys) == frozenset({"A", "B"})
+    assert accepted_set(keys) is accepted_set(keys)
+
+
+def test_csv_alternates():
+    assert split_csv_alternates(r"agua| water |agua|a\|b") == ["agua", "water", "a|b"]
+    assert split_csv_alternates("") == []
+
+
+@pytest.mark.parametrize("evaluator, eval_type, answer, alternates, user_answer, correct", [
+    (text, "TEXT", "H2O", ["agua"], " Agua ", True),
+    (text, "TEXT", "H2O", ["agua"], "h2o", True),
+    (text, "TEXT", "H2O", ["agua"], "water", False),
+    (equation, "EQUATION", "2*x=4", ["x=2"], "2·x = 4", True),
+    (equation, "EQUATION", "2*x=4", ["x=2"], "X = 2", True),
+    (equation, "EQUATION", "2*x=4", ["x=2"], "x=4", False),
+])
+def test_evaluators_use_accepted_set(evaluator, eval_type, answer, alternates, user_answer, correct):
+    question = Question(
+        eval_type=eval_type,
+        answer=answer,
+        answer_keys=answer_keys(eval_type, answer, dump_alternates(alternates)),
+    )
+
+    result = evaluator.evaluate(question, user_answer)
+
+    assert result.correct is correct
+    assert result.expected == answer
@@ -0,0 +1,57 @@
+# test/test_attempt_log.py
+
+"""
+Write-behind de intentos: si la DB falla, el buffer no crece
+sin límite.
+"""
+
+import logging
+
+import pytest
+
+from app.services import attempt_log as attempt_log_module
+from app.services.attempt_log import AttemptLog
+
+
+@pytest.fixture
+def failing_db(monkeypatch):
+    def save_attempts(rows, stats, top_k):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(attempt_log_module, "save_attempts", save_attempts)
+
+
+def _record(log: AttemptLog, question_ids):
+    for qid in question_ids:
+        log.record(
+            student_id="s",
+            question_id=qid,
+            mode="practice",
+            user_answer="a",
+            correct=True,
+        )
+
+
+def _buffered(log: AttemptLog) -> list[int]:
+    return [row["question_id"] for row in log._buffer]
+
+
+def test_failed_flush_keeps_rows(failing_db):
+    log = AttemptLog(max_buffer=10)
+    _record(log, range(3))
+
+    assert log.flush() == 0
+    assert _buffered(log) == [0, 1, 2]
+
+
+def test_failed_flush_drops_oldest_rows(failing_db, caplog):
+    log = AttemptLog(max_buffer=5)
+    _record(log, range(4))
+    log.flush()
+    _record(log, range(4, 8))
+
+    with caplog.at_level(logging.WARNING, logger=attempt_log_module.__name__):
+        log.flush()
+
+    assert _buffered(log) == [3, 4, 5, 6, 7]
+    assert "dropped 3 oldest rows" in caplog.text
@@ -0,0 +1,76 @@
+# test/test_exam_forms.py
+
+"""
+Formularios pregenerados: al asignar se descartan los que ya
+no casan con el banco.
+"""
+
+import uuid
+
+import pytest
+
+from app import crud
+from app.domain.exam_spec import spec_key, spec_subcategories
+from app.services.admin_service import create_question_from_admin
+from app.services.exam_forms import form_cache, generate_exam_forms
+
+from conftest import add_text_questions
+
+
+@pytest.fixture
+def other_subcategory_id(client) -> int:
+    name = uuid.uuid4().hex
+    crud.create_category(name)
+    category = next(c for c in crud.get_categories() if c.name == name)
+    crud.create_subcategory(category.id, "Otra")
+    return crud.get_subcategories(category.id)[0].id
+
+
+def _choice_question(subcategory_id: int) -> tuple[int, int]:
+    qid = create_question_from_admin(
+        subcategory_id=subcategory_id,
+        raw_statement=f"elige {uuid.uuid4().hex}",
+        eval_type="CHOICE",
+    )
+    correct = crud.create_option(question_id=qid, text="sí", is_correct=True)
+    crud.create_option(question_id=qid, text="no")
+    return qid, correct
+
+
+def test_spec_subcategories():
+    assert spec_subcategories(spec_key({7: None, 3: 10})) == [3, 7]
+
+
+def test_assign_returns_pinned_revisions(subcategory_id):
+    ids = add_text_questions(subcategory_id, 3)
+    key = spec_key({subcategory_id: None})
+    [form_id] = generate_exam_forms({subcategory_id: None}, 1, seed=1)
+
+    assigned_id, question_ids, revisions = form_cache.assign(key)
+
+    assert assigned_id == form_id
+    assert sorted(question_ids) == sorted(ids)
+    assert set(revisions) == set(ids)
+
+
+def test_assign_retires_form_after_bulk_move(subcategory_id, other_subcategory_id):
+    ids = add_text_questions(subcategory_id, 3)
+    key = spec_key({subcategory_id: None})
+    generate_exam_forms({subcategory_id: None}, 2, seed=1)
+    form_cache.assign(key)
+
+    crud.bulk_move_questions(ids[:1], other_subcategory_id)
+
+    assert form_cache.assign(key) is None
+    assert crud.get_active_exam_forms(key) == []
+
+
+def test_assign_retires_form_after_option_delete(subcategory_id):
+    add_text_questions(subcategory_id, 2)
+    _, correct = _choice_question(subcategory_id)
+    key = spec_key({subcategory_id: None})
+    generate_exam_forms({subcategory_id: None}, 1, seed=1)
+
+    crud.delete_option(correct)
+
+    assert form_cache.assign(key) is None
@@ -0,0 +1,69 @@
+# test/test_exam_spec.py
+
+"""
+Especificación de examen mixto y reparto por pesos.
+"""
+
+import pytest
+
+from app.domain.exam_spec import ExamPart, allocate, parse_exam_spec, spec_key
+
+
+def test_parse_text_spec():
+    assert parse_exam_spec("12:10, 15:*, 20:w2") == [
+        ExamPart(12, count=10),
+        ExamPart(15),
+        ExamPart(20, weight=2.0),
+    ]
+
+
+def test_parse_json_spec():
+    raw = '[{"subcategory_id": 12, "count": 10}, {"subcategory_id": 15, "weight": 1}]'
+
+    assert parse_exam_spec(raw) == [ExamPart(12, count=10), ExamPart(15, weight=1.0)]
+
+
+@pytest.mark.parametrize("raw", ["", "12:x", "12:1, 12:2", "12:0", "12:w0", "[{"])
+def test_parse_rejects_invalid_specs(raw):
+    with pytest.raises(ValueError):
+        parse_exam_spec(raw)
+
+
+def test_allocate_counts_only():
+    assert allocate(parse_exam_spec("1:5, 2:*")) == {1: 5, 2: None}
+
+
+def test_allocate_largest_remainder():
+    # exactos: 3.33 cada uno → en empate, el resto va al primero
+    quotas = allocate(parse_exam_spec("1:w1, 2:w1, 3:w1"), total=10)
+
+    assert quotas == {1: 4, 2: 3, 3: 3}
+
+
+def test_allocate_remainder_goes_to_largest_fraction():
+    # exactos: 6.5, 2.6, 0.9
+    quotas = allocate(parse_exam_spec("1:w65, 2:w26, 3:w9"), total=10)
+
+    assert quotas == {1: 6, 2: 3, 3: 1}
+
+
+def test_allocate_drops_zero_quotas():
+    quotas = allocate(parse_exam_spec("1:w100, 2:w1"), total=3)
+
+    assert quotas == {1: 3}
+
+
+def test_allocate_mixes_counts_and_weights():
+    quotas = allocate(parse_exam_spec("1:4, 2:w1, 3:w3"), total=8)
+
+    assert quotas == {1: 4, 2: 2, 3: 6}
+
+
+def test_weighted_spec_requires_total():
+    with pytest.raises(ValueError):
+        allocate(parse_exam_spec("1:w1"))
+
+
+def test_spec_key_is_canonical():
+    assert spec_key({7: None, 3: 10}) == "3:10,7:*"
+    assert spec_key(allocate(parse_exam_spec("7:*, 3:10"))) == "3:10,7:*"
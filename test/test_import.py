@@ -0,0 +1,123 @@
+# test/test_import.py
+
+"""
+Importación: preparación en los workers e inserción por lotes.
+"""
+
+import json
+
+from sqlalchemy import event
+
+from app import crud
+from app.db import engine
+from app.services import admin_service
+from app.services.admin_service import prepare_question, save_prepared_batch
+
+
+def _prepared(subcategory_id: int, n: int, **kwargs):
+    return [
+        prepare_question(
+            subcategory_id=subcategory_id,
+            raw_statement=f"pregunta {i}",
+            eval_type=kwargs.get("eval_type", "TEXT"),
+            answer=kwargs.get("answer", f"r{i}"),
+            alt_answers=kwargs.get("alt_answers"),
+        )
+        for i in range(n)
+    ]
+
+
+def _commits(fn, *args, **kwargs):
+    count = []
+    listener = lambda _conn: count.append(1)  # noqa: E731
+    event.listen(engine, "commit", listener)
+    try:
+        return fn(*args, **kwargs), len(count)
+    finally:
+        event.remove(engine, "commit", listener)
+
+
+def test_prepare_computes_answer_keys():
+    p = prepare_question(
+        subcategory_id=1,
+        raw_statement="Fórmula del agua",
+        eval_type="TEXT",
+        answer="H2O",
+        alt_answers=["agua", " Agua "],
+    )
+
+    assert p.alt_answers == ("agua", "Agua")
+    assert json.loads(p.answer_keys) == ["AGUA", "H2O"]
+
+
+def test_batch_is_one_transaction(subcategory_id, monkeypatch):
+    monkeypatch.setattr(admin_service, "INSERT_BATCH_SIZE", 4)
+
+    outcomes, commits = _commits(save_prepared_batch, _prepared(subcategory_id, 10))
+
+    assert [status for status, _ in outcomes] == ["created"] * 10
+    assert commits == 3
+
+    question = crud.get_question(outcomes[0][1])
+    assert question.current_revision_id is not None
+    assert json.loads(question.answer_keys) == ["R0"]
+
+
+def test_batch_duplicates(subcategory_id):
+    first = save_prepared_batch(_prepared(subcategory_id, 2))
+    again = _prepared(subcategory_id, 3)
+
+    outcomes = save_prepared_batch(again + again[2:])
+
+    assert outcomes == [
+        ("skipped", first[0][1]),
+        ("skipped", first[1][1]),
+        ("created", outcomes[2][1]),
+        ("skipped", outcomes[2][1]),
+    ]
+
+
+def test_batch_updates_duplicates(subcategory_id):
+    [(_, qid)] = save_prepared_batch(_prepared(subcategory_id, 1, answer="x"))
+    revision = crud.get_question(qid).current_revision_id
+
+    [p] = _prepared(subcategory_id, 1, answer="X", alt_answers=["y"])
+    assert save_prepared_batch([p], update_duplicates=True) == [("updated", qid)]
+
+    question = crud.get_question(qid)
+    assert question.answer == "X"
+    assert json.loads(question.answer_keys) == ["X", "Y"]
+    assert question.current_revision_id != revision
+
+
+def test_batch_unknown_subcategory(subcategory_id):
+    good, bad = _prepared(subcategory_id, 2)
+    bad = prepare_question(
+        subcategory_id=10**6,
+        raw_statement=bad.statement_text,
+        eval_type="TEXT",
+        answer="a",
+    )
+
+    outcomes = save_prepared_batch([good, bad])
+
+    assert outcomes[0][0] == "created"
+    assert outcomes[1] == ("error", "Subcategory not found")
+
+
+def test_csv_import(client, subcategory_id):
+    csv = (
+        "subcategory_id,statement,eval_type,answer,tolerance,alt_answers\n"
+        f"{subcategory_id},Valor absoluto,EQUATION,|x|=3,,\n"
+        f"{subcategory_id},Fórmula del agua,TEXT,H2O,,agua|water\n"
+        f"{subcategory_id},Fórmula del agua,TEXT,H2O,,\n"
+        f"{subcategory_id},Sin tipo,RARO,1,,\n"
+    )
+
+    result = client.post("/admin/import", files={"file": ("q.csv", csv)}).json()
+
+    assert (result["created"], result["skipped"]) == (2, 1)
+    assert result["errors"] == ["line 5: eval_type inválido: RARO"]
+
+    answers = {q.answer for q in crud.get_playable_questions(subcategory_id)}
+    assert answers == {"|x|=3", "H2O"}
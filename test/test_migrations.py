@@ -0,0 +1,144 @@
+# test/test_migrations.py
+
+"""
+Migraciones por PRAGMA user_version sobre bases existentes.
+"""
+
+import json
+
+import pytest
+
+from app import db as app_db
+from app.domain.fingerprint import content_hash
+
+
+@pytest.fixture
+def engine(tmp_path):
+    eng = app_db._create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    yield eng
+    eng.dispose()
+
+
+def _sql(eng, statement: str, params=()) -> list:
+    with eng.begin() as conn:
+        result = conn.exec_driver_sql(statement, params)
+        return result.all() if result.returns_rows else []
+
+
+def _set_version(eng, version: int):
+    with eng.connect() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {version}")
+        conn.commit()
+
+
+def _version(eng) -> int:
+    return _sql(eng, "PRAGMA user_version")[0][0]
+
+
+def _migration_number(migration) -> int:
+    return app_db._MIGRATIONS.index(migration) + 1
+
+
+def _subcategory(eng):
+    _sql(eng, "INSERT INTO categories (id, name) VALUES (1, 'C')")
+    _sql(eng, "INSERT INTO subcategories (id, category_id, name) VALUES (1, 1, 'S')")
+
+
+def _question(eng, qid: int, eval_type: str, statement: str = "x", answer: str = "1"):
+    _sql(eng, """
+        INSERT INTO questions (id, subcategory_id, statement_text, eval_type, answer, revision)
+        VALUES (?, 1, ?, ?, ?, 1)
+    """, (qid, statement, eval_type, answer))
+
+
+def _hashes(eng) -> dict[int, str | None]:
+    return dict(_sql(eng, "SELECT id, content_hash FROM questions"))
+
+
+def test_new_database_is_at_latest_version(engine):
+    app_db._init_schema(engine)
+
+    assert _version(engine) == len(app_db._MIGRATIONS)
+
+
+def test_item_state_question_index(engine):
+    app_db._init_schema(engine)
+    _sql(engine, "DROP INDEX ix_item_states_question")
+    _set_version(engine, _migration_number(app_db._migrate_item_state_index) - 1)
+
+    app_db._run_migrations(engine)
+
+    indexes = {r[1] for r in _sql(engine, "PRAGMA index_list(item_states)")}
+    assert "ix_item_states_question" in indexes
+    assert _version(engine) == len(app_db._MIGRATIONS)
+
+
+def test_question_revisions_snapshot_options_in_id_order(engine):
+    app_db._init_schema(engine)
+    _subcategory(engine)
+    _sql(engine, """
+        INSERT INTO questions (id, subcategory_id, statement_text, eval_type, revision, option_count)
+        VALUES (1, 1, 'elige', 'CHOICE', 1, 3), (2, 1, 'otra', 'CHOICE', 1, 1)
+    """)
+    # insertadas fuera de orden
+    for oid, qid in ((3, 1), (2, 2), (1, 1), (4, 1)):
+        _sql(engine, "INSERT INTO options (id, question_id, text, is_correct) VALUES (?, ?, ?, 0)",
+             (oid, qid, f"o{oid}"))
+    _set_version(engine, _migration_number(app_db._migrate_question_revisions) - 1)
+
+    app_db._run_migrations(engine)
+
+    options = dict(_sql(engine, "SELECT question_id, options FROM question_revisions"))
+    assert [o["id"] for o in json.loads(options[1])] == [1, 3, 4]
+    assert [o["id"] for o in json.loads(options[2])] == [2]
+
+
+def test_migrations_rerun_from_zero(engine):
+    app_db._init_schema(engine)
+    _subcategory(engine)
+    _question(engine, 1, "TEXT")
+    _set_version(engine, 0)
+
+    app_db._run_migrations(engine)
+
+    assert _version(engine) == len(app_db._MIGRATIONS)
+    assert _hashes(engine)[1] == content_hash("x", None, "TEXT", "1")
+
+
+def test_content_hash_column_backfill(engine):
+    app_db._init_schema(engine)
+    _subcategory(engine)
+    _sql(engine, "DROP INDEX uq_question_content")
+    _sql(engine, "ALTER TABLE questions DROP COLUMN content_hash")
+    _question(engine, 1, "TEXT")
+    _question(engine, 2, "TEXT")
+    _question(engine, 3, "NUMERIC", answer="2")
+    _set_version(engine, _migration_number(app_db._migrate_content_hash) - 1)
+
+    app_db._run_migrations(engine)
+
+    # el duplicado exacto que ya existía se queda sin huella
+    assert _hashes(engine) == {
+        1: content_hash("x", None, "TEXT", "1"),
+        2: None,
+        3: content_hash("x", None, "NUMERIC", "2"),
+    }
+    indexes = {r[1] for r in _sql(engine, "PRAGMA index_list(questions)")}
+    assert "uq_question_content" in indexes
+
+
+def test_content_hash_type_recovers_cross_type_duplicates(engine):
+    app_db._init_schema(engine)
+    _subcategory(engine)
+    _question(engine, 1, "TEXT")
+    _question(engine, 2, "EQUATION")
+    # antes de incluir el tipo, la EQUATION chocaba y quedó sin huella
+    _sql(engine, "UPDATE questions SET content_hash = CASE id WHEN 1 THEN 'viejo' END")
+    _set_version(engine, _migration_number(app_db._migrate_content_hash_type) - 1)
+
+    app_db._run_migrations(engine)
+
+    assert _hashes(engine) == {
+        1: content_hash("x", None, "TEXT", "1"),
+        2: content_hash("x", None, "EQUATION", "1"),
+    }
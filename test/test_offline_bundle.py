@@ -0,0 +1,78 @@
+# test/test_offline_bundle.py
+
+"""
+Paquetes sin conexión: buckets NUMERIC y hashes de respuestas.
+"""
+
+import math
+import random
+
+import pytest
+
+from app.domain.bundle_keys import EXACT_WIDTH, hash_key, numeric_buckets, numeric_width
+from app.services.admin_service import create_question_from_admin
+from app.services.offline_bundle import build_bundle
+
+
+def _bucket(x: float, width: float) -> str:
+    return str(math.floor(x / width))
+
+
+@pytest.mark.parametrize("value, width", [
+    (10.0, 0.5),
+    (-3.25, 0.1),
+    (0.0, 1.0),
+    (1e6, 0.01),
+    (2.5, EXACT_WIDTH),
+])
+def test_buckets_cover_tolerance(value, width):
+    buckets = numeric_buckets(value, width)
+    rng = random.Random(0)
+
+    for _ in range(1000):
+        x = value + rng.uniform(-width, width)
+        assert _bucket(x, width) in buckets
+
+    assert _bucket(value - width, width) in buckets
+    assert _bucket(value + width, width) in buckets
+
+
+def test_buckets_are_few():
+    # [v - w, v + w] cruza como mucho 3 buckets de ancho w
+    assert len(numeric_buckets(10.25, 0.5)) <= 3
+    assert len(numeric_buckets(10.0, 0.5)) <= 3
+
+
+def test_buckets_reject_far_values():
+    buckets = numeric_buckets(10.0, 0.5)
+
+    assert _bucket(8.9, 0.5) not in buckets
+    assert _bucket(11.1, 0.5) not in buckets
+
+
+def test_numeric_width():
+    assert numeric_width(0.2) == 0.2
+    assert numeric_width(None) == EXACT_WIDTH
+    assert numeric_width(0.0) == EXACT_WIDTH
+
+
+def test_bundle_numeric_item(subcategory_id):
+    create_question_from_admin(
+        subcategory_id=subcategory_id,
+        raw_statement="pi con dos decimales",
+        eval_type="NUMERIC",
+        answer="3.14",
+        tolerance=0.01,
+    )
+
+    bundle = build_bundle(subcategory_id)
+    [item] = bundle["questions"]
+    hashes = set(item["answer_hashes"])
+
+    def accepted(x: float) -> bool:
+        return hash_key(bundle["salt"], _bucket(x, item["width"])) in hashes
+
+    assert item["width"] == 0.01
+    assert "answer" not in item
+    assert all(accepted(x) for x in (3.13, 3.135, 3.14, 3.145, 3.15))
+    assert not accepted(3.2)
@@ -0,0 +1,129 @@
+# test/test_play_session.py
+
+"""
+Sesiones de juego con preguntas borradas a mitad de camino.
+"""
+
+import re
+
+import numpy as np
+
+from app import crud
+from app.domain.irt import AdaptiveTest
+from app.main import SESSION
+
+from conftest import add_text_questions
+
+
+def _shown(response) -> int:
+    return int(re.search(r'name="question_id" value="(\d+)"', response.text).group(1))
+
+
+def _start(client, subcategory_id: int, **form):
+    data = {"subcategory_id": subcategory_id, "time_limit": 5, **form}
+    response = client.post("/play/question", data=data)
+    assert response.status_code == 200
+    return response
+
+
+def test_practice_answer_to_deleted_question(student, subcategory_id):
+    add_text_questions(subcategory_id, 3)
+
+    shown = _shown(_start(student, subcategory_id, limit=3))
+    assert SESSION["queue"] is None
+
+    crud.delete_question(shown)
+
+    response = student.post("/play/answer", data={"question_id": shown, "user_answer": "a"})
+
+    assert response.status_code == 200
+    assert _shown(response) != shown
+
+
+def test_practice_skips_deleted_questions(student, subcategory_id):
+    ids = add_text_questions(subcategory_id, 4)
+
+    shown = _shown(_start(student, subcategory_id, limit=4))
+    for qid in ids:
+        if qid != shown:
+            crud.delete_question(qid)
+
+    response = student.post("/play/answer", data={"question_id": shown, "user_answer": "a"})
+
+    assert response.status_code == 200
+    assert _shown(response) == shown
+
+
+def test_exam_skips_deleted_questions(student, subcategory_id):
+    ids = add_text_questions(subcategory_id, 4)
+
+    shown = _shown(_start(student, subcategory_id, limit=4, exam=True))
+    deleted = [qid for qid in ids if qid != shown][:2]
+    for qid in deleted:
+        crud.delete_question(qid)
+        # sin revisión fijada no hay nada que mostrar
+        del SESSION["revisions"][qid]
+
+    seen = [shown]
+    response = student.post("/play/answer", data={"question_id": shown, "user_answer": "a"})
+
+    while 'name="question_id"' in response.text:
+        qid = _shown(response)
+        seen.append(qid)
+        response = student.post("/play/answer", data={"question_id": qid, "user_answer": "b"})
+
+    assert response.status_code == 200
+    assert not set(seen) & set(deleted)
+    assert len(seen) == 2
+    assert SESSION["total"] == 2
+
+
+def test_exam_keeps_pinned_revision_of_deleted_question(student, subcategory_id):
+    ids = add_text_questions(subcategory_id, 2)
+
+    shown = _shown(_start(student, subcategory_id, limit=2, exam=True))
+    other = next(qid for qid in ids if qid != shown)
+    crud.delete_question(other)
+
+    response = student.post("/play/answer", data={"question_id": shown, "user_answer": "a"})
+
+    assert response.status_code == 200
+    assert _shown(response) == other
+
+
+def test_adaptive_skips_deleted_questions(student, subcategory_id):
+    ids = add_text_questions(subcategory_id, 6)
+
+    shown = _shown(_start(student, subcategory_id, limit=6, adaptive=True))
+    deleted = [qid for qid in ids if qid != shown][:3]
+    for qid in deleted:
+        crud.delete_question(qid)
+        del SESSION["revisions"][qid]
+
+    seen = [shown]
+    response = student.post("/play/answer", data={"question_id": shown, "user_answer": "a"})
+
+    while 'name="question_id"' in response.text:
+        qid = _shown(response)
+        seen.append(qid)
+        response = student.post("/play/answer", data={"question_id": qid, "user_answer": f"b{qid}"})
+
+    assert response.status_code == 200
+    assert not set(seen) & set(deleted)
+    assert len(seen) == 3
+
+
+def test_adaptive_discard_keeps_theta():
+    test = AdaptiveTest(np.array([1, 2, 3]), np.ones(3), np.array([-1.0, 0.0, 1.0]))
+    theta, se = test.theta, test.se
+
+    test.discard(test.next_item())
+    test.discard(99)
+    remaining = test.next_item()
+    test.discard(remaining)
+
+    assert (test.theta, test.se) == (theta, se)
+    assert test.next_item() not in (None, remaining)
+
+    test.discard(test.next_item())
+    assert test.next_item() is None
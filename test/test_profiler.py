@@ -0,0 +1,86 @@
+# test/test_profiler.py
+
+"""
+Perfilador bajo demanda: solo cuenta el trabajo de las
+peticiones perfiladas.
+"""
+
+import threading
+
+import pytest
+
+from app.domain.normalization import normalize_text
+from app.web import profiler as profiler_module
+from app.web.profiler import CPROFILE, SamplingProfiler
+
+
+def _busy(stop: threading.Event, sampler: SamplingProfiler | None, ready: threading.Event):
+    if sampler is not None:
+        sampler.enter()
+    ready.set()
+    try:
+        while not stop.is_set():
+            normalize_text("Hola Mundo " * 20)
+    finally:
+        if sampler is not None:
+            sampler.leave()
+
+
+def test_samples_only_profiled_threads():
+    sampler = SamplingProfiler()
+    stop = threading.Event()
+    threads = []
+
+    for name, tracked in (("perfilado", sampler), ("otro", None)):
+        ready = threading.Event()
+        t = threading.Thread(target=_busy, args=(stop, tracked, ready), name=name)
+        t.start()
+        ready.wait()
+        threads.append(t)
+
+    try:
+        # entre llamadas la pila no tiene frames de app/ y la
+        # muestra se descarta: se muestrea hasta reunir 20
+        for _ in range(10_000):
+            sampler._sample(threading.get_ident())
+            if sum(sampler.stacks.values()) >= 20:
+                break
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    roots = {stack.split(";", 1)[0] for stack in sampler.stacks}
+    assert roots == {"perfilado"}
+
+
+def test_rearm_keeps_in_flight_requests():
+    sampler = SamplingProfiler()
+    sampler.arm(2)
+    assert sampler.begin("/play/x")
+
+    sampler.arm(3)
+    sampler.end()
+
+    assert sampler.active == 0
+    assert sampler.status()["remaining"] == 3
+
+
+@pytest.fixture
+def cprofile_mode(monkeypatch):
+    monkeypatch.setattr(profiler_module.profiler, "mode", CPROFILE)
+    yield profiler_module.profiler
+    profiler_module.profiler.disarm()
+
+
+def test_cprofile_fallback(client, cprofile_mode):
+    response = client.post("/admin/profiler/start", data={"requests": 1, "path": "/admin/stats"})
+    assert response.json()["mode"] == CPROFILE
+
+    client.get("/")
+    client.get("/admin/stats")
+
+    collapsed = client.get("/admin/profiler/collapsed").text
+    assert "app/main.py:admin_question_stats" in collapsed
+    assert "app/main.py:index" not in collapsed
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
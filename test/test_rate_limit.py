@@ -0,0 +1,154 @@
+# test/test_rate_limit.py
+
+"""
+Token bucket por cliente y deduplicación de envíos.
+"""
+
+import asyncio
+
+from app.web.rate_limit import DedupMiddleware, RateLimitMiddleware, TokenBuckets
+
+
+def test_bucket_burst_and_refill():
+    buckets = TokenBuckets(rate=2.0, burst=3)
+
+    assert [buckets.take("a", now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take("a", now=0.0) == 0.5
+
+    # medio segundo → un token
+    assert buckets.take("a", now=0.5) == 0.0
+    assert buckets.take("a", now=0.5) > 0
+
+    # otro cliente tiene su propio bucket
+    assert buckets.take("b", now=0.5) == 0.0
+
+
+def test_bucket_never_exceeds_burst():
+    buckets = TokenBuckets(rate=1.0, burst=2)
+    buckets.take("a", now=0.0)
+
+    taken = [buckets.take("a", now=100.0) for _ in range(3)]
+
+    assert taken[:2] == [0.0, 0.0]
+    assert taken[2] > 0
+
+
+def test_bucket_forgets_least_recent_clients():
+    buckets = TokenBuckets(rate=1.0, burst=1, max_keys=2)
+
+    buckets.take("a", now=0.0)
+    buckets.take("b", now=0.0)
+    buckets.take("a", now=0.0)
+    buckets.take("c", now=0.0)
+
+    assert set(buckets._buckets) == {"a", "c"}
+
+
+# =====================================================
+# MIDDLEWARES (ASGI puro)
+# =====================================================
+
+def _scope(path: str, cookie: str | None = None, ip: str = "10.0.0.1", method: str = "POST"):
+    headers = [(b"cookie", f"student_id={cookie}".encode())] if cookie else []
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": headers,
+        "client": (ip, 1234),
+    }
+
+
+class _Recorder:
+    """
+    App ASGI que cuenta llamadas y responde con el cuerpo leído.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.after_body: list[dict] = []
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        message = await receive()
+        self.after_body.append(await receive())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": message.get("body", b"")})
+
+
+def _call(app, scope, body: bytes = b"") -> list[dict]:
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def _status(app, scope) -> int:
+    return _call(app, scope)[0]["status"]
+
+
+def test_student_budget():
+    app = RateLimitMiddleware(_Recorder(), budgets={"/play": (0.001, 2)})
+
+    statuses = [_status(app, _scope("/play/answer", cookie="s1")) for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+    assert _status(app, _scope("/play/answer", cookie="s2")) == 200
+    assert _status(app, _scope("/", cookie="s1")) == 200
+
+
+def test_ip_limit_applies_to_rotating_cookies():
+    app = RateLimitMiddleware(_Recorder(), budgets={"/play": (0.001, 2)}, anon_factor=3)
+
+    statuses = [_status(app, _scope("/play/answer", cookie=f"s{i}")) for i in range(8)]
+
+    assert statuses == [200] * 6 + [429] * 2
+    assert _status(app, _scope("/play/answer", cookie="s0", ip="10.0.0.2")) == 200
+
+
+def test_shared_ip_without_cookie_gets_larger_budget():
+    app = RateLimitMiddleware(_Recorder(), budgets={"/play": (0.001, 2)}, anon_factor=3)
+
+    statuses = [_status(app, _scope("/play/question")) for _ in range(7)]
+
+    assert statuses == [200] * 6 + [429]
+
+
+def test_dedup_replays_identical_submission():
+    inner = _Recorder()
+    app = DedupMiddleware(inner)
+    scope = _scope("/play/answer", cookie="s1")
+
+    first = _call(app, scope, b"question_id=1&user_answer=a")
+    again = _call(app, scope, b"question_id=1&user_answer=a")
+    other = _call(app, scope, b"question_id=1&user_answer=b")
+
+    assert inner.calls == 2
+    assert again == first
+    assert other[1]["body"] == b"question_id=1&user_answer=b"
+
+
+def test_dedup_signals_disconnect_after_body():
+    inner = _Recorder()
+    app = DedupMiddleware(inner)
+
+    _call(app, _scope("/play/answer", cookie="s1"), b"x=1")
+
+    assert inner.after_body == [{"type": "http.disconnect"}]
+
+
+def test_dedup_ignores_other_paths_and_methods():
+    inner = _Recorder()
+    app = DedupMiddleware(inner)
+
+    for _ in range(2):
+        _call(app, _scope("/admin/question", cookie="s1"), b"x=1")
+        _call(app, _scope("/play/answer", cookie="s1", method="GET"))
+
+    assert inner.calls == 4
@@ -0,0 +1,117 @@
+# test/test_scheduler.py
+
+"""
+Repaso espaciado: SM-2 binario y cola por vencimiento.
+"""
+
+import pytest
+
+from app.services import scheduler as scheduler_module
+from app.services.scheduler import (
+    DAY,
+    DEFAULT_EASE,
+    MIN_EASE,
+    RELEARN_DELAY,
+    ItemSchedule,
+    PracticeQueue,
+    review,
+)
+
+
+# =====================================================
+# SM-2
+# =====================================================
+
+def test_review_correct_intervals():
+    item = ItemSchedule()
+
+    first = review(item, True, now=0.0)
+    second = review(first, True, now=10.0)
+    third = review(second, True, now=20.0)
+
+    assert (first.interval, second.interval) == (1.0, 6.0)
+    assert third.interval == pytest.approx(6.0 * third.ease)
+    assert third.repetitions == 3
+    assert third.due_at == pytest.approx(20.0 + third.interval * DAY)
+
+
+def test_review_correct_keeps_ease():
+    # calidad 4 → el factor no cambia
+    assert review(ItemSchedule(), True, now=0.0).ease == pytest.approx(DEFAULT_EASE)
+
+
+def test_review_failure_resets_and_relearns():
+    item = review(review(ItemSchedule(), True, now=0.0), True, now=0.0)
+
+    failed = review(item, False, now=100.0)
+
+    assert (failed.interval, failed.repetitions, failed.lapses) == (0.0, 0, 1)
+    assert failed.due_at == 100.0 + RELEARN_DELAY
+    assert failed.ease == pytest.approx(DEFAULT_EASE - 0.54)
+
+
+def test_review_ease_floor():
+    item = ItemSchedule()
+    for _ in range(10):
+        item = review(item, False, now=0.0)
+
+    assert item.ease == MIN_EASE
+    assert item.lapses == 10
+
+
+# =====================================================
+# COLA
+# =====================================================
+
+@pytest.fixture
+def no_db(monkeypatch):
+    saved = []
+    monkeypatch.setattr(scheduler_module, "save_item_state", lambda **kw: saved.append(kw))
+    return saved
+
+
+def _queue(due: dict[int, float]) -> PracticeQueue:
+    return PracticeQueue("s", {qid: ItemSchedule(due_at=at) for qid, at in due.items()})
+
+
+def test_next_question_is_most_overdue():
+    queue = _queue({1: 30.0, 2: 10.0, 3: 20.0})
+
+    assert queue.next_question() == 2
+    assert queue.next_question(exclude=2) == 3
+
+
+def test_exclude_with_single_question():
+    queue = _queue({1: 0.0})
+
+    assert queue.next_question(exclude=1) == 1
+
+
+def test_record_moves_question_back(no_db):
+    queue = _queue({1: 10.0, 2: 20.0})
+
+    item = queue.record(1, True)
+
+    assert item.repetitions == 1
+    assert queue.next_question() == 2
+    assert len(queue) == 2
+    assert no_db[0]["question_id"] == 1
+
+
+def test_stale_entries_are_skipped(no_db):
+    queue = _queue({1: 10.0, 2: 20.0, 3: 30.0})
+
+    queue.record(1, True)
+    queue.discard(2)
+
+    # la entrada vieja de 1 y la de 2 quedan en el heap, obsoletas
+    assert queue.next_question() == 3
+    assert queue.next_question(exclude=3) == 1
+    assert len(queue) == 2
+
+
+def test_record_unknown_question(no_db):
+    queue = _queue({1: 0.0})
+
+    assert queue.record(99, True) is None
+    assert no_db == []